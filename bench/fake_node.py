@@ -0,0 +1,178 @@
+"""
+Внутрипроцессная заглушка JSON-RPC для бенчмарков: отвечает на вызовы, которые делает круг
+add_liquidity -> burn_liquidity (фабрика, пул, роутер, Multicall3, газ, nonce, receipt),
+с настраиваемой задержкой ответа и временем блока. Транзакции не исполняются — только
+попадают в следующий блок, так что ожидание receipt ведёт себя как в настоящей сети.
+"""
+from aiohttp import web
+from eth_abi import decode, encode
+from eth_account import Account
+from eth_utils import keccak, to_hex
+from typing import Callable, Optional
+import asyncio
+import collections
+import time
+
+CHAIN_ID = 324
+POOL_ADDRESS = "0x80115c708E12eDd42E504c1cD52Aea96C547c05c"
+TOKEN0 = "0x493257fd37edb34451f62edf8d2a0c418852ba4c"
+TOKEN1 = "0x5aea5775959fbc2557cc8789bc1bf90a239d9a91"
+GAS_PRICE = 25 * 10 ** 7
+GAS_USED = 150_000
+GENESIS_BLOCK = 1_000
+GENESIS_TIMESTAMP = 1_700_000_000
+ZERO_HASH = "0x" + "00" * 32
+
+
+def _selector(signature: str) -> str:
+    return keccak(text=signature)[:4].hex()
+
+
+# Ответы eth_call по селектору функции
+CALL_RESPONSES: dict[str, Callable[[], bytes]] = {
+    _selector("getPool(address,address)"): lambda: encode(["address"], [POOL_ADDRESS]),
+    _selector("totalSupply()"): lambda: encode(["uint256"], [10 ** 21]),
+    _selector("getReserves()"): lambda: encode(["uint256", "uint256"], [10 ** 12, 10 ** 20]),
+    _selector("balanceOf(address)"): lambda: encode(["uint256"], [10 ** 15]),
+    _selector("allowance(address,address)"): lambda: encode(["uint256"], [0]),
+    _selector("decimals()"): lambda: encode(["uint8"], [18]),
+    _selector("getEthBalance(address)"): lambda: encode(["uint256"], [10 ** 18]),
+    _selector("nonces(address)"): lambda: encode(["uint256"], [0]),
+    _selector("token0()"): lambda: encode(["address"], [TOKEN0]),
+    _selector("token1()"): lambda: encode(["address"], [TOKEN1]),
+    _selector("getSwapFee(address,address,address,bytes)"): lambda: encode(["uint24"], [300]),
+    _selector("DOMAIN_SEPARATOR()"): lambda: b"\x11" * 32,
+}
+AGGREGATE3_SELECTOR = _selector("aggregate3((address,bool,bytes)[])")
+
+
+class FakeNode:
+    """Состояние заглушки: счётчики вызовов, nonce отправителей и транзакции по блокам."""
+
+    def __init__(self, latency: float = 0.0, block_time: float = 0.5):
+        self.latency = latency
+        self.block_time = block_time
+        self.calls: collections.Counter = collections.Counter()
+        self._nonces: collections.Counter = collections.Counter()
+        self._tx_blocks: dict[str, int] = {}
+        self._blocks: dict[int, list[str]] = collections.defaultdict(list)
+        self._started = time.monotonic()
+
+    @property
+    def block_number(self) -> int:
+        return GENESIS_BLOCK + int((time.monotonic() - self._started) / self.block_time)
+
+    def reset_counters(self) -> None:
+        self.calls.clear()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        if isinstance(body, list):
+            return web.json_response(list(await asyncio.gather(*(self._dispatch(item) for item in body))))
+        return web.json_response(await self._dispatch(body))
+
+    async def _dispatch(self, request: dict) -> dict:
+        method, params = request["method"], request.get("params", [])
+        self.calls[method] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        handler = getattr(self, f"_{method}", None)
+        if handler is None:
+            return {"jsonrpc": "2.0", "id": request["id"],
+                    "error": {"code": -32601, "message": f"the method {method} does not exist"}}
+        try:
+            return {"jsonrpc": "2.0", "id": request["id"], "result": handler(*params)}
+        except LookupError:
+            return {"jsonrpc": "2.0", "id": request["id"],
+                    "error": {"code": -32000, "message": "execution reverted"}}
+
+    def _eth_chainId(self) -> str:
+        return hex(CHAIN_ID)
+
+    def _eth_blockNumber(self) -> str:
+        return hex(self.block_number)
+
+    def _eth_getBalance(self, address: str, block: str = "latest") -> str:
+        return hex(10 ** 18)
+
+    def _eth_gasPrice(self) -> str:
+        return hex(GAS_PRICE)
+
+    def _eth_maxPriorityFeePerGas(self) -> str:
+        return hex(0)
+
+    def _eth_feeHistory(self, block_count, newest_block, percentiles=None) -> dict:
+        count = int(block_count, 16) if isinstance(block_count, str) else int(block_count)
+        return {
+            "oldestBlock": hex(self.block_number - count + 1),
+            "baseFeePerGas": [hex(GAS_PRICE)] * (count + 1),
+            "gasUsedRatio": [0.5] * count,
+            "reward": [[hex(10 ** 6)] * len(percentiles or [])] * count,
+        }
+
+    def _eth_getTransactionCount(self, address: str, block: str = "pending") -> str:
+        return hex(self._nonces[address.lower()])
+
+    def _eth_estimateGas(self, transaction: dict, block: str = "latest") -> str:
+        return hex(200_000)
+
+    def _eth_getCode(self, address: str, block: str = "latest") -> str:
+        return "0x6001"
+
+    def _eth_call(self, transaction: dict, block: str = "latest") -> str:
+        data = transaction.get("data") or transaction.get("input") or "0x"
+        if data[2:10] == AGGREGATE3_SELECTOR:
+            (calls,) = decode(["(address,bool,bytes)[]"], bytes.fromhex(data[10:]))
+            results = [(True, CALL_RESPONSES[call[2][:4].hex()]()) for call in calls]
+            return to_hex(encode(["(bool,bytes)[]"], [results]))
+        if data[2:10] not in CALL_RESPONSES and transaction.get("from"):
+            # Предварительная симуляция транзакции от имени кошелька: заглушка считает её успешной
+            return "0x"
+        return to_hex(CALL_RESPONSES[data[2:10]]())
+
+    def _eth_sendRawTransaction(self, raw_transaction: str) -> str:
+        tx_hash = to_hex(keccak(hexstr=raw_transaction))
+        if tx_hash not in self._tx_blocks:
+            self._nonces[Account.recover_transaction(raw_transaction).lower()] += 1
+            block = self.block_number + 1
+            self._tx_blocks[tx_hash] = block
+            self._blocks[block].append(tx_hash)
+        return tx_hash
+
+    def _eth_getTransactionReceipt(self, tx_hash: str) -> Optional[dict]:
+        block = self._tx_blocks.get(tx_hash)
+        if block is None or block > self.block_number:
+            return None
+        return {
+            "transactionHash": tx_hash, "transactionIndex": "0x0", "blockNumber": hex(block),
+            "blockHash": ZERO_HASH, "from": "0x" + "00" * 20, "to": "0x" + "00" * 20, "status": "0x1",
+            "gasUsed": hex(GAS_USED), "cumulativeGasUsed": hex(GAS_USED), "effectiveGasPrice": hex(GAS_PRICE),
+            "logs": [], "logsBloom": "0x" + "00" * 256, "contractAddress": None, "type": "0x2",
+        }
+
+    def _eth_getBlockByNumber(self, block: str, full_transactions: bool = False) -> dict:
+        number = self.block_number if block in ("latest", "pending") else int(block, 16)
+        return {
+            "number": hex(number), "hash": to_hex(keccak(number.to_bytes(32, "big"))), "parentHash": ZERO_HASH,
+            "timestamp": hex(GENESIS_TIMESTAMP + int((number - GENESIS_BLOCK) * self.block_time)),
+            "baseFeePerGas": hex(GAS_PRICE), "transactions": list(self._blocks.get(number, [])),
+            "gasLimit": hex(30_000_000), "gasUsed": "0x0", "miner": "0x" + "00" * 20, "extraData": "0x",
+            "logsBloom": "0x" + "00" * 256, "difficulty": "0x0", "nonce": "0x0000000000000000",
+            "sha3Uncles": ZERO_HASH, "size": "0x0", "stateRoot": ZERO_HASH, "receiptsRoot": ZERO_HASH,
+            "transactionsRoot": ZERO_HASH, "uncles": [], "totalDifficulty": "0x0", "mixHash": ZERO_HASH,
+        }
+
+    def _eth_getLogs(self, log_filter: dict) -> list:
+        return []
+
+
+async def start_fake_node(host: str = "127.0.0.1", port: int = 8545, latency: float = 0.0,
+                          block_time: float = 0.5) -> tuple[FakeNode, web.AppRunner]:
+    """Поднимает заглушку на host:port. Возвращает (node, runner); остановка — await runner.cleanup()."""
+    node = FakeNode(latency, block_time)
+    app = web.Application()
+    app.router.add_post("/", node.handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return node, runner
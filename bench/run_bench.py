@@ -0,0 +1,194 @@
+"""
+Бенчмарк круга add_liquidity -> burn_liquidity против внутрипроцессной заглушки RPC.
+Для каждого числа одновременных кошельков выводит круги/сек, число RPC-вызовов на круг,
+p50/p99 длительности круга и RPC-запроса, а также время подписи и ожидания receipt на круг.
+
+Запуск: python -m bench.run_bench --wallets 1 10 100 1000 --latency 0.02 --block-time 0.5
+"""
+from dataclasses import asdict, dataclass, field
+from eth_utils import keccak, to_hex
+from typing import Optional
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from bench.fake_node import TOKEN0, TOKEN1, start_fake_node
+from client.client import get_shared_w3
+from client.contracts import load_abi
+from client.gas_profile import GAS_PROFILE
+from client.networks import Network
+from client.receipts import ReceiptWaiter
+from client.signer import SIGNING_SERVICE
+from client.telemetry import TELEMETRY
+from client.transport import TRANSPORT_POOL
+from pool_actions.pool_registry import POOL_REGISTRY
+from runner.batch_runner import run_batch
+from runner.job_store import JobStore
+from utils.logger import logger
+
+DEFAULT_LEVELS = (1, 10, 100, 1000)
+# Ограничение частоты запросов в бенчмарке не должно быть узким местом
+BENCH_RPC_RATE_LIMIT = 1_000_000
+BENCH_AMOUNT = 0.0001
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+
+@dataclass
+class BenchResult:
+    """Результат одного уровня нагрузки."""
+    wallets: int
+    succeeded: int
+    elapsed: float
+    cycles_per_second: float
+    rpc_calls_per_cycle: float
+    cycle_p50: float
+    cycle_p99: float
+    rpc_p50: float
+    rpc_p99: float
+    sign_per_cycle: float
+    wait_per_cycle: float
+    rpc_calls: dict = field(default_factory=dict)
+
+
+class Timings:
+    """Время ожидания receipt; RPC-запросы замеряет телеметрия клиента, подпись — сервис подписи."""
+
+    def __init__(self):
+        self.wait = 0.0
+
+    def reset(self) -> None:
+        self.wait = 0.0
+
+
+def instrument(w3, timings: Timings) -> None:
+    """Подключает замер ожидания receipt к общему AsyncWeb3 обёрткой методов ожидателя."""
+    waiter = ReceiptWaiter.for_w3(w3)
+
+    def timed(wait):
+        async def timed_wait(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await wait(*args, **kwargs)
+            finally:
+                timings.wait += time.perf_counter() - started
+        return timed_wait
+
+    # Отслеживаемые транзакции ждутся через wait_any (исходная и её замены)
+    waiter.wait = timed(waiter.wait)
+    waiter.wait_any = timed(waiter.wait_any)
+
+
+def percentile(values: list[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def bench_keys(count: int) -> dict[str, str]:
+    """Детерминированные ключи, чтобы уровни нагрузки и повторные запуски были сравнимы."""
+    return {f"bench_{i}": to_hex(keccak(text=f"syncswap-bench-wallet-{i}")) for i in range(count)}
+
+
+async def run_level(wallets: int, node, network: dict, abis: dict, timings: Timings, work_dir: str,
+                    atomic: bool = False) -> BenchResult:
+    node.reset_counters()
+    timings.reset()
+    TELEMETRY.reset()
+    SIGNING_SERVICE.reset_stats()
+    job_store = JobStore(os.path.join(work_dir, f"jobs_{wallets}.sqlite3"))
+    started = time.perf_counter()
+    try:
+        results = await run_batch(bench_keys(wallets), network, TOKEN1, TOKEN0, BENCH_AMOUNT, abis, ZERO_ADDRESS,
+                                  max_concurrency=wallets, rpc_rate_limit=BENCH_RPC_RATE_LIMIT, atomic=atomic,
+                                  job_store=job_store)
+    finally:
+        job_store.close()
+    elapsed = time.perf_counter() - started
+
+    cycles = max(len(results), 1)
+    durations = [r.elapsed for r in results]
+    rpc_latencies = [latency for samples in TELEMETRY.samples.values() for latency in samples]
+    return BenchResult(
+        wallets=wallets,
+        succeeded=sum(1 for r in results if r.success),
+        elapsed=elapsed,
+        cycles_per_second=len(results) / elapsed if elapsed else 0.0,
+        rpc_calls_per_cycle=sum(node.calls.values()) / cycles,
+        cycle_p50=percentile(durations, 50),
+        cycle_p99=percentile(durations, 99),
+        rpc_p50=percentile(rpc_latencies, 50),
+        rpc_p99=percentile(rpc_latencies, 99),
+        sign_per_cycle=SIGNING_SERVICE.sign_time / cycles,
+        wait_per_cycle=timings.wait / cycles,
+        rpc_calls=dict(node.calls),
+    )
+
+
+def log_bench_report(results: list[BenchResult]) -> None:
+    logger.info("📈 Кошельков | успешно | кругов/с | RPC/круг | круг p50/p99, с | RPC p50/p99, мс | подпись, мс | ожидание, с")
+    for r in results:
+        logger.info(f"📈 {r.wallets:>9} | {r.succeeded:>7} | {r.cycles_per_second:>8.2f} | {r.rpc_calls_per_cycle:>8.1f} | "
+                    f"{r.cycle_p50:>6.2f} / {r.cycle_p99:<6.2f} | {r.rpc_p50 * 1000:>6.1f} / {r.rpc_p99 * 1000:<6.1f} | "
+                    f"{r.sign_per_cycle * 1000:>11.2f} | {r.wait_per_cycle:>10.2f}")
+
+
+async def run_bench(levels: tuple[int, ...] = DEFAULT_LEVELS, latency: float = 0.0, block_time: float = 0.5,
+                    port: int = 8545, atomic: bool = False, json_path: Optional[str] = None,
+                    signing_workers: Optional[int] = None) -> list[BenchResult]:
+    if signing_workers is not None:
+        SIGNING_SERVICE.configure(signing_workers)
+    with open("constants/networks_data.json", "r", encoding="utf-8") as file:
+        network = dict(json.load(file)["ZKSYNC"])
+
+    rpc_url = f"http://127.0.0.1:{port}"
+    network["rpc_url"] = rpc_url
+    network.pop("ws_url", None)
+    abis = {"factory": load_abi("factory"), "pool": load_abi("classic_pool"), "router": load_abi("router")}
+
+    node, node_runner = await start_fake_node(port=port, latency=latency, block_time=block_time)
+    timings = Timings()
+    instrument(get_shared_w3(rpc_url, None, Network.ZKSYNC), timings)
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="syncswap-bench-") as work_dir:
+        # Реестр пулов и профиль газа заглушки не должны попасть в рабочий cache/
+        POOL_REGISTRY.__init__(os.path.join(work_dir, "pool_registry.json"))
+        GAS_PROFILE.__init__(os.path.join(work_dir, "gas_profile.json"))
+        try:
+            for wallets in levels:
+                logger.info(f"⏱️ Бенчмарк: {wallets} одновременных кошельков\n")
+                results.append(await run_level(wallets, node, network, abis, timings, work_dir, atomic))
+        finally:
+            await TRANSPORT_POOL.close()
+            SIGNING_SERVICE.close()
+            GAS_PROFILE.flush()
+            await node_runner.cleanup()
+
+    log_bench_report(results)
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as file:
+            json.dump([asdict(r) for r in results], file, indent=2)
+    return results
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Бенчмарк круга add/burn против заглушки RPC")
+    parser.add_argument("--wallets", type=int, nargs="+", default=list(DEFAULT_LEVELS),
+                        help="уровни числа одновременных кошельков")
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка ответа заглушки, с")
+    parser.add_argument("--block-time", type=float, default=0.5, help="время блока заглушки, с")
+    parser.add_argument("--port", type=int, default=8545)
+    parser.add_argument("--atomic", action="store_true", help="круг одной транзакцией router.multicall")
+    parser.add_argument("--signing-workers", type=int, default=None,
+                        help="процессов подписи (0 — подпись в event loop)")
+    parser.add_argument("--json", dest="json_path", help="сохранить результаты в JSON-файл")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    asyncio.run(run_bench(tuple(args.wallets), args.latency, args.block_time, args.port, args.atomic, args.json_path,
+                          args.signing_workers))
@@ -0,0 +1,103 @@
+from typing import Any, Awaitable, Callable, Hashable, Optional
+from web3.types import RPCEndpoint, RPCResponse
+from web3 import AsyncWeb3
+import asyncio
+import json
+import time
+
+
+class TTLCache:
+    """
+    Асинхронный кэш значений с временем жизни (ttl=None — бессрочно).
+    Одновременные промахи по одному ключу объединяются в один запрос.
+    """
+
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = ttl
+        self._data: dict[Hashable, tuple[float, Any]] = {}
+        self._locks: dict[Hashable, asyncio.Lock] = {}
+
+    def _fresh(self, key: Hashable) -> tuple[bool, Any]:
+        entry = self._data.get(key)
+        if entry is None or (self.ttl is not None and entry[0] < time.monotonic()):
+            return False, None
+        return True, entry[1]
+
+    async def get(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        hit, value = self._fresh(key)
+        if hit:
+            return value
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            hit, value = self._fresh(key)
+            if hit:
+                return value
+            value = await fetch()
+            expires = time.monotonic() + self.ttl if self.ttl is not None else 0.0
+            self._data[key] = (expires, value)
+            return value
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        if key is None:
+            self._data.clear()
+        else:
+            self._data.pop(key, None)
+
+
+# Статический кэш на весь процесс: decimals токенов не меняются, ключ — (chain_id, адрес)
+TOKEN_DECIMALS_CACHE = TTLCache()
+
+# chain_id RPC не меняется: кэшируем ответ eth_chainId на весь процесс (ключ — адрес RPC)
+CHAIN_ID_CACHE = TTLCache()
+
+# Чтения, одинаковые одновременные запросы которых можно обслужить одним ответом
+COALESCED_METHODS = frozenset({
+    "eth_call", "eth_getBalance", "eth_blockNumber", "eth_getBlockByNumber", "eth_getCode",
+    "eth_getStorageAt", "eth_getTransactionReceipt", "eth_getTransactionCount", "eth_getLogs",
+    "eth_feeHistory", "eth_gasPrice", "eth_maxPriorityFeePerGas",
+})
+
+
+async def async_chain_id_cache_middleware(make_request: Callable[[RPCEndpoint, Any], Any], w3: AsyncWeb3):
+    """
+    Отвечает на eth_chainId из кэша. Нужен потому, что validation-middleware web3
+    запрашивает chain_id перед каждым eth_call/estimate_gas/send_transaction.
+    """
+    endpoint = getattr(w3.provider, "endpoint_uri", None)
+
+    async def middleware(method: RPCEndpoint, params: Any) -> RPCResponse:
+        if method != "eth_chainId":
+            return await make_request(method, params)
+
+        async def fetch() -> RPCResponse:
+            response = await make_request(method, params)
+            if "error" in response:
+                raise ValueError(f"eth_chainId вернул ошибку: {response['error']}")
+            return response
+
+        return await CHAIN_ID_CACHE.get(endpoint, fetch)
+
+    return middleware
+
+
+async def coalesce_middleware(make_request: Callable[[RPCEndpoint, Any], Any], w3: AsyncWeb3):
+    """
+    Объединяет одинаковые одновременные чтения: пока запрос (метод, параметры) в полёте, такие же запросы
+    других кошельков ждут его ответ, а не уходят в RPC. Результат не кэшируется — после ответа следующий
+    такой же запрос снова идёт в сеть. Пример: getReserves одного пула от пятидесяти кошельков — один eth_call.
+    """
+    in_flight: dict[tuple[str, str], asyncio.Future] = {}
+
+    async def middleware(method: RPCEndpoint, params: Any) -> RPCResponse:
+        if method not in COALESCED_METHODS:
+            return await make_request(method, params)
+        key = (method, json.dumps(params, sort_keys=True, default=str))
+        future = in_flight.get(key)
+        if future is None or future.get_loop() is not asyncio.get_running_loop():
+            future = asyncio.ensure_future(make_request(method, params))
+            in_flight[key] = future
+            future.add_done_callback(lambda done: in_flight.pop(key, None) if in_flight.get(key) is done else None)
+        # shield: отмена одного ожидающего (таймаут кошелька) не должна отменять запрос для остальных
+        return await asyncio.shield(future)
+
+    return middleware
@@ -2,19 +2,32 @@ from functools import wraps
 from aiohttp import ClientHttpProxyError
 from eth_account import Account
 from web3.middleware.geth_poa import async_geth_poa_middleware
-from web3.exceptions import TransactionNotFound
-from web3 import AsyncWeb3, AsyncHTTPProvider
+from web3 import AsyncWeb3
 from web3.contract import AsyncContract
+from web3.contract.async_contract import AsyncContractFunction
 from typing import Optional, Union
+from web3.exceptions import TransactionNotFound
 from web3.types import TxParams
 from hexbytes import HexBytes
 from client.networks import Network
+from client.contracts import get_contract, load_abi
+from client.multicall import aggregate, call_individually, is_multicall_deployed
+from client.nonce_manager import NonceManager, is_nonce_error, is_already_known_error
+from client.cache import TOKEN_DECIMALS_CACHE, async_chain_id_cache_middleware, coalesce_middleware
+from client.fee_oracle import FeeOracle, FeeQuote
+from client.receipts import ReceiptWaiter
+from client.signer import SIGNING_SERVICE
+from client.simulation import SimulationError, Simulator
+from client.tx_lifecycle import TxLifecycle
+from client.telemetry import telemetry_middleware
+from client.gas_profile import GAS_PROFILE
+from client.transport import PooledHTTPProvider
+from client.rpc_pool import MultiEndpointProvider
 import asyncio
 import logging
-import json
 
-with open("abi/erc20_abi.json", "r", encoding="utf-8") as file:
-    ERC20_ABI = json.load(file)
+# Газ одной транзакции круга, пока профиль газа сети пуст
+DEFAULT_TX_GAS = 70_000
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(
@@ -54,10 +67,48 @@ def retry_on_proxy_error(max_attempts: int = 3, fallback_no_proxy: bool = True):
     return decorator
 
 
+# Общие AsyncWeb3 по (rpc_url, proxy): все Client на одном RPC используют один экземпляр
+_SHARED_W3: dict[tuple[tuple[str, ...], Optional[str]], AsyncWeb3] = {}
+
+
+def _rpc_urls(rpc_url: Union[str, list[str]]) -> tuple[str, ...]:
+    return (rpc_url,) if isinstance(rpc_url, str) else tuple(rpc_url)
+
+
+def build_w3(rpc_url: Union[str, list[str]], proxy: Optional[str] = None,
+             network: Optional[Network] = None) -> AsyncWeb3:
+    """Создаёт AsyncWeb3 поверх общего пула HTTP-сессий; для списка RPC — с маршрутизацией между ними."""
+    urls = _rpc_urls(rpc_url)
+    if len(urls) > 1:
+        w3 = AsyncWeb3(MultiEndpointProvider(list(urls), proxy))
+    else:
+        w3 = AsyncWeb3(PooledHTTPProvider(urls[0], proxy))
+    # Применяем middleware для PoA-сетей
+    if network is not None and network.is_poa:
+        w3.middleware_onion.clear()
+        w3.middleware_onion.inject(async_geth_poa_middleware, layer=0)
+    w3.middleware_onion.inject(async_chain_id_cache_middleware, name="chain_id_cache", layer=0)
+    # Самый внутренний слой: в телеметрию попадают только реальные запросы к RPC
+    w3.middleware_onion.inject(telemetry_middleware(), name="telemetry", layer=0)
+    # Самый внешний слой: дубликаты одновременных чтений не проходят ни middleware, ни ограничитель частоты
+    w3.middleware_onion.add(coalesce_middleware, name="coalesce")
+    return w3
+
+
+def get_shared_w3(rpc_url: Union[str, list[str]], proxy: Optional[str] = None,
+                  network: Optional[Network] = None) -> AsyncWeb3:
+    """Возвращает общий AsyncWeb3 для (rpc_url, proxy), создавая его при первом обращении."""
+    key = (_rpc_urls(rpc_url), proxy)
+    if key not in _SHARED_W3:
+        _SHARED_W3[key] = build_w3(rpc_url, proxy, network)
+    return _SHARED_W3[key]
+
+
 class Client:
-    def __init__(self, token_a_address: str, token_b_address: str, chain_id: int, rpc_url: str, private_key: str,
-                 amount: float, explorer_url: str, proxy: Optional[str] = None):
-        request_kwargs = {"proxy": f"http://{proxy}"} if proxy else {}
+    def __init__(self, token_a_address: str, token_b_address: str, chain_id: int, rpc_url: Union[str, list[str]],
+                 private_key: str,
+                 amount: float, explorer_url: str, proxy: Optional[str] = None, w3: Optional[AsyncWeb3] = None,
+                 multicall_address: Optional[str] = None, ws_url: Optional[str] = None, dry_run: bool = False):
         self.token_a_address = token_a_address
         self.explorer_url = explorer_url
         self.private_key = private_key
@@ -67,6 +118,7 @@ class Client:
         self.amount = amount
         self.rpc_url = rpc_url
         self.proxy = proxy
+        self.multicall_address = multicall_address
 
         # Определяем сеть
         if isinstance(chain_id, str):
@@ -76,16 +128,23 @@ class Client:
 
         self.chain_id = self.network.chain_id
 
-        # Инициализация AsyncWeb3
-        self.w3 = AsyncWeb3(AsyncHTTPProvider(rpc_url, request_kwargs=request_kwargs))
-        # Применяем middleware для PoA-сетей
-        if self.network.is_poa:
-            self.w3.middleware_onion.clear()
-            self.w3.middleware_onion.inject(async_geth_poa_middleware, layer=0)
+        # Инициализация AsyncWeb3 (общий для всех Client с тем же RPC и прокси)
+        self.w3 = w3 if w3 is not None else get_shared_w3(rpc_url, proxy, self.network)
 
         self.eip_1559 = True
         self.address = self.w3.to_checksum_address(
             self.w3.eth.account.from_key(self.private_key).address)
+        self.nonce_manager = NonceManager.for_address(self.w3, self.chain_id, self.address)
+        self.receipt_waiter = ReceiptWaiter.for_w3(self.w3, ws_url)
+        self.fee_oracle = FeeOracle.for_w3(self.w3)
+        self.simulator = Simulator.for_w3(self.w3)
+        # dry_run: транзакции проверяются симуляцией и подписываются, но не отправляются
+        self.dry_run = dry_run
+        self._simulated: set[HexBytes] = set()
+        # Отправленные транзакции кошелька: замена с повышенной комиссией, если зависли
+        self.lifecycle = TxLifecycle(self)
+        # tx_hash -> (ключ профиля газа, результат estimate_gas), чтобы записать оценку в профиль в wait_tx
+        self._gas_keys: dict[HexBytes, tuple[Optional[str], Optional[int]]] = {}
 
     # Получение баланса нативного токена
     async def get_native_balance(self) -> float:
@@ -95,7 +154,7 @@ class Client:
 
     async def get_allowance(self, token_address: str, owner: str, spender: str) -> int:
         try:
-            contract = await self.get_contract(token_address, ERC20_ABI)
+            contract = await self.get_contract(token_address, load_abi("erc20"))
             allowance = await contract.functions.allowance(
                 self.w3.to_checksum_address(owner),
                 self.w3.to_checksum_address(spender)
@@ -114,9 +173,16 @@ class Client:
         if amount_wei is None:
             amount_wei = self.to_wei_main(self.amount, token_address)
 
-        tx = await wrap_native_token(self.w3, self.network.name, amount_wei, self.address)
-        signed = self.w3.eth.account.sign_transaction(tx, self.private_key)
-        tx_hash = await self.w3.eth.send_raw_transaction(signed.raw_transaction)
+        fees = (await self.get_fee_quote()).tx_params(self.eip_1559)
+        nonce = await self.nonce_manager.next_nonce()
+        try:
+            tx = await wrap_native_token(self.w3, self.network.name, amount_wei, self.address,
+                                         nonce=nonce, fees=fees)
+            tx_hash = await self._sign_and_send_raw(tx)
+        except Exception:
+            # Сборка (estimate_gas) упала до отправки — иначе взятый nonce оставил бы дыру перед следующими
+            await self.nonce_manager.resync()
+            raise
         logger.info(f"🚀 Отправлен wrap-тx: {tx_hash.hex()}\n")
         return tx_hash.hex()
 
@@ -126,17 +192,23 @@ class Client:
         Разворачивает WETH/WBNB/... обратно в нативный токен.
         """
         from utils.wrappers import unwrap_native_token
-        tx = await unwrap_native_token(self.w3, self.network.name, amount_wei, self.address)
-        signed = self.w3.eth.account.sign_transaction(tx, self.private_key)
-        tx_hash = await self.w3.eth.send_raw_transaction(signed.raw_transaction)
+        fees = (await self.get_fee_quote()).tx_params(self.eip_1559)
+        nonce = await self.nonce_manager.next_nonce()
+        try:
+            tx = await unwrap_native_token(self.w3, self.network.name, amount_wei, self.address,
+                                           nonce=nonce, fees=fees)
+            tx_hash = await self._sign_and_send_raw(tx)
+        except Exception:
+            # Как в wrap_native: неиспользованный nonce нельзя оставлять за собой
+            await self.nonce_manager.resync()
+            raise
         logger.info(f"🚀 Отправлен unwrap-тx: {tx_hash.hex()}\n")
         return tx_hash.hex()
 
     # Получение баланса ERC20
     async def get_erc20_balance(self) -> float | int:
 
-        contract = self.w3.eth.contract(
-            address=self.w3.to_checksum_address(self.token_a_address), abi=ERC20_ABI)
+        contract = await self.get_contract(self.token_a_address, load_abi("erc20"))
         try:
             balance = await contract.functions.balanceOf(self.address).call()
             return balance
@@ -146,30 +218,41 @@ class Client:
 
     # Создание объекта контракт для дальнейшего обращения к нему
     async def get_contract(self, contract_address: str, abi: list) -> AsyncContract:
-        return self.w3.eth.contract(
-            address=self.w3.to_checksum_address(contract_address), abi=abi
-        )
+        return get_contract(self.w3, contract_address, abi)
 
-    # Получение суммы газа за транзакцию
-    async def get_tx_fee(self) -> int:
-        try:
-            fee_history = await self.w3.eth.fee_history(10, "latest", [50])
-            base_fee = fee_history['baseFeePerGas'][-1]
-            max_priority_fee = await self.w3.eth.max_priority_fee
-            estimated_gas = 70_000
-            max_fee_per_gas = (base_fee + max_priority_fee) * estimated_gas
+    # Пакетное чтение view-функций за один RPC-запрос
+    async def batch_call(self, calls: list, block_identifier="latest") -> list:
+        """
+        Выполняет view-вызовы (например, pool.functions.totalSupply()) одним eth_call через Multicall3,
+        так что все значения относятся к одному блоку. Если агрегатор не задеплоен — отдельные вызовы по одному блоку.
+        """
+        if await is_multicall_deployed(self.w3, self.multicall_address):
+            return await aggregate(self.w3, self.multicall_address, calls, block_identifier)
+        return await call_individually(self.w3, calls, block_identifier)
 
-            return max_fee_per_gas
-        except Exception as e:
-            logger.warning(f"Ошибка при расчёте комиссии, используем fallback: {e}")
-            fallback_gas_price = await self.w3.eth.gas_price
-            return fallback_gas_price * 70_000
+    # Котировка комиссии из оракула сети, общего для всех кошельков на этом RPC
+    async def get_fee_quote(self, speed: Optional[str] = None) -> FeeQuote:
+        return await self.fee_oracle.quote(speed)
+
+    # Получение decimals токена (кэшируется на весь процесс)
+    async def get_decimals(self, token_address: str) -> int:
+        async def fetch() -> int:
+            contract = await self.get_contract(token_address, load_abi("erc20"))
+            return await contract.functions.decimals().call()
+
+        return await TOKEN_DECIMALS_CACHE.get((self.chain_id, token_address.lower()), fetch)
+
+    # Получение суммы газа за транзакцию
+    async def get_tx_fee(self, gas_limit: Optional[int] = None) -> int:
+        # Без явного лимита берём наибольшую оценку газа из профиля сети
+        estimated_gas = gas_limit or GAS_PROFILE.typical(self.chain_id) or DEFAULT_TX_GAS
+        quote = await self.get_fee_quote()
+        return (quote.base_fee + quote.max_priority_fee_per_gas) * estimated_gas
 
     # Преобразование в веи
     async def to_wei_main(self, number: int | float, token_address: Optional[str] = None):
         if token_address:
-            contract = await self.get_contract(token_address, ERC20_ABI)
-            decimals = await contract.functions.decimals().call()
+            decimals = await self.get_decimals(token_address)
         else:
             decimals = 18
 
@@ -186,8 +269,7 @@ class Client:
     # Преобразование из веи
     async def from_wei_main(self, number: int | float, token_address: Optional[str] = None):
         if token_address:
-            contract = await self.get_contract(token_address, ERC20_ABI)
-            decimals = await contract.functions.decimals().call()
+            decimals = await self.get_decimals(token_address)
         else:
             decimals = 18
 
@@ -211,7 +293,7 @@ class Client:
         amount_out_min = int(quote_data['minReceiveAmount'])
 
         # Строим транзакцию для обмена
-        contract = await self.get_contract(contract_address, ERC20_ABI)
+        contract = await self.get_contract(contract_address, load_abi("erc20"))
 
         tx_data = contract.encodeABI(
             fn_name="swap",
@@ -228,10 +310,14 @@ class Client:
         return tx
 
     # Approve
-    async def approve_lp_token(self, lp_token_contract, spender, amount):
+    async def approve_lp_token(self, lp_token_contract, spender, amount, wait: bool = True):
+        """
+        Отправляет approve. При wait=False возвращает хэш сразу после отправки,
+        чтобы следующую транзакцию можно было отправить следом со следующим nonce.
+        """
         owner = self.address
-        nonce = await self.w3.eth.get_transaction_count(owner)
-        chain_id = await self.w3.eth.chain_id
+        nonce = await self.nonce_manager.next_nonce()
+        chain_id = self.chain_id
 
         tx_params = {
             'from': owner,
@@ -239,99 +325,151 @@ class Client:
             'gas': 300_000,
             'chainId': chain_id
         }
-
-        if self.eip_1559:
-            base_fee = await self.w3.eth.gas_price
-            max_priority_fee = int(base_fee * 0.1) or 1_000_000  # Минимальная чаевая
-            max_fee = int(base_fee * 1.5 + max_priority_fee)
-
-            tx_params.update({
-                'maxPriorityFeePerGas': max_priority_fee,
-                'maxFeePerGas': max_fee,
-                'type': '0x2'
-            })
-        else:
-            tx_params['gasPrice'] = int(await self.w3.eth.gas_price * 1.25)
+        tx_params.update((await self.get_fee_quote()).tx_params(self.eip_1559))
 
         # Формирование транзакции approve
         tx = await lp_token_contract.functions.approve(spender, amount).build_transaction(tx_params)
 
         # Подпись и отправка
-        signed_tx = self.w3.eth.account.sign_transaction(tx, self.private_key)
-        tx_hash = await self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-        receipt = await self.w3.eth.wait_for_transaction_receipt(tx_hash)
+        tx_hash = await self._sign_and_send_raw(tx)
+        if not wait or self.dry_run:
+            return tx_hash
+        receipt = await self.lifecycle.wait(tx_hash)
 
         return receipt
 
     # Подготовка транзакции
     async def prepare_tx(self, value: Union[int, float] = 0) -> TxParams:
         transaction: TxParams = {
-            "chainId": await self.w3.eth.chain_id,
-            "nonce": await self.w3.eth.get_transaction_count(self.address),
+            "chainId": self.chain_id,
+            "nonce": await self.nonce_manager.next_nonce(),
             "from": self.address,
             "value": self.w3.to_wei(value, "ether"),
         }
-
-        if self.eip_1559:
-            base_fee = await self.w3.eth.gas_price
-            max_priority_fee_per_gas = await self.w3.eth.max_priority_fee or base_fee
-            max_fee_per_gas = int(base_fee * 1.25 + max_priority_fee_per_gas)
-
-            transaction.update({
-                "maxPriorityFeePerGas": max_priority_fee_per_gas,
-                "maxFeePerGas": max_fee_per_gas,
-                "type": "0x2",
-            })
-        else:
-            transaction["gasPrice"] = int((await self.w3.eth.gas_price) * 1.25)
-
+        transaction.update((await self.get_fee_quote()).tx_params(self.eip_1559))
         return transaction
 
     # Подпись и отправка транзакции
+    # Транзакция вызова контракта без build_transaction: тот сам вызывает estimate_gas, если нет "gas"
+    async def build_contract_tx(self, function: AsyncContractFunction, value: Union[int, float] = 0) -> TxParams:
+        transaction = await self.prepare_tx(value=value)
+        transaction.update({
+            "to": function.address,
+            "data": function._encode_transaction_data(),
+        })
+        return transaction
+
+    # Лимит газа из профиля по форме вызова или None, если профиль ещё не набран
+    def profiled_gas(self, transaction: TxParams) -> Optional[int]:
+        return GAS_PROFILE.estimate(GAS_PROFILE.key(self.chain_id, transaction))
+
     async def sign_and_send_tx(self, transaction: TxParams, without_gas: bool = False):
         try:
+            gas_key = GAS_PROFILE.key(self.chain_id, transaction)
+            # estimate_gas сам выполняет транзакцию, отдельная симуляция нужна, только если газ взят из профиля.
+            # При without_gas транзакция зависит от ещё не подтверждённой предыдущей (approve) — её не симулируем
+            preflight = False
+            estimated = None
             if not without_gas:
-                transaction["gas"] = int((await self.w3.eth.estimate_gas(transaction)) * 1.5)
-
-            signed = self.w3.eth.account.sign_transaction(transaction, self.private_key)
-            signed_raw_tx = signed.raw_transaction
-            logger.info("✅ Транзакция подписана\n")
-
-            tx_hash_bytes = await self.w3.eth.send_raw_transaction(signed_raw_tx)
+                # Лимит из профиля по форме вызова; estimate_gas — только при промахе
+                profiled = self.profiled_gas(transaction)
+                preflight = profiled is not None
+                if profiled is None:
+                    estimated = await self.w3.eth.estimate_gas(transaction)
+                transaction["gas"] = profiled or int(estimated * 1.5)
+
+            tx_hash_bytes = await self._sign_and_send_raw(transaction, preflight=preflight)
+            self._gas_keys[HexBytes(tx_hash_bytes)] = (gas_key, estimated)
             tx_hash_hex = self.w3.to_hex(tx_hash_bytes)
-            logger.info("✅ Транзакция отправлена: %s\n", tx_hash_hex)
+            if not self.dry_run:
+                logger.info("✅ Транзакция отправлена: %s\n", tx_hash_hex)
 
             return tx_hash_hex
         except Exception as e:
             logger.error(f"❌ Ошибка при отправке транзакции: {e}")
+            # nonce из prepare_tx так и не был использован — синхронизируемся с нодой
+            await self.nonce_manager.resync()
             return None
 
+    # Подпись и отправка с локальным nonce и пересинхронизацией при ошибках nonce
+    async def _sign_and_send_raw(self, transaction: TxParams, preflight: bool = True) -> HexBytes:
+        if "nonce" not in transaction:
+            transaction["nonce"] = await self.nonce_manager.next_nonce()
+        if preflight or self.dry_run:
+            # Обречённая транзакция отклоняется до отправки: не тратит газ и время на ожидание receipt
+            error = await self.simulator.simulate(transaction)
+            if error:
+                await self.nonce_manager.resync()
+                raise SimulationError(f"Транзакция не пройдёт: {error}")
+        signed = await SIGNING_SERVICE.sign(transaction, self.private_key)
+        logger.info("✅ Транзакция подписана\n")
+        if self.dry_run:
+            self._simulated.add(HexBytes(signed.hash))
+            logger.info("🧪 Dry-run: транзакция прошла симуляцию и не отправляется\n")
+            return HexBytes(signed.hash)
+        try:
+            tx_hash = await self.w3.eth.send_raw_transaction(signed.raw_transaction)
+        except Exception as e:
+            if not is_already_known_error(e):
+                # Любая неудачная отправка оставляет дыру в локальных nonce — синхронизируемся с нодой
+                await self.nonce_manager.resync()
+                if not is_nonce_error(e):
+                    raise
+                logger.warning(f"⚠️ Ошибка nonce ({e}), повторная отправка с актуальным nonce")
+                transaction["nonce"] = await self.nonce_manager.next_nonce()
+                signed = await SIGNING_SERVICE.sign(transaction, self.private_key)
+                await self.w3.eth.send_raw_transaction(signed.raw_transaction)
+            tx_hash = HexBytes(signed.hash)
+        self.lifecycle.track(transaction, tx_hash)
+        return tx_hash
+
     # Ожидание результата транзакции
-    async def wait_tx(self, tx_hash: Union[str, HexBytes], explorer_url: Optional[str] = None) -> bool:
-        total_time = 0
-        timeout = 120
-        poll_latency = 10
+    async def wait_tx(self, tx_hash: Union[str, HexBytes], explorer_url: Optional[str] = None,
+                      timeout: float = 120) -> bool:
+        return await self.wait_tx_status(tx_hash, explorer_url, timeout) is True
 
+    async def wait_tx_status(self, tx_hash: Union[str, HexBytes], explorer_url: Optional[str] = None,
+                             timeout: float = 120) -> Optional[bool]:
+        """
+        Результат транзакции: True — выполнена, False — реверт или точно не попадёт в блок
+        (receipt нет, а её nonce кошелёк уже использовал), None — не подтвердилась за timeout, но ещё может.
+        """
         tx_hash_bytes = HexBytes(tx_hash)  # Приведение к HexBytes
 
-        while True:
-            try:
-                receipt = await self.w3.eth.get_transaction_receipt(tx_hash_bytes)
-                status = receipt.get("status")
-                if status == 1:
-                    logger.info(f"✅ Транзакция выполнена успешно: {explorer_url}/tx/{tx_hash_bytes.hex()}\n")
-                    return True
-                elif status is None:
-                    await asyncio.sleep(poll_latency)
-                else:
-                    logger.error(f"❌ Транзакция не выполнена: {explorer_url}/tx/{tx_hash_bytes.hex()}")
-                    return False
-            except TransactionNotFound:
-                if total_time > timeout:
-                    logger.warning(f"❌ Транзакция {tx_hash_bytes.hex()} не подтвердилась за 120 секунд")
-                    return False
-                total_time += poll_latency
-                await asyncio.sleep(poll_latency)
-            except Exception as e:
-                logger.error(f"❌ Ошибка при получении receipt: {e}")
+        gas_key, gas_estimate = self._gas_keys.pop(tx_hash_bytes, (None, None))
+        if tx_hash_bytes in self._simulated:
+            self._simulated.discard(tx_hash_bytes)
+            return True
+        try:
+            # Зависшая транзакция заменяется версией с тем же nonce; receipt — от той, что попала в блок
+            receipt = await self.lifecycle.wait(tx_hash_bytes, timeout)
+            if receipt is None and await self._is_dropped(tx_hash_bytes):
+                logger.warning(f"❌ Транзакция {tx_hash_bytes.hex()} не попадёт в блок: её nonce уже использован")
                 return False
+        except Exception as e:
+            logger.error(f"❌ Ошибка при получении receipt: {e}")
+            return None
+
+        if receipt is None:
+            logger.warning(f"❌ Транзакция {tx_hash_bytes.hex()} не подтвердилась за {timeout} секунд")
+            return None
+        if receipt.get("status") == 1:
+            if gas_estimate is not None:
+                GAS_PROFILE.record(gas_key, gas_estimate)
+            logger.info(f"✅ Транзакция выполнена успешно: {explorer_url}/tx/{tx_hash_bytes.hex()}\n")
+            return True
+        # После реверта профилю не доверяем: следующий такой вызов снова пройдёт через estimate_gas
+        GAS_PROFILE.invalidate(gas_key)
+        logger.error(f"❌ Транзакция не выполнена: {explorer_url}/tx/{tx_hash_bytes.hex()}")
+        return False
+
+    async def _is_dropped(self, tx_hash: HexBytes) -> bool:
+        """Транзакция без receipt, чей nonce уже занят подтверждённой транзакцией (заменой, отменой или другой)."""
+        try:
+            transaction = await self.w3.eth.get_transaction(tx_hash)
+        except TransactionNotFound:
+            # Нода транзакцию не знает — nonce не проверить, считаем, что она ещё может подтвердиться
+            return False
+        if transaction.get("blockNumber") is not None:
+            return False
+        return transaction["nonce"] < await self.w3.eth.get_transaction_count(self.address, "latest")
@@ -0,0 +1,97 @@
+from eth_abi import decode, encode
+from eth_utils import function_abi_to_4byte_selector
+from web3._utils.abi import get_abi_input_types, get_abi_output_types
+from web3.contract import AsyncContract
+from web3 import AsyncWeb3
+from dataclasses import dataclass
+import weakref
+import json
+import os
+
+ABI_DIR = "abi"
+
+# Экземпляры контрактов: {w3: {(адрес, id(abi)): (abi, контракт)}}
+_CONTRACT_CACHE: "weakref.WeakKeyDictionary[AsyncWeb3, dict]" = weakref.WeakKeyDictionary()
+# Скомпилированные функции ABI: {id(abi): (abi, {имя: CompiledFunction})}
+_COMPILED_CACHE: dict[int, tuple[list, dict]] = {}
+
+
+# Загруженные ABI по имени файла: {name: abi}
+_ABI_CACHE: dict[str, list] = {}
+
+
+def load_abi(name: str) -> list:
+    """
+    ABI из abi/<name>_abi.json. Файл читается при первом обращении, дальше возвращается тот же объект —
+    это важно для кэшей, которые ключуются по id(abi).
+    """
+    abi = _ABI_CACHE.get(name)
+    if abi is None:
+        with open(os.path.join(ABI_DIR, f"{name}_abi.json"), "r", encoding="utf-8") as file:
+            abi = _ABI_CACHE[name] = json.load(file)
+    return abi
+
+
+def preload_abis(abis: dict[str, list]) -> None:
+    """Подставляет ABI из собранного бандла конфигурации, чтобы load_abi не читал файлы."""
+    for name, abi in abis.items():
+        _ABI_CACHE.setdefault(name, abi)
+
+
+def abi_names() -> list[str]:
+    return sorted(entry[:-len("_abi.json")] for entry in os.listdir(ABI_DIR) if entry.endswith("_abi.json"))
+
+
+@dataclass(frozen=True)
+class CompiledFunction:
+    """Селектор и типы аргументов функции, посчитанные один раз: кодирование без поиска по ABI."""
+    name: str
+    selector: bytes
+    input_types: tuple[str, ...]
+    output_types: tuple[str, ...]
+
+    def encode(self, *args) -> bytes:
+        return self.selector + encode(self.input_types, args)
+
+    def encode_hex(self, *args) -> str:
+        return "0x" + self.encode(*args).hex()
+
+    def decode_output(self, data: bytes):
+        decoded = decode(self.output_types, data)
+        return decoded[0] if len(decoded) == 1 else list(decoded)
+
+
+def compile_abi(abi: list) -> dict[str, CompiledFunction]:
+    """Функции ABI по имени (для перегруженных — по первой и по полной сигнатуре name(types))."""
+    cached = _COMPILED_CACHE.get(id(abi))
+    if cached is not None and cached[0] is abi:
+        return cached[1]
+
+    functions: dict[str, CompiledFunction] = {}
+    for entry in abi:
+        if entry.get("type") != "function":
+            continue
+        compiled = CompiledFunction(
+            name=entry["name"],
+            selector=function_abi_to_4byte_selector(entry),
+            input_types=tuple(get_abi_input_types(entry)),
+            output_types=tuple(get_abi_output_types(entry)),
+        )
+        functions.setdefault(entry["name"], compiled)
+        functions[f"{entry['name']}({','.join(compiled.input_types)})"] = compiled
+
+    _COMPILED_CACHE[id(abi)] = (abi, functions)
+    return functions
+
+
+def get_contract(w3: AsyncWeb3, contract_address: str, abi: list) -> AsyncContract:
+    """Экземпляр контракта, создаваемый один раз на (w3, адрес, abi)."""
+    contracts = _CONTRACT_CACHE.setdefault(w3, {})
+    address = w3.to_checksum_address(contract_address)
+    key = (address, id(abi))
+    cached = contracts.get(key)
+    # Храним сам abi рядом с контрактом, чтобы id(abi) не мог переиспользоваться
+    if cached is None or cached[0] is not abi:
+        cached = (abi, w3.eth.contract(address=address, abi=abi))
+        contracts[key] = cached
+    return cached[1]
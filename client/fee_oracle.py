@@ -0,0 +1,152 @@
+from dataclasses import dataclass
+from typing import Optional
+from web3 import AsyncWeb3
+from client.telemetry import detach_span
+import asyncio
+import logging
+import statistics
+import time
+import weakref
+
+logger = logging.getLogger(__name__)
+
+# Скорость -> (перцентиль чаевых в fee_history, запас на рост base fee)
+FEE_SPEEDS = {
+    "slow": (10, 1.125),    # запас на один блок роста base fee
+    "normal": (50, 1.25),
+    "fast": (90, 2.0),      # выдерживает ~6 полных блоков подряд
+}
+DEFAULT_FEE_SETTINGS = {
+    "speed": "normal",          # скорость, с которой строятся транзакции
+    "refresh_interval": 3.0,    # период фонового обновления, с
+}
+FEE_HISTORY_BLOCKS = 20
+# Фоновое обновление останавливается, если котировки столько секунд никто не спрашивал
+IDLE_STOP_AFTER = 60.0
+# Котировка старше стольких интервалов обновления считается устаревшей и обновляется на месте
+STALE_INTERVALS = 5
+
+
+@dataclass(frozen=True)
+class FeeQuote:
+    """Параметры комиссии EIP-1559 для одной скорости."""
+    base_fee: int
+    max_priority_fee_per_gas: int
+    max_fee_per_gas: int
+
+    def tx_params(self, eip_1559: bool = True) -> dict:
+        if not eip_1559:
+            return {"gasPrice": self.max_fee_per_gas}
+        return {
+            "maxPriorityFeePerGas": self.max_priority_fee_per_gas,
+            "maxFeePerGas": self.max_fee_per_gas,
+            "type": "0x2",
+        }
+
+
+class FeePolicy:
+    """Общие для всех сетей настройки оракула комиссий."""
+
+    def __init__(self, **settings):
+        self.settings = dict(DEFAULT_FEE_SETTINGS)
+        self.configure(**settings)
+
+    def configure(self, **settings) -> None:
+        unknown = set(settings) - set(DEFAULT_FEE_SETTINGS)
+        if unknown:
+            raise ValueError(f"Неизвестные параметры оракула комиссий: {sorted(unknown)}")
+        if settings.get("speed", "normal") not in FEE_SPEEDS:
+            raise ValueError(f"speed должен быть одним из: {', '.join(FEE_SPEEDS)}")
+        self.settings.update(settings)
+
+
+FEE_POLICY = FeePolicy()
+
+
+class FeeOracle:
+    """
+    Оракул комиссий сети, общий для всех кошельков на одном AsyncWeb3. Фоновый цикл раз в
+    refresh_interval запрашивает fee_history и считает котировки slow/normal/fast: чаевые — медиана
+    перцентиля наград за последние блоки, max fee — base fee следующего блока с запасом плюс чаевые.
+    Построители транзакций берут готовую котировку без RPC-запроса.
+    """
+
+    _registry: "weakref.WeakKeyDictionary[AsyncWeb3, FeeOracle]" = weakref.WeakKeyDictionary()
+
+    def __init__(self, w3: AsyncWeb3, policy: FeePolicy = FEE_POLICY):
+        self.w3 = w3
+        self.policy = policy
+        self.quotes: dict[str, FeeQuote] = {}
+        self.updated_at = 0.0
+        self._last_used = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @classmethod
+    def for_w3(cls, w3: AsyncWeb3) -> "FeeOracle":
+        oracle = cls._registry.get(w3)
+        if oracle is None:
+            oracle = cls(w3)
+            cls._registry[w3] = oracle
+        return oracle
+
+    async def quote(self, speed: Optional[str] = None) -> FeeQuote:
+        """Последняя котировка; RPC-запрос делается только при первом обращении или если фон отстал."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Задача и блокировка от закрытого event loop: котировки оставляем, цикл запускаем заново
+            self._loop, self._task, self._lock = loop, None, asyncio.Lock()
+        self._last_used = time.monotonic()
+
+        interval = self.policy.settings["refresh_interval"]
+        if not self.quotes or time.monotonic() - self.updated_at > interval * STALE_INTERVALS:
+            # Одновременные промахи всех кошельков объединяются в один запрос
+            updated_at = self.updated_at
+            async with self._lock:
+                if self.updated_at == updated_at:
+                    await self.refresh()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return self.quotes[speed or self.policy.settings["speed"]]
+
+    async def refresh(self) -> None:
+        percentiles = [percentile for percentile, _ in FEE_SPEEDS.values()]
+        try:
+            history = await self.w3.eth.fee_history(FEE_HISTORY_BLOCKS, "latest", percentiles)
+            # Последний элемент baseFeePerGas — base fee следующего, ещё не созданного блока
+            base_fee = history["baseFeePerGas"][-1]
+            rewards = [row for row in history.get("reward") or [] if row]
+        except Exception as e:
+            # Сеть без EIP-1559: котировки из gas_price, все скорости с одинаковыми чаевыми
+            logger.debug(f"fee_history недоступен, используем gas_price: {e}")
+            base_fee, rewards = await self.w3.eth.gas_price, []
+
+        fallback_priority = None
+        if not any(any(row) for row in rewards):
+            # Награды нулевые (L2 без аукциона чаевых) — берём рекомендацию ноды
+            try:
+                fallback_priority = await self.w3.eth.max_priority_fee
+            except Exception:
+                fallback_priority = 0
+
+        quotes = {}
+        for column, (speed, (_, headroom)) in enumerate(FEE_SPEEDS.items()):
+            if fallback_priority is None:
+                priority = int(statistics.median(row[column] for row in rewards))
+            else:
+                priority = fallback_priority
+            quotes[speed] = FeeQuote(base_fee=base_fee, max_priority_fee_per_gas=priority,
+                                     max_fee_per_gas=int(base_fee * headroom) + priority)
+        self.quotes = quotes
+        self.updated_at = time.monotonic()
+
+    async def _run(self) -> None:
+        # Цикл общий для всех кошельков сети — не относим его запросы к span того, кто его запустил
+        detach_span()
+        while time.monotonic() - self._last_used < IDLE_STOP_AFTER:
+            await asyncio.sleep(self.policy.settings["refresh_interval"])
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"⚠️ Ошибка обновления комиссий: {e}")
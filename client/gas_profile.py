@@ -0,0 +1,101 @@
+from web3.types import TxParams
+from typing import Optional
+import logging
+import json
+import os
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILE_PATH = "cache/gas_profile.json"
+# Сколько подтверждённых транзакций нужно, чтобы доверять профилю вместо estimate_gas
+MIN_SAMPLES = 2
+# Границы запаса над максимальной наблюдавшейся оценкой
+MIN_MARGIN = 0.1
+MAX_MARGIN = 0.5
+# Профиль пишется на диск после стольких новых наблюдений, остальное — в flush() при завершении
+SAVE_EVERY = 20
+
+
+class GasProfile:
+    """
+    Профиль лимита газа по форме вызова: (сеть, контракт, селектор функции).
+    Наблюдения — результаты estimate_gas транзакций, которые затем успешно подтвердились: gasUsed из receipt
+    для этого не годится — в zkSync Era он считается после возврата газа и заметно меньше нужного лимита
+    (публикация данных в L1). Оценка = максимум наблюдений + запас, который растёт с разбросом наблюдений.
+    После реверта запись сбрасывается и снова нужен estimate_gas.
+    """
+
+    def __init__(self, path: str = DEFAULT_PROFILE_PATH):
+        self.path = path
+        self._profiles: dict[str, dict] = self._load()
+        self._unsaved = 0
+
+    def _load(self) -> dict[str, dict]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def save(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(self._profiles, file, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+        self._unsaved = 0
+
+    def flush(self) -> None:
+        """Сохраняет накопленные, но ещё не записанные наблюдения."""
+        if self._unsaved:
+            self.save()
+
+    @staticmethod
+    def key(chain_id: int, transaction: TxParams) -> Optional[str]:
+        to = transaction.get("to")
+        if not to:
+            return None
+        data = transaction.get("data") or "0x"
+        data = data.hex() if isinstance(data, (bytes, bytearray)) else str(data)
+        selector = data[2:10] if data.startswith("0x") else data[:8]
+        return f"{chain_id}:{str(to).lower()}:{selector or 'transfer'}"
+
+    def estimate(self, key: Optional[str]) -> Optional[int]:
+        """Лимит газа из профиля или None, если данных недостаточно."""
+        profile = self._profiles.get(key) if key else None
+        if not profile or profile["samples"] < MIN_SAMPLES:
+            return None
+        spread = (profile["max"] - profile["min"]) / profile["max"] if profile["max"] else 0
+        margin = min(max(2 * spread, MIN_MARGIN), MAX_MARGIN)
+        return int(profile["max"] * (1 + margin))
+
+    def record(self, key: Optional[str], gas_estimate: int) -> None:
+        if not key:
+            return
+        profile = self._profiles.get(key)
+        if profile is None:
+            self._profiles[key] = {"samples": 1, "min": gas_estimate, "max": gas_estimate}
+        else:
+            profile["samples"] += 1
+            profile["min"] = min(profile["min"], gas_estimate)
+            profile["max"] = max(profile["max"], gas_estimate)
+        # Запись файла на каждый receipt блокировала бы event loop — пишем пачками
+        self._unsaved += 1
+        if self._unsaved >= SAVE_EVERY:
+            self.save()
+
+    def invalidate(self, key: Optional[str]) -> None:
+        if key and self._profiles.pop(key, None) is not None:
+            logger.info(f"🧹 Профиль газа {key} сброшен после реверта")
+            self._unsaved += 1
+
+    def typical(self, chain_id: int) -> Optional[int]:
+        """Наибольшая наблюдавшаяся оценка газа в сети — для оценки комиссии до сборки транзакции."""
+        prefix = f"{chain_id}:"
+        values = [p["max"] for k, p in self._profiles.items() if k.startswith(prefix)]
+        return max(values) if values else None
+
+
+GAS_PROFILE = GasProfile()
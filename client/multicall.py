@@ -0,0 +1,57 @@
+from web3._utils.abi import get_abi_output_types, map_abi_data
+from web3._utils.normalizers import BASE_RETURN_NORMALIZERS
+from web3.contract.async_contract import AsyncContractFunction
+from web3.types import BlockIdentifier
+from hexbytes import HexBytes
+from typing import Optional
+from web3 import AsyncWeb3
+from client.contracts import compile_abi, load_abi
+import asyncio
+import weakref
+
+# Кэш проверки наличия Multicall3: {w3: {адрес: задеплоен ли}}
+_DEPLOYED_CACHE: "weakref.WeakKeyDictionary[AsyncWeb3, dict]" = weakref.WeakKeyDictionary()
+
+
+def decode_output(w3: AsyncWeb3, fn: AsyncContractFunction, return_data: bytes):
+    """Декодирует ответ view-функции так же, как это делает ContractFunction.call()."""
+    output_types = get_abi_output_types(fn.abi)
+    decoded = map_abi_data(BASE_RETURN_NORMALIZERS, output_types, w3.codec.decode(output_types, return_data))
+    return decoded[0] if len(decoded) == 1 else list(decoded)
+
+
+async def is_multicall_deployed(w3: AsyncWeb3, multicall_address: Optional[str]) -> bool:
+    """Проверяет (один раз на w3) что агрегатор задеплоен в сети."""
+    if not multicall_address:
+        return False
+    deployed = _DEPLOYED_CACHE.setdefault(w3, {})
+    if multicall_address not in deployed:
+        code = await w3.eth.get_code(w3.to_checksum_address(multicall_address))
+        deployed[multicall_address] = len(code) > 0
+    return deployed[multicall_address]
+
+
+async def aggregate(w3: AsyncWeb3, multicall_address: str, calls: list[AsyncContractFunction],
+                    block_identifier: BlockIdentifier = "latest") -> list:
+    """Выполняет все вызовы одним eth_call через Multicall3.aggregate3 — результаты из одного блока."""
+    requests = [(fn.address, False, HexBytes(fn._encode_transaction_data())) for fn in calls]
+    results = await aggregate_raw(w3, multicall_address, requests, block_identifier)
+    return [decode_output(w3, fn, return_data) for fn, (_, return_data) in zip(calls, results)]
+
+
+async def aggregate_raw(w3: AsyncWeb3, multicall_address: str, requests: list[tuple[str, bool, bytes]],
+                        block_identifier: BlockIdentifier = "latest") -> list[tuple[bool, bytes]]:
+    """aggregate3 над готовыми calldata (адрес, allowFailure, данные); возвращает (успех, ответ) по каждому вызову."""
+    # aggregate3 кодируется заранее скомпилированным кодировщиком — без поиска функции по ABI на каждый вызов
+    aggregate3 = compile_abi(load_abi("multicall3"))["aggregate3"]
+    return_data = await w3.eth.call({"to": w3.to_checksum_address(multicall_address),
+                                     "data": aggregate3.encode_hex(requests)}, block_identifier)
+    return aggregate3.decode_output(return_data)
+
+
+async def call_individually(w3: AsyncWeb3, calls: list[AsyncContractFunction],
+                            block_identifier: Optional[BlockIdentifier] = None) -> list:
+    """Запасной путь: параллельные eth_call, закреплённые за одним номером блока."""
+    if block_identifier is None or block_identifier == "latest":
+        block_identifier = await w3.eth.block_number
+    return list(await asyncio.gather(*(fn.call(block_identifier=block_identifier) for fn in calls)))
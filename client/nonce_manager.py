@@ -0,0 +1,73 @@
+from web3 import AsyncWeb3
+from typing import Optional
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Фрагменты сообщений нод, после которых локальный nonce нужно пересинхронизировать
+NONCE_ERROR_MARKERS = (
+    "nonce too low",
+    "nonce too high",
+    "invalid nonce",
+    "replacement transaction underpriced",
+)
+
+# Транзакция с таким хэшем уже в мемпуле — повторно отправлять не нужно
+ALREADY_KNOWN_MARKERS = (
+    "already known",
+    "known transaction",
+)
+
+
+def is_nonce_error(error: Exception) -> bool:
+    """Проверяет, что ошибка отправки вызвана рассинхронизацией nonce."""
+    message = str(error).lower()
+    return any(marker in message for marker in NONCE_ERROR_MARKERS)
+
+
+def is_already_known_error(error: Exception) -> bool:
+    """Проверяет, что нода уже видела эту транзакцию."""
+    message = str(error).lower()
+    return any(marker in message for marker in ALREADY_KNOWN_MARKERS)
+
+
+class NonceManager:
+    """
+    Локальный счётчик nonce для одного адреса в одной сети.
+    Pending-nonce запрашивается у ноды один раз, дальше nonce выдаются локально,
+    поэтому несколько транзакций можно отправить подряд, не дожидаясь receipt.
+    """
+
+    _registry: dict[tuple[int, str], "NonceManager"] = {}
+
+    def __init__(self, w3: AsyncWeb3, address: str):
+        self.w3 = w3
+        self.address = address
+        self._next_nonce: Optional[int] = None
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def for_address(cls, w3: AsyncWeb3, chain_id: int, address: str) -> "NonceManager":
+        """Один менеджер на (сеть, адрес), даже если для кошелька создано несколько Client."""
+        key = (chain_id, address.lower())
+        manager = cls._registry.get(key)
+        if manager is None:
+            manager = cls(w3, address)
+            cls._registry[key] = manager
+        return manager
+
+    async def next_nonce(self) -> int:
+        """Выдаёт следующий nonce, при первом обращении синхронизируясь с нодой."""
+        async with self._lock:
+            if self._next_nonce is None:
+                self._next_nonce = await self.w3.eth.get_transaction_count(self.address, "pending")
+            nonce = self._next_nonce
+            self._next_nonce += 1
+            return nonce
+
+    async def resync(self) -> None:
+        """Сбрасывает локальный счётчик: следующий nonce будет заново получен с ноды."""
+        async with self._lock:
+            logger.info(f"🔄 Пересинхронизация nonce для {self.address}")
+            self._next_nonce = None
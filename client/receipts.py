@@ -0,0 +1,214 @@
+from web3.exceptions import TransactionNotFound
+from web3.types import TxReceipt
+from typing import Iterable, Optional, Union
+from hexbytes import HexBytes
+from web3 import AsyncWeb3
+from client.telemetry import detach_span
+import asyncio
+import logging
+import weakref
+
+logger = logging.getLogger(__name__)
+
+# Сколько блоков назад смотреть при оценке времени блока
+BLOCK_TIME_SAMPLE = 20
+# Если с прошлого прохода появилось больше блоков — проверяем receipt всех хэшей напрямую
+MAX_SWEEP_BLOCKS = 10
+# Раз в столько проходов все ожидающие хэши проверяются напрямую (страховка от пропущенных блоков)
+FULL_CHECK_EVERY = 10
+MIN_POLL_INTERVAL = 0.2
+MAX_POLL_INTERVAL = 15.0
+DEFAULT_BLOCK_TIME = 2.0
+
+
+class ReceiptWaiter:
+    """
+    Общий для всех кошельков на одном AsyncWeb3 ожидатель receipt.
+    Один цикл опрашивает номер блока с интервалом, подстроенным под время блока сети,
+    на каждом новом блоке сверяет его транзакции с ожидаемыми хэшами и только для совпавших
+    запрашивает receipt. При наличии ws_url новые блоки приходят по подписке newHeads.
+    """
+
+    _registry: "weakref.WeakKeyDictionary[AsyncWeb3, ReceiptWaiter]" = weakref.WeakKeyDictionary()
+
+    def __init__(self, w3: AsyncWeb3, ws_url: Optional[str] = None):
+        self.w3 = w3
+        self.ws_url = ws_url
+        self.block_time: Optional[float] = None
+        self._pending: dict[HexBytes, asyncio.Future] = {}
+        # Сколько вызовов wait_* сейчас ждут хэш: future снимается с опроса, только когда ушёл последний
+        self._waiters: dict[HexBytes, int] = {}
+        self._unchecked: set[HexBytes] = set()
+        self._last_block: Optional[int] = None
+        self._sweeps = 0
+        self._task: Optional[asyncio.Task] = None
+        self._new_block = asyncio.Event()
+
+    @classmethod
+    def for_w3(cls, w3: AsyncWeb3, ws_url: Optional[str] = None) -> "ReceiptWaiter":
+        waiter = cls._registry.get(w3)
+        if waiter is None:
+            waiter = cls(w3, ws_url)
+            cls._registry[w3] = waiter
+        elif ws_url and not waiter.ws_url:
+            waiter.ws_url = ws_url
+        return waiter
+
+    async def wait(self, tx_hash: Union[str, HexBytes], timeout: float = 120) -> Optional[TxReceipt]:
+        """Ждёт receipt одной транзакции; None — если не подтвердилась за timeout секунд."""
+        receipts = await self.wait_many([tx_hash], timeout)
+        return receipts[HexBytes(tx_hash)]
+
+    async def wait_many(self, tx_hashes: Iterable[Union[str, HexBytes]],
+                        timeout: float = 120) -> dict[HexBytes, Optional[TxReceipt]]:
+        """Ждёт сразу несколько транзакций одним общим циклом опроса."""
+        hashes = [HexBytes(tx_hash) for tx_hash in tx_hashes]
+        futures = {tx_hash: self._register(tx_hash) for tx_hash in hashes}
+        try:
+            await asyncio.wait([asyncio.shield(future) for future in futures.values()], timeout=timeout)
+        finally:
+            self._release(futures)
+
+        return {tx_hash: future.result() if future.done() and not future.cancelled() else None
+                for tx_hash, future in futures.items()}
+
+    async def wait_any(self, tx_hashes: Iterable[Union[str, HexBytes]],
+                       timeout: float = 120) -> Optional[TxReceipt]:
+        """Ждёт первый receipt из нескольких транзакций (например, исходной и её замен с тем же nonce)."""
+        hashes = [HexBytes(tx_hash) for tx_hash in tx_hashes]
+        futures = {tx_hash: self._register(tx_hash) for tx_hash in hashes}
+        try:
+            await asyncio.wait([asyncio.shield(future) for future in futures.values()], timeout=timeout,
+                               return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            self._release(futures)
+
+        return next((future.result() for future in futures.values()
+                     if future.done() and not future.cancelled()), None)
+
+    def _register(self, tx_hash: HexBytes) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        if self._task is not None and self._task.get_loop() is not loop:
+            # Предыдущий event loop закрыт вместе со своими future — начинаем с чистого состояния
+            self._pending.clear()
+            self._waiters.clear()
+            self._unchecked.clear()
+            self._task = None
+            self._new_block = asyncio.Event()
+        future = self._pending.get(tx_hash)
+        if future is None:
+            future = loop.create_future()
+            self._pending[tx_hash] = future
+            # Транзакция могла попасть в блок ещё до регистрации — проверяем её напрямую
+            self._unchecked.add(tx_hash)
+        self._waiters[tx_hash] = self._waiters.get(tx_hash, 0) + 1
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return future
+
+    def _release(self, futures: dict[HexBytes, asyncio.Future]) -> None:
+        """Вызов wait_* больше не ждёт эти хэши; неразрешённые future без ожидающих снимаются с опроса."""
+        for tx_hash, future in futures.items():
+            count = self._waiters.get(tx_hash, 0) - 1
+            if count > 0:
+                self._waiters[tx_hash] = count
+                continue
+            self._waiters.pop(tx_hash, None)
+            if not future.done() and self._pending.get(tx_hash) is future:
+                del self._pending[tx_hash]
+
+    async def _estimate_block_time(self) -> float:
+        try:
+            latest = await self.w3.eth.get_block("latest")
+            past = await self.w3.eth.get_block(max(latest["number"] - BLOCK_TIME_SAMPLE, 0))
+            blocks = latest["number"] - past["number"]
+            if blocks > 0:
+                return max((latest["timestamp"] - past["timestamp"]) / blocks, MIN_POLL_INTERVAL)
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось оценить время блока, используем {DEFAULT_BLOCK_TIME} с: {e}")
+        return DEFAULT_BLOCK_TIME
+
+    async def _run(self) -> None:
+        # Опрос блоков общий для всех кошельков — не относим его к span того, кто запустил цикл
+        detach_span()
+        if self.block_time is None:
+            self.block_time = await self._estimate_block_time()
+        base_interval = min(max(self.block_time / 2, MIN_POLL_INTERVAL), MAX_POLL_INTERVAL)
+        interval = base_interval
+        ws_task = asyncio.create_task(self._listen_new_heads()) if self.ws_url else None
+
+        try:
+            while self._pending:
+                try:
+                    new_block = await self._sweep()
+                except Exception as e:
+                    logger.warning(f"⚠️ Ошибка при проверке receipt: {e}")
+                    new_block = False
+
+                # На новом блоке возвращаемся к базовому интервалу, иначе — плавно отступаем
+                if new_block:
+                    interval = base_interval
+                else:
+                    interval = min(interval * 1.5, self.block_time * 2, MAX_POLL_INTERVAL)
+                if not self._pending:
+                    break
+                self._new_block.clear()
+                try:
+                    await asyncio.wait_for(self._new_block.wait(), timeout=interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if ws_task is not None:
+                ws_task.cancel()
+
+    async def _sweep(self) -> bool:
+        self._sweeps += 1
+        latest = await self.w3.eth.block_number
+        candidates = set(self._unchecked)
+        self._unchecked.clear()
+        in_blocks: set[HexBytes] = set()
+        new_block = self._last_block is None or latest > self._last_block
+
+        if self._last_block is not None and latest > self._last_block:
+            block_numbers = range(self._last_block + 1, latest + 1)
+            if len(block_numbers) > MAX_SWEEP_BLOCKS:
+                candidates |= set(self._pending)
+            else:
+                blocks = await asyncio.gather(*(self.w3.eth.get_block(number) for number in block_numbers))
+                for block in blocks:
+                    in_blocks |= {HexBytes(tx) for tx in block["transactions"]} & self._pending.keys()
+                candidates |= in_blocks
+        self._last_block = latest
+
+        if self._sweeps % FULL_CHECK_EVERY == 0:
+            candidates |= set(self._pending)
+
+        await asyncio.gather(*(self._check(tx_hash, tx_hash in in_blocks) for tx_hash in candidates))
+        return new_block
+
+    async def _check(self, tx_hash: HexBytes, seen_in_block: bool) -> None:
+        future = self._pending.get(tx_hash)
+        if future is None or future.done():
+            return
+        try:
+            receipt = await self.w3.eth.get_transaction_receipt(tx_hash)
+        except TransactionNotFound:
+            if seen_in_block:
+                # Транзакция уже в блоке, но receipt ещё не проиндексирован — проверим на следующем проходе
+                self._unchecked.add(tx_hash)
+            return
+        self._pending.pop(tx_hash, None)
+        future.set_result(receipt)
+
+    async def _listen_new_heads(self) -> None:
+        try:
+            from web3.providers.websocket import WebsocketProviderV2
+
+            async with AsyncWeb3.persistent_websocket(WebsocketProviderV2(self.ws_url)) as ws_w3:
+                await ws_w3.eth.subscribe("newHeads")
+                async for _ in ws_w3.ws.listen_to_websocket():
+                    self._new_block.set()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"⚠️ Подписка на новые блоки недоступна, продолжаем опросом: {e}")
@@ -0,0 +1,146 @@
+from aiohttp import ClientConnectionError, ClientHttpProxyError, ClientResponseError
+from web3.providers.async_base import AsyncJSONBaseProvider
+from web3.types import RPCEndpoint, RPCResponse
+from client.telemetry import note_transport, transport_queued
+from client.transport import PooledHTTPProvider
+from utils.rate_limiter import is_throttled_response
+from typing import Any, Optional
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Сглаживание задержки (EWMA): чем больше, тем быстрее реагируем на изменения
+LATENCY_ALPHA = 0.3
+# Время исключения эндпоинта после сбоя, удваивается при повторных сбоях подряд
+BASE_EJECT_SECONDS = 5.0
+MAX_EJECT_SECONDS = 120.0
+# Методы, которые рассылаются на все живые эндпоинты сразу
+BROADCAST_METHODS = ("eth_sendRawTransaction",)
+
+
+class EndpointUnavailable(Exception):
+    """Эндпоинт не ответил или ответил 429/5xx."""
+
+
+class Endpoint:
+    """Один RPC-эндпоинт со статистикой задержки и ошибок."""
+
+    def __init__(self, url: str, proxy: Optional[str] = None):
+        self.url = url
+        # Повторы после 429 здесь не нужны: пул сам переключается на следующий эндпоинт
+        self.provider = PooledHTTPProvider(url, proxy, throttle_retries=0)
+        self.latency: Optional[float] = None
+        self.requests = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.ejected_until
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.requests if self.requests else 0.0
+
+    def record_success(self, elapsed: float) -> None:
+        self.requests += 1
+        self.consecutive_failures = 0
+        self.latency = elapsed if self.latency is None else (
+            LATENCY_ALPHA * elapsed + (1 - LATENCY_ALPHA) * self.latency)
+
+    def record_failure(self, error: Exception) -> None:
+        self.requests += 1
+        self.errors += 1
+        self.consecutive_failures += 1
+        cooldown = min(BASE_EJECT_SECONDS * 2 ** (self.consecutive_failures - 1), MAX_EJECT_SECONDS)
+        self.ejected_until = time.monotonic() + cooldown
+        logger.warning(f"🧹 RPC {self.url} исключён на {cooldown:.0f} с: {error}")
+
+    def sort_key(self) -> tuple:
+        # Неопробованные эндпоинты идут первыми, чтобы получить по ним статистику
+        return (self.latency is not None, (self.latency or 0.0) * (1 + self.error_rate))
+
+
+class MultiEndpointProvider(AsyncJSONBaseProvider):
+    """
+    Провайдер поверх нескольких RPC одной сети.
+    Чтения идут на самый быстрый живой эндпоинт (EWMA задержки с поправкой на долю ошибок),
+    при 429/5xx/обрыве соединения эндпоинт исключается на время и запрос повторяется на следующем.
+    Сырые транзакции рассылаются на все живые эндпоинты одновременно.
+    """
+
+    def __init__(self, urls: list[str], proxy: Optional[str] = None):
+        if not urls:
+            raise ValueError("Список RPC-эндпоинтов пуст")
+        self.endpoints = [Endpoint(url, proxy) for url in urls]
+        self.endpoint_uri = "|".join(urls)
+        super().__init__()
+
+    def __str__(self) -> str:
+        return f"RPC pool {self.endpoint_uri}"
+
+    def set_rate_limit(self, rate: float) -> None:
+        """Лимит rate запросов в секунду на каждый эндпоинт пула."""
+        for endpoint in self.endpoints:
+            endpoint.provider.set_rate_limit(rate)
+
+    def _ranked(self) -> list[Endpoint]:
+        healthy = sorted((e for e in self.endpoints if e.healthy), key=Endpoint.sort_key)
+        if healthy:
+            return healthy
+        # Все исключены — пробуем тот, чей таймаут истечёт раньше всех
+        return sorted(self.endpoints, key=lambda e: e.ejected_until)[:1]
+
+    async def _request(self, endpoint: Endpoint, method: RPCEndpoint, params: Any) -> RPCResponse:
+        started = time.monotonic()
+        try:
+            response = await endpoint.provider.make_request(method, params)
+        except ClientResponseError as e:
+            if e.status == 429 or e.status >= 500:
+                endpoint.record_failure(e)
+                raise EndpointUnavailable(f"{endpoint.url}: HTTP {e.status}") from e
+            raise
+        except (ClientHttpProxyError, ClientConnectionError, asyncio.TimeoutError) as e:
+            endpoint.record_failure(e)
+            raise EndpointUnavailable(f"{endpoint.url}: {e}") from e
+        if is_throttled_response(response):
+            endpoint.record_failure(ValueError(response["error"]))
+            raise EndpointUnavailable(f"{endpoint.url}: {response['error']}")
+        endpoint.record_success(time.monotonic() - started - transport_queued())
+        return response
+
+    async def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        if method in BROADCAST_METHODS:
+            return await self._broadcast(method, params)
+
+        last_error: Optional[Exception] = None
+        for endpoint in self._ranked():
+            try:
+                return await self._request(endpoint, method, params)
+            except EndpointUnavailable as e:
+                last_error = e
+        raise ValueError(f"❌ Все RPC-эндпоинты недоступны: {last_error}")
+
+    async def _broadcast(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        endpoints = self._ranked()
+        results = await asyncio.gather(*(self._request(e, method, params) for e in endpoints), return_exceptions=True)
+        # Запросы шли в дочерних задачах, поэтому эндпоинт для телеметрии отмечаем здесь
+        note_transport("broadcast")
+        responses = [r for r in results if isinstance(r, dict)]
+        # Достаточно, чтобы транзакцию принял хотя бы один узел; иначе возвращаем ошибку ноды как есть
+        for response in responses:
+            if "error" not in response:
+                return response
+        if responses:
+            return responses[0]
+        raise ValueError(f"❌ Не удалось отправить транзакцию ни на один RPC: {results}")
+
+    def stats(self) -> list[dict]:
+        return [
+            {"url": e.url, "latency": e.latency, "requests": e.requests,
+             "error_rate": e.error_rate, "healthy": e.healthy}
+            for e in self.endpoints
+        ]
@@ -0,0 +1,152 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from eth_account import Account
+from hexbytes import HexBytes
+from typing import Iterable, Optional
+import asyncio
+import logging
+import math
+import multiprocessing
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Одно ядро остаётся event loop, на остальных (не больше 4) — процессы подписи.
+# На одноядерной машине пул только добавляет накладные расходы, там подписываем в event loop.
+DEFAULT_SIGNING_WORKERS = max(0, min(4, (os.cpu_count() or 1) - 1))
+
+
+@dataclass(frozen=True)
+class SignedTx:
+    raw_transaction: HexBytes
+    hash: HexBytes
+
+
+def sign_batch(items: list[tuple[dict, str]]) -> list[tuple]:
+    """
+    Выполняется в процессе-подписчике: подписывает пачку транзакций разных кошельков.
+    Ошибка одной транзакции не роняет пачку — вместо результата возвращается ("error", текст).
+    """
+    results = []
+    for transaction, private_key in items:
+        started = time.perf_counter()
+        try:
+            signed = Account.sign_transaction(transaction, private_key)
+            results.append(("ok", bytes(signed.raw_transaction), bytes(signed.hash), time.perf_counter() - started))
+        except Exception as e:
+            results.append(("error", f"{type(e).__name__}: {e}"))
+    return results
+
+
+class SigningService:
+    """
+    Подпись транзакций вне event loop. secp256k1 и RLP в eth_account выполняются на чистом Python
+    и держат GIL, поэтому подпись уходит в пул процессов. Вызовы sign() от разных кошельков,
+    пришедшие за один проход цикла событий, собираются в пачки — по одной на процесс.
+    При workers=0 подпись выполняется прямо в event loop.
+    """
+
+    def __init__(self, workers: int = DEFAULT_SIGNING_WORKERS):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending: list[tuple[dict, str, asyncio.Future]] = []
+        self._flush_scheduled = False
+        self._submits: set[asyncio.Task] = set()
+        self.signed = 0
+        self.batches = 0
+        self.sign_time = 0.0
+
+    def configure(self, workers: int) -> None:
+        if workers != self.workers:
+            self.close()
+            self.workers = workers
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: форк процесса с работающим event loop и открытыми сокетами небезопасен
+            self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    async def sign(self, transaction: dict, private_key: str) -> SignedTx:
+        if self.workers <= 0:
+            started = time.perf_counter()
+            signed = Account.sign_transaction(transaction, private_key)
+            self._record(1, time.perf_counter() - started)
+            return SignedTx(HexBytes(signed.raw_transaction), HexBytes(signed.hash))
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((dict(transaction), private_key, future))
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            loop.call_soon(self._flush)
+        return await future
+
+    async def sign_many(self, items: Iterable[tuple[dict, str]]) -> list[SignedTx]:
+        """Подписывает пачку (транзакция, ключ) разных кошельков; порядок результатов сохраняется."""
+        return list(await asyncio.gather(*(self.sign(transaction, key) for transaction, key in items)))
+
+    def _flush(self) -> None:
+        self._flush_scheduled = False
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        chunk_size = math.ceil(len(pending) / self.workers)
+        for start in range(0, len(pending), chunk_size):
+            task = asyncio.ensure_future(self._submit(pending[start:start + chunk_size]))
+            self._submits.add(task)
+            task.add_done_callback(self._submits.discard)
+
+    async def _submit(self, chunk: list[tuple[dict, str, asyncio.Future]]) -> None:
+        items = [(transaction, key) for transaction, key, _ in chunk]
+        try:
+            try:
+                results = await asyncio.get_running_loop().run_in_executor(self._get_executor(), sign_batch, items)
+            except BrokenProcessPool as e:
+                # Упавший пул пересоздаётся при следующей пачке, эту подписываем на месте
+                logger.warning(f"⚠️ Пул подписи упал ({e}), подписываем пачку в event loop")
+                self._executor = None
+                results = sign_batch(items)
+            except Exception as e:
+                # Пачка не ушла в пул (не сериализуется, пул закрыт close()/configure(), процесс не запустился)
+                logger.warning(f"⚠️ Ошибка пула подписи ({type(e).__name__}: {e}), подписываем пачку в event loop")
+                results = sign_batch(items)
+        except BaseException as e:
+            # Иначе sign() ждал бы эти future вечно
+            for _, _, future in chunk:
+                if not future.done():
+                    if isinstance(e, asyncio.CancelledError):
+                        future.cancel()
+                    else:
+                        future.set_exception(e)
+            raise
+
+        self.batches += 1
+        for (_, _, future), result in zip(chunk, results):
+            if future.done():
+                continue
+            if result[0] == "ok":
+                self._record(1, result[3])
+                future.set_result(SignedTx(HexBytes(result[1]), HexBytes(result[2])))
+            else:
+                future.set_exception(ValueError(result[1]))
+
+    def _record(self, count: int, elapsed: float) -> None:
+        self.signed += count
+        self.sign_time += elapsed
+
+    def reset_stats(self) -> None:
+        self.signed = 0
+        self.batches = 0
+        self.sign_time = 0.0
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+SIGNING_SERVICE = SigningService()
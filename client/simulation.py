@@ -0,0 +1,126 @@
+from web3 import AsyncWeb3
+from web3.types import TxParams
+from client.transport import BATCH_METHOD
+from typing import Optional
+import asyncio
+import collections
+import logging
+import weakref
+
+logger = logging.getLogger(__name__)
+
+# Сколько eth_call уходит в одном batch-запросе
+MAX_SIMULATION_BATCH = 100
+# Поля транзакции, которые имеют смысл для eth_call; nonce не передаём — проверка nonce в eth_call не нужна
+CALL_FIELDS = ("from", "to", "gas", "gasPrice", "maxFeePerGas", "maxPriorityFeePerGas", "value", "data")
+
+# Итоги симуляций за запуск: ok / reverted
+SIMULATION_STATS: collections.Counter = collections.Counter()
+
+
+class SimulationError(ValueError):
+    """Транзакция ревертнётся или не может быть выполнена по результату eth_call."""
+
+
+def call_params(transaction: TxParams) -> dict:
+    """Транзакция в формате параметров eth_call: числа и байты — hex-строками."""
+    params = {}
+    for key in CALL_FIELDS:
+        value = transaction.get(key)
+        if value is None:
+            continue
+        if isinstance(value, int):
+            value = hex(value)
+        elif isinstance(value, (bytes, bytearray)):
+            value = AsyncWeb3.to_hex(value)
+        params[key] = value
+    return params
+
+
+def revert_reason(error) -> str:
+    if isinstance(error, dict):
+        return str(error.get("message") or error)
+    return str(error)
+
+
+class Simulator:
+    """
+    Предварительная проверка транзакций через eth_call на pending-блоке. Проверки всех кошельков,
+    пришедшие за один проход цикла событий, уходят одним batch-запросом к RPC. Если RPC не
+    поддерживает batch, вызовы выполняются по одному.
+    """
+
+    _registry: "weakref.WeakKeyDictionary[AsyncWeb3, Simulator]" = weakref.WeakKeyDictionary()
+
+    def __init__(self, w3: AsyncWeb3):
+        self.w3 = w3
+        self.batch_supported = True
+        self._pending: list[tuple[dict, asyncio.Future]] = []
+        self._flush_scheduled = False
+        self._flushes: set[asyncio.Task] = set()
+
+    @classmethod
+    def for_w3(cls, w3: AsyncWeb3) -> "Simulator":
+        simulator = cls._registry.get(w3)
+        if simulator is None:
+            simulator = cls(w3)
+            cls._registry[w3] = simulator
+        return simulator
+
+    async def simulate(self, transaction: TxParams) -> Optional[str]:
+        """None — транзакция выполнится; иначе причина реверта."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((call_params(transaction), future))
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            loop.call_soon(self._flush)
+        error = await future
+        SIMULATION_STATS["reverted" if error else "ok"] += 1
+        return error
+
+    def _flush(self) -> None:
+        self._flush_scheduled = False
+        pending, self._pending = self._pending, []
+        for start in range(0, len(pending), MAX_SIMULATION_BATCH):
+            task = asyncio.ensure_future(self._run(pending[start:start + MAX_SIMULATION_BATCH]))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _run(self, chunk: list[tuple[dict, asyncio.Future]]) -> None:
+        try:
+            errors = await self._call_batch([params for params, _ in chunk])
+        except Exception as e:
+            # Проверка не состоялась (сеть, таймаут) — это не повод отклонять транзакции
+            logger.warning(f"⚠️ Симуляция не выполнена, транзакции отправляются без проверки: {e}")
+            errors = [None] * len(chunk)
+        for (_, future), error in zip(chunk, errors):
+            if not future.done():
+                future.set_result(error)
+
+    async def _call_batch(self, calls: list[dict]) -> list[Optional[str]]:
+        if self.batch_supported and len(calls) > 1:
+            try:
+                responses = await self.w3.manager.coro_request(
+                    BATCH_METHOD, [("eth_call", [params, "pending"]) for params in calls])
+            except ValueError:
+                responses = None
+            if isinstance(responses, list) and len(responses) == len(calls):
+                return [revert_reason(r["error"]) if r.get("error") else None for r in responses]
+            logger.info("ℹ️ RPC не поддерживает batch-запросы, симуляции выполняются по одной")
+            self.batch_supported = False
+        return list(await asyncio.gather(*(self._call_one(params) for params in calls)))
+
+    async def _call_one(self, params: dict) -> Optional[str]:
+        try:
+            await self.w3.manager.coro_request("eth_call", [params, "pending"])
+        except ValueError as e:
+            # Ответ ноды с ошибкой: реверт, нехватка средств на газ и т.п.
+            return revert_reason(e.args[0] if e.args else e)
+        return None
+
+
+def log_simulation_summary() -> None:
+    if SIMULATION_STATS:
+        logger.info(f"🧪 Симуляций транзакций: {sum(SIMULATION_STATS.values())}, "
+                    f"отклонено до отправки: {SIMULATION_STATS['reverted']}")
@@ -0,0 +1,224 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator, Optional
+from urllib.parse import urlparse
+import collections
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = "syncswap"
+RPC_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CYCLE_DURATION_BUCKETS = (1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+# Сколько последних замеров на метод хранится для p50/p99 в итоговой сводке
+LATENCY_SAMPLE_SIZE = 10_000
+SLOWEST_CYCLES_IN_SUMMARY = 3
+
+# Что провайдер узнал о запросе на проводе: эндпоинт и размеры запроса/ответа
+_TRANSPORT: ContextVar[Optional[dict]] = ContextVar("rpc_transport", default=None)
+# Текущий span круга кошелька; asyncio-задачи наследуют его при создании
+_SPAN: ContextVar[Optional["Span"]] = ContextVar("telemetry_span", default=None)
+
+
+def endpoint_label(url: str) -> str:
+    """Только хост: в пути RPC-адреса часто лежит API-ключ, ему не место в метриках."""
+    return urlparse(url).netloc or url
+
+
+def note_transport(endpoint: str, request_bytes: Optional[int] = None, response_bytes: Optional[int] = None,
+                   queued: float = 0.0) -> None:
+    """
+    Вызывается провайдером после запроса, чтобы middleware телеметрии знал эндпоинт и размер данных.
+    queued — сколько запрос ждал в ограничителе частоты (включая паузы после 429), в латентность не входит.
+    """
+    _TRANSPORT.set({"endpoint": endpoint_label(endpoint), "request_bytes": request_bytes,
+                    "response_bytes": response_bytes, "queued": queued})
+
+
+def transport_queued() -> float:
+    """Время ожидания в ограничителе частоты у последнего запроса текущей задачи."""
+    return (_TRANSPORT.get() or {}).get("queued", 0.0)
+
+
+def detach_span() -> None:
+    """Отвязывает текущую задачу от span: фоновые циклы (ожидание receipt) общие для всех кошельков."""
+    _SPAN.set(None)
+
+
+class Histogram:
+    """Накопительная гистограмма в формате Prometheus (le-бакеты, сумма, количество)."""
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+@dataclass
+class Span:
+    """RPC-вызовы одного круга одного кошелька."""
+    name: str
+    wallet: str
+    started: float = field(default_factory=time.perf_counter)
+    duration: float = 0.0
+    status: str = "ok"
+    calls: int = 0
+    errors: int = 0
+    rpc_time: float = 0.0
+    by_method: collections.Counter = field(default_factory=collections.Counter)
+    time_by_method: collections.Counter = field(default_factory=collections.Counter)
+
+
+class Telemetry:
+    """
+    Счётчики и гистограммы RPC-вызовов (метод, эндпоинт, статус, латентность, байты)
+    и длительности кругов. Экспорт — текстовый формат Prometheus и сводка в лог.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.requests: collections.Counter = collections.Counter()
+        self.bytes_sent: collections.Counter = collections.Counter()
+        self.bytes_received: collections.Counter = collections.Counter()
+        self.latency: dict[str, Histogram] = {}
+        self.samples: dict[str, collections.deque] = {}
+        self.cycle_duration: dict[str, Histogram] = {}
+        self.spans: list[Span] = []
+
+    def record_call(self, method: str, latency: float, endpoint: str, error: Optional[str] = None,
+                    request_bytes: Optional[int] = None, response_bytes: Optional[int] = None) -> None:
+        self.requests[(method, endpoint, error or "ok")] += 1
+        if request_bytes:
+            self.bytes_sent[method] += request_bytes
+        if response_bytes:
+            self.bytes_received[method] += response_bytes
+        self.latency.setdefault(method, Histogram(RPC_LATENCY_BUCKETS)).observe(latency)
+        self.samples.setdefault(method, collections.deque(maxlen=LATENCY_SAMPLE_SIZE)).append(latency)
+
+        span = _SPAN.get()
+        if span is not None:
+            span.calls += 1
+            span.errors += error is not None
+            span.rpc_time += latency
+            span.by_method[method] += 1
+            span.time_by_method[method] += latency
+
+    @contextmanager
+    def span(self, name: str, wallet: str) -> Iterator[Span]:
+        """Группирует все RPC-вызовы внутри блока под один span; статус выставляет вызывающий."""
+        span = Span(name=name, wallet=wallet)
+        token = _SPAN.set(span)
+        try:
+            yield span
+        except BaseException:
+            span.status = "error"
+            raise
+        finally:
+            _SPAN.reset(token)
+            span.duration = time.perf_counter() - span.started
+            self.spans.append(span)
+            self.cycle_duration.setdefault(span.status, Histogram(CYCLE_DURATION_BUCKETS)).observe(span.duration)
+
+    def render_prometheus(self) -> str:
+        lines = [
+            f"# HELP {METRIC_PREFIX}_rpc_requests_total RPC-запросы по методу, эндпоинту и статусу",
+            f"# TYPE {METRIC_PREFIX}_rpc_requests_total counter",
+        ]
+        for (method, endpoint, status), value in sorted(self.requests.items()):
+            lines.append(f'{METRIC_PREFIX}_rpc_requests_total{{method="{method}",endpoint="{endpoint}",'
+                         f'status="{status}"}} {value}')
+
+        for metric, counter in (("rpc_request_bytes_total", self.bytes_sent),
+                                ("rpc_response_bytes_total", self.bytes_received)):
+            lines += [f"# TYPE {METRIC_PREFIX}_{metric} counter"]
+            lines += [f'{METRIC_PREFIX}_{metric}{{method="{method}"}} {value}'
+                      for method, value in sorted(counter.items())]
+
+        lines += _render_histograms(f"{METRIC_PREFIX}_rpc_request_duration_seconds", "method", self.latency)
+        lines += _render_histograms(f"{METRIC_PREFIX}_cycle_duration_seconds", "status", self.cycle_duration)
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(self.render_prometheus())
+
+    def log_summary(self) -> None:
+        total_calls = sum(self.requests.values())
+        total_errors = sum(v for (_, _, status), v in self.requests.items() if status != "ok")
+        logger.info(f"📡 RPC: {total_calls} запросов, ошибок: {total_errors}")
+
+        for method, histogram in sorted(self.latency.items(), key=lambda item: -item[1].sum):
+            samples = sorted(self.samples[method])
+            p50 = samples[len(samples) // 2]
+            p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+            logger.info(f"📡 {method}: {histogram.count} запросов, всего {histogram.sum:.2f} с, "
+                        f"p50 {p50 * 1000:.0f} мс, p99 {p99 * 1000:.0f} мс, "
+                        f"отправлено {self.bytes_sent[method]} Б, получено {self.bytes_received[method]} Б")
+
+        cycles = [s for s in self.spans if s.name == "cycle"]
+        if cycles:
+            logger.info(f"🧭 Кругов: {len(cycles)}, RPC-запросов на круг в среднем: "
+                        f"{sum(s.calls for s in cycles) / len(cycles):.1f}")
+            for span in sorted(cycles, key=lambda s: -s.duration)[:SLOWEST_CYCLES_IN_SUMMARY]:
+                top = ", ".join(f"{m} {t:.2f} с" for m, t in span.time_by_method.most_common(3))
+                logger.info(f"🐢 {span.wallet}: круг {span.duration:.1f} с ({span.status}), "
+                            f"RPC {span.calls} запросов / {span.rpc_time:.1f} с: {top}")
+
+
+def _render_histograms(name: str, label: str, histograms: dict[str, Histogram]) -> list[str]:
+    lines = [f"# TYPE {name} histogram"]
+    for key, histogram in sorted(histograms.items()):
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            lines.append(f'{name}_bucket{{{label}="{key}",le="{bound}"}} {count}')
+        lines.append(f'{name}_bucket{{{label}="{key}",le="+Inf"}} {histogram.count}')
+        lines.append(f'{name}_sum{{{label}="{key}"}} {histogram.sum}')
+        lines.append(f'{name}_count{{{label}="{key}"}} {histogram.count}')
+    return lines
+
+
+TELEMETRY = Telemetry()
+
+
+def telemetry_middleware(telemetry: Telemetry = TELEMETRY):
+    """
+    Middleware, записывающий каждый RPC-запрос: метод, латентность, эндпоинт, размер и ошибку.
+    Ставится внутренним слоем; ожидание в ограничителе частоты провайдера из латентности вычитается.
+    """
+
+    async def middleware(make_request, w3):
+        default_endpoint = endpoint_label(str(getattr(w3.provider, "endpoint_uri", "") or ""))
+
+        async def inner(method, params):
+            _TRANSPORT.set(None)
+            started = time.perf_counter()
+            error = None
+            try:
+                response = await make_request(method, params)
+                if isinstance(response, dict) and response.get("error"):
+                    rpc_error = response["error"]
+                    error = f"rpc_{rpc_error.get('code', 'error') if isinstance(rpc_error, dict) else 'error'}"
+                return response
+            except Exception as e:
+                error = type(e).__name__
+                raise
+            finally:
+                transport = _TRANSPORT.get() or {}
+                telemetry.record_call(method, time.perf_counter() - started - transport.get("queued", 0.0),
+                                      transport.get("endpoint", default_endpoint), error,
+                                      transport.get("request_bytes"), transport.get("response_bytes"))
+
+        return inner
+
+    return middleware
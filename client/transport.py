@@ -0,0 +1,147 @@
+from aiohttp import ClientResponseError, ClientSession, ClientTimeout, TCPConnector
+from web3 import AsyncHTTPProvider
+from web3.types import RPCEndpoint, RPCResponse
+from client.telemetry import note_transport
+from utils.rate_limiter import (THROTTLE_HTTP_STATUSES, RateLimiter, backoff_delay, endpoint_limiter,
+                                is_throttled_response, method_priority, retry_after_seconds)
+from typing import Any, Optional
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SETTINGS = {
+    "limit": 100,               # всего соединений на сессию
+    "limit_per_host": 50,       # соединений к одному хосту
+    "keepalive_timeout": 30,    # сколько секунд держать простаивающее соединение
+    "dns_cache_ttl": 300,       # время жизни DNS-кэша
+    "request_timeout": 30,      # таймаут одного RPC-запроса
+}
+# Псевдометод: params — список (метод, параметры), которые уходят одним JSON-RPC batch-запросом.
+# Проходит через middleware как один запрос, поэтому ограничитель частоты и телеметрия считают его одним
+BATCH_METHOD = RPCEndpoint("rpc_batch")
+# Сколько раз повторять запрос после ответа 429 / "rate limit", прежде чем вернуть ошибку
+THROTTLE_RETRIES = 4
+
+
+class TransportPool:
+    """
+    Пул HTTP-сессий aiohttp с keep-alive и DNS-кэшем, ключ — (rpc_url, proxy).
+    Все Client на одном RPC и прокси используют одну сессию и её пул соединений,
+    поэтому TLS-рукопожатие выполняется один раз, а не на каждый кошелёк.
+    """
+
+    def __init__(self, **settings):
+        self.settings = dict(DEFAULT_POOL_SETTINGS)
+        self.configure(**settings)
+        self._sessions: dict[tuple[str, Optional[str]], ClientSession] = {}
+
+    def configure(self, **settings) -> None:
+        unknown = set(settings) - set(DEFAULT_POOL_SETTINGS)
+        if unknown:
+            raise ValueError(f"Неизвестные параметры пула соединений: {sorted(unknown)}")
+        self.settings.update(settings)
+
+    def _create_session(self) -> ClientSession:
+        connector = TCPConnector(
+            limit=self.settings["limit"],
+            limit_per_host=self.settings["limit_per_host"],
+            keepalive_timeout=self.settings["keepalive_timeout"],
+            ttl_dns_cache=self.settings["dns_cache_ttl"],
+            use_dns_cache=True,
+        )
+        return ClientSession(
+            connector=connector,
+            timeout=ClientTimeout(total=self.settings["request_timeout"]),
+            raise_for_status=True,
+        )
+
+    def get_session(self, rpc_url: str, proxy: Optional[str] = None) -> ClientSession:
+        key = (rpc_url, proxy)
+        session = self._sessions.get(key)
+        if session is None or session.closed or session._loop is not asyncio.get_running_loop():
+            session = self._create_session()
+            self._sessions[key] = session
+        return session
+
+    async def close(self) -> None:
+        sessions, self._sessions = list(self._sessions.values()), {}
+        for session in sessions:
+            if not session.closed and not session._loop.is_closed():
+                await session.close()
+
+
+TRANSPORT_POOL = TransportPool()
+
+
+class PooledHTTPProvider(AsyncHTTPProvider):
+    """
+    AsyncHTTPProvider, который берёт сессию из общего TransportPool вместо собственной.
+    Если задан лимит (set_rate_limit), запросы проходят через общий для адреса RPC token bucket
+    с приоритетами методов; на 429 и ошибки лимита — пауза всего эндпоинта с экспоненциальной
+    задержкой и повтор до throttle_retries раз.
+    """
+
+    def __init__(self, endpoint_uri: str, proxy: Optional[str] = None, pool: TransportPool = TRANSPORT_POOL,
+                 throttle_retries: int = THROTTLE_RETRIES):
+        self.proxy = proxy
+        self.pool = pool
+        self.throttle_retries = throttle_retries
+        self.limiter: Optional[RateLimiter] = None
+        request_kwargs = {"proxy": f"http://{proxy}"} if proxy else {}
+        super().__init__(endpoint_uri, request_kwargs=request_kwargs)
+
+    def set_rate_limit(self, rate: float) -> None:
+        self.limiter = endpoint_limiter(self.endpoint_uri, rate)
+
+    async def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        # batch идёт по приоритету первого вызова: все вызовы одного batch однотипны
+        priority = method_priority(params[0][0] if method == BATCH_METHOD and params else method)
+        queued = 0.0
+        attempt = 0
+        while True:
+            if self.limiter is not None:
+                queued += await self.limiter.acquire(priority)
+            try:
+                if method == BATCH_METHOD:
+                    response = await self._make_batch_request(params, queued)
+                else:
+                    request_data = self.encode_rpc_request(method, params)
+                    response = self.decode_rpc_response(await self._post(request_data, queued))
+            except ClientResponseError as e:
+                if e.status not in THROTTLE_HTTP_STATUSES or attempt >= self.throttle_retries:
+                    note_transport(self.endpoint_uri, queued=queued)
+                    raise
+                delay = backoff_delay(attempt, retry_after_seconds(e.headers))
+                reason = f"HTTP {e.status}"
+            else:
+                if attempt >= self.throttle_retries or not is_throttled_response(response):
+                    return response
+                delay = backoff_delay(attempt)
+                reason = response["error"]
+            logger.warning(f"⏳ RPC {self.endpoint_uri} ограничивает частоту ({reason}), пауза {delay:.1f} с")
+            attempt += 1
+            if self.limiter is not None:
+                # Пауза для всех запросов к эндпоинту, а не только для этого: иначе остальные продолжат получать 429
+                self.limiter.backoff(delay)
+            else:
+                started = time.monotonic()
+                await asyncio.sleep(delay)
+                queued += time.monotonic() - started
+
+    async def _post(self, request_data: bytes, queued: float = 0.0) -> bytes:
+        session = self.pool.get_session(self.endpoint_uri, self.proxy)
+        async with session.post(self.endpoint_uri, data=request_data, **self.get_request_kwargs()) as response:
+            raw_response = await response.read()
+        note_transport(self.endpoint_uri, len(request_data), len(raw_response), queued)
+        return raw_response
+
+    async def _make_batch_request(self, calls: list, queued: float = 0.0) -> RPCResponse:
+        """Ответ с result — список ответов в порядке calls; если нода не поддерживает batch, её ошибка как есть."""
+        requests = [self.encode_rpc_request(method, params) for method, params in calls]
+        decoded = self.decode_rpc_response(await self._post(b"[" + b",".join(requests) + b"]", queued))
+        if not isinstance(decoded, list):
+            return decoded
+        # id запросов растут в порядке calls, а порядок ответов в batch нода не гарантирует
+        return {"jsonrpc": "2.0", "id": 0, "result": sorted(decoded, key=lambda response: response["id"])}
@@ -0,0 +1,163 @@
+from dataclasses import dataclass, field
+from hexbytes import HexBytes
+from web3.types import TxParams, TxReceipt
+from typing import TYPE_CHECKING, Optional, Union
+from client.nonce_manager import is_already_known_error, is_nonce_error
+from client.signer import SIGNING_SERVICE
+import logging
+import time
+
+if TYPE_CHECKING:
+    from client.client import Client
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REPLACEMENT_SETTINGS = {
+    "bump_after": 30.0,   # секунд без подтверждения до очередной замены
+    "fee_bump": 1.125,    # множитель комиссий при замене
+    "max_bumps": 2,       # замен с повышенной комиссией, после них — отмена
+    "cancel": True,       # отменять транзакцию (перевод 0 себе с тем же nonce), если замены не помогли
+}
+# Ноды принимают замену с тем же nonce, только если обе комиссии выросли минимум на 10%
+MIN_FEE_BUMP = 1.1
+CANCEL_GAS_FALLBACK = 21_000
+
+
+class ReplacementPolicy:
+    """Общие для всех кошельков настройки замены зависших транзакций."""
+
+    def __init__(self, **settings):
+        self.settings = dict(DEFAULT_REPLACEMENT_SETTINGS)
+        self.configure(**settings)
+
+    def configure(self, **settings) -> None:
+        unknown = set(settings) - set(DEFAULT_REPLACEMENT_SETTINGS)
+        if unknown:
+            raise ValueError(f"Неизвестные параметры замены транзакций: {sorted(unknown)}")
+        if settings.get("fee_bump", MIN_FEE_BUMP) < MIN_FEE_BUMP:
+            raise ValueError(f"fee_bump должен быть не меньше {MIN_FEE_BUMP}")
+        self.settings.update(settings)
+
+
+REPLACEMENT_POLICY = ReplacementPolicy()
+
+
+@dataclass
+class InFlightTx:
+    """Транзакция в полёте: последняя отправленная версия и хэши всех версий с этим nonce."""
+    transaction: TxParams
+    hashes: list[HexBytes]
+    cancel_hashes: set[HexBytes] = field(default_factory=set)
+    bumps: int = 0
+    waited: bool = False
+
+
+class TxLifecycle:
+    """
+    Сопровождает отправленные транзакции кошелька до подтверждения. Если транзакция не попала в блок
+    за bump_after секунд, она переотправляется с тем же nonce и повышенными комиссиями; после max_bumps
+    замен — отменяется. Подтверждение любой из версий считается результатом исходной транзакции.
+    """
+
+    def __init__(self, client: "Client", policy: ReplacementPolicy = REPLACEMENT_POLICY):
+        self.client = client
+        self.policy = policy
+        self._in_flight: dict[HexBytes, InFlightTx] = {}
+
+    def track(self, transaction: TxParams, tx_hash: Union[str, HexBytes]) -> None:
+        tx_hash = HexBytes(tx_hash)
+        self._in_flight[tx_hash] = InFlightTx(transaction=dict(transaction), hashes=[tx_hash])
+
+    async def wait(self, tx_hash: Union[str, HexBytes], timeout: float = 120) -> Optional[TxReceipt]:
+        """Receipt исходной транзакции или её замены; None — не подтвердилась или была отменена."""
+        tx_hash = HexBytes(tx_hash)
+        record = self._in_flight.get(tx_hash)
+        waiter = self.client.receipt_waiter
+        if record is None:
+            return await waiter.wait(tx_hash, timeout)
+
+        settings = self.policy.settings
+        record.waited = True
+        deadline = time.monotonic() + timeout
+        try:
+            while (remaining := deadline - time.monotonic()) > 0:
+                receipt = await waiter.wait_any(record.hashes, min(settings["bump_after"], remaining))
+                if receipt is not None:
+                    if HexBytes(receipt["transactionHash"]) in record.cancel_hashes:
+                        logger.warning(f"🛑 Транзакция {tx_hash.hex()} отменена (nonce {record.transaction['nonce']})")
+                        return None
+                    return receipt
+                if time.monotonic() >= deadline:
+                    break
+                # Транзакция с большим nonce не попадёт в блок, пока висит предыдущая, которую никто
+                # не ждёт (approve, отправленный без ожидания) — её тоже переотправляем
+                for blocker in self._unwaited_before(record):
+                    if blocker.bumps < settings["max_bumps"]:
+                        await self._replace(blocker, cancel=False)
+                if record.bumps < settings["max_bumps"]:
+                    await self._replace(record, cancel=False)
+                elif settings["cancel"] and not record.cancel_hashes:
+                    await self._replace(record, cancel=True)
+            return None
+        finally:
+            self._in_flight.pop(tx_hash, None)
+            # Транзакции с меньшим nonce к этому моменту либо в блоке, либо их никто не ждёт
+            for blocker in self._unwaited_before(record):
+                self._in_flight.pop(blocker.hashes[0], None)
+
+    def _unwaited_before(self, record: InFlightTx) -> list[InFlightTx]:
+        nonce = record.transaction["nonce"]
+        return [other for other in self._in_flight.values()
+                if not other.waited and other.transaction["nonce"] < nonce]
+
+    async def _replace(self, record: InFlightTx, cancel: bool) -> None:
+        transaction = dict(record.transaction)
+        if cancel:
+            transaction = await self._cancel_transaction(transaction)
+        transaction.update(await self._bumped_fees(record.transaction))
+
+        signed = await SIGNING_SERVICE.sign(transaction, self.client.private_key)
+        action = "Отмена" if cancel else "Замена"
+        try:
+            await self.client.w3.eth.send_raw_transaction(signed.raw_transaction)
+        except Exception as e:
+            if not is_already_known_error(e):
+                # nonce too low — одна из версий уже в блоке; underpriced — повысим ещё раз в следующем раунде
+                level = logging.INFO if is_nonce_error(e) else logging.WARNING
+                logger.log(level, f"⚠️ {action} транзакции с nonce {transaction['nonce']} не принята: {e}")
+                record.bumps += 1
+                return
+
+        record.bumps += 1
+        record.transaction = transaction
+        record.hashes.append(HexBytes(signed.hash))
+        if cancel:
+            record.cancel_hashes.add(HexBytes(signed.hash))
+        logger.info(f"🔁 {action} транзакции с nonce {transaction['nonce']}: {HexBytes(signed.hash).hex()}")
+
+    async def _bumped_fees(self, transaction: TxParams) -> dict:
+        """Комиссии не ниже fee_bump от прошлой версии и не ниже текущей быстрой котировки сети."""
+        fee_bump = self.policy.settings["fee_bump"]
+        quote = await self.client.get_fee_quote("fast")
+
+        def bump(value: int) -> int:
+            return int(value * fee_bump) + 1
+
+        if "maxFeePerGas" in transaction:
+            priority = max(bump(transaction["maxPriorityFeePerGas"]), quote.max_priority_fee_per_gas)
+            return {
+                "maxPriorityFeePerGas": priority,
+                "maxFeePerGas": max(bump(transaction["maxFeePerGas"]),
+                                    quote.max_fee_per_gas - quote.max_priority_fee_per_gas + priority),
+            }
+        return {"gasPrice": max(bump(transaction["gasPrice"]), quote.max_fee_per_gas)}
+
+    async def _cancel_transaction(self, transaction: TxParams) -> TxParams:
+        cancel = {key: transaction[key] for key in ("chainId", "nonce", "from", "type") if key in transaction}
+        cancel.update({"to": self.client.address, "value": 0, "data": b""})
+        try:
+            cancel["gas"] = int(await self.client.w3.eth.estimate_gas(
+                {"from": self.client.address, "to": self.client.address, "value": 0}) * 1.2)
+        except Exception:
+            cancel["gas"] = CANCEL_GAS_FALLBACK
+        return cancel
@@ -0,0 +1,149 @@
+"""
+Собранная конфигурация: проверенные settings.json, таблицы сетей и токенов и все ABI в одном JSON-файле.
+Пока исходные файлы не менялись, запуск берёт конфигурацию из бандла без повторной валидации
+(в том числе без живой проверки прокси) и без чтения ABI по отдельности.
+Приватные ключи и прокси в бандл не пишутся: хранятся ссылки ENV:..., значения раскрываются при загрузке;
+если ключ или прокси заданы в settings.json значением, бандл не собирается.
+"""
+import json
+import logging
+import os
+from typing import Optional
+
+BUNDLE_PATH = "cache/config_bundle.json"
+BUNDLE_VERSION = 1
+ENV_FILES = (".env", "../.env")
+
+logger = logging.getLogger(__name__)
+
+
+def source_paths(config_path: str) -> list[str]:
+    from client.contracts import ABI_DIR
+    from config.configvalidator import NETWORKS_DATA_PATH, TOKENS_PATH
+
+    abi_files = sorted(os.path.join(ABI_DIR, entry) for entry in os.listdir(ABI_DIR) if entry.endswith("_abi.json"))
+    return [config_path, NETWORKS_DATA_PATH, TOKENS_PATH, *abi_files, *ENV_FILES]
+
+
+def fingerprint(paths: list[str]) -> dict[str, Optional[list[int]]]:
+    """Время изменения и размер каждого исходного файла; None — файла нет."""
+    result = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            result[path] = None
+        else:
+            result[path] = [stat.st_mtime_ns, stat.st_size]
+    return result
+
+
+def _is_env_reference(value: Optional[str]) -> bool:
+    return isinstance(value, str) and value.startswith("ENV:")
+
+
+def _strip_secrets(settings: dict, raw_config: dict) -> Optional[dict]:
+    """
+    Копия настроек, где прокси и ключи стратегий заменены ссылками ENV:... из settings.json.
+    None — если ключ или прокси записаны в settings.json значением: такое в бандл не пишется.
+    """
+    raw_strategies = raw_config.get("strategies") or [raw_config]
+    proxy = raw_config.get("proxy")
+    if proxy and not _is_env_reference(proxy):
+        return None
+    if not all(_is_env_reference(raw["private_key"]) for raw in raw_strategies):
+        return None
+    stored = dict(settings, proxy=proxy)
+    stored["strategies"] = []
+    for strategy, raw in zip(settings["strategies"], raw_strategies):
+        strategy = {key: value for key, value in strategy.items() if key != "private_keys"}
+        strategy["private_key"] = raw["private_key"]
+        stored["strategies"].append(strategy)
+    return stored
+
+
+async def _restore_secrets(stored: dict) -> dict:
+    from config.configvalidator import ConfigValidator
+
+    settings = dict(stored, proxy=await ConfigValidator.resolve_proxy(stored["proxy"] or ""))
+    settings["strategies"] = []
+    for strategy in stored["strategies"]:
+        strategy = dict(strategy)
+        strategy["private_keys"] = await ConfigValidator.resolve_private_keys(strategy.pop("private_key"))
+        for private_key in strategy["private_keys"].values():
+            await ConfigValidator.validate_private_key(private_key)
+        settings["strategies"].append(strategy)
+    return settings
+
+
+def read_bundle(config_path: str, path: str = BUNDLE_PATH) -> Optional[dict]:
+    """Бандл, если он собран для этого config_path и ни один исходный файл с тех пор не менялся."""
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            bundle = json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if bundle.get("version") != BUNDLE_VERSION or bundle.get("config_path") != config_path:
+        return None
+    if bundle.get("sources") != fingerprint(source_paths(config_path)):
+        return None
+    return bundle
+
+
+def write_bundle(config_path: str, settings: dict, networks_data: dict, tokens: dict,
+                 path: str = BUNDLE_PATH) -> bool:
+    """Сохраняет бандл; False — не сохранён, потому что секреты заданы в settings.json значением, а не ENV:..."""
+    from client.contracts import abi_names, load_abi
+    from config.configvalidator import ConfigValidator
+
+    stored = _strip_secrets(settings, ConfigValidator(config_path).config_data)
+    if stored is None:
+        return False
+    bundle = {
+        "version": BUNDLE_VERSION,
+        "config_path": config_path,
+        "sources": fingerprint(source_paths(config_path)),
+        "settings": stored,
+        "networks_data": networks_data,
+        "tokens": tokens,
+        "abis": {name: load_abi(name) for name in abi_names()},
+    }
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(bundle, file, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    return True
+
+
+async def load_config(config_path: str, use_bundle: bool = True) -> tuple[dict, dict, dict]:
+    """
+    (settings, networks_data, tokens). Из бандла, если он актуален; иначе — полная валидация
+    settings.json (с проверкой прокси) и сборка нового бандла для следующих запусков.
+    """
+    bundle = read_bundle(config_path) if use_bundle else None
+    if bundle is not None:
+        from client.contracts import preload_abis
+        from dotenv import load_dotenv
+
+        # Без validate_config переменные из ../.env иначе никто не загрузит
+        for env_path in ENV_FILES:
+            load_dotenv(dotenv_path=env_path)
+        preload_abis(bundle["abis"])
+        logger.debug(f"Конфигурация загружена из {BUNDLE_PATH}")
+        return await _restore_secrets(bundle["settings"]), bundle["networks_data"], bundle["tokens"]
+
+    from config.configvalidator import NETWORKS_DATA_PATH, TOKENS_PATH, ConfigValidator
+
+    validator = ConfigValidator(config_path)
+    settings = await validator.validate_config()
+    networks_data = validator.load_constants(NETWORKS_DATA_PATH)
+    tokens = validator.load_constants(TOKENS_PATH)
+    try:
+        if not write_bundle(config_path, settings, networks_data, tokens):
+            logger.info("ℹ️ Ключ или прокси заданы в настройках значением, а не ENV:... — бандл конфигурации не сохраняется")
+    except OSError as e:
+        logger.warning(f"⚠️ Не удалось сохранить бандл конфигурации: {e}")
+    return settings, networks_data, tokens
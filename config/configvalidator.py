@@ -1,14 +1,26 @@
 from decimal import Decimal, InvalidOperation
 from eth_utils import decode_hex
+from client.fee_oracle import DEFAULT_FEE_SETTINGS, FEE_SPEEDS
+from client.networks import Network
+from client.signer import DEFAULT_SIGNING_WORKERS
+from client.transport import DEFAULT_POOL_SETTINGS
+from client.tx_lifecycle import DEFAULT_REPLACEMENT_SETTINGS, MIN_FEE_BUMP
 from dotenv import load_dotenv
 from eth_keys import keys
-import requests
+import aiohttp
 import logging
 import json
 import os
 import re
 
 MIN_AMOUNT = Decimal(0.00001)
+ALL_KEYS_MARKER = "ENV:*"
+DEFAULT_MAX_CONCURRENCY = 10
+DEFAULT_RPC_RATE_LIMIT = 20
+NETWORKS_DATA_PATH = "constants/networks_data.json"
+TOKENS_PATH = "constants/tokens.json"
+# Ключи одной стратегии в списке "strategies"; без списка стратегия одна и берётся из ключей верхнего уровня
+STRATEGY_KEYS = ("name", "network", "token_a", "token_b", "amount", "private_key", "atomic_cycle", "max_concurrency")
 logger = logging.getLogger(__name__)
 load_dotenv(dotenv_path=".env")
 
@@ -77,57 +89,141 @@ class ConfigValidator:
 
         return key
 
-    async def validate_config(self) -> dict:
-        """Валидация всех полей конфигурации"""
-
-        await self.validate_required_keys()
+    @staticmethod
+    async def resolve_private_keys(key: str) -> dict:
+        """Возвращает карту {имя: приватный ключ}; 'ENV:*' раскрывается во все ключи из PRIVATE_KEYS"""
 
-        if "token_a" not in self.config_data:
-            logging.error("Ошибка: Отсутствует 'token_a' в конфигурации.")
-            exit(1)
+        if key != ALL_KEYS_MARKER:
+            return {key[4:] if key.startswith("ENV:") else "default": await ConfigValidator.resolve_private_key(key)}
 
-        if "token_b" not in self.config_data:
-            logging.error("Ошибка: Отсутствует 'token_b' в конфигурации.")
+        raw = os.getenv("PRIVATE_KEYS")
+        if not raw:
+            logging.error("Ошибка: переменная окружения 'PRIVATE_KEYS' не найдена.")
             exit(1)
 
-        if "proxy" not in self.config_data:
-            logging.error("Ошибка: Отсутствует 'proxy' в конфигурации.")
+        try:
+            key_map = json.loads(raw)
+        except json.JSONDecodeError:
+            logging.error("Ошибка: 'PRIVATE_KEYS' в .env имеет некорректный JSON формат.")
             exit(1)
 
-        if "amount" not in self.config_data:
-            logging.error("Ошибка: Отсутствует 'amount' в конфигурации.")
+        if not isinstance(key_map, dict) or not key_map:
+            logging.error("Ошибка: 'PRIVATE_KEYS' должен быть непустым JSON-объектом.")
             exit(1)
 
-        if self.config_data["token_a"] == self.config_data["token_b"]:
-            logging.error("token_a и token_b должны отличаться.")
-            exit(1)
+        return key_map
 
-        if "private_key" not in self.config_data:
-            logging.error("Ошибка: Отсутствует 'private_key' в конфигурации.")
-            exit(1)
+    async def validate_config(self) -> dict:
+        """Валидация всех полей конфигурации"""
 
-        if "network" not in self.config_data:
-            logging.error("Ошибка: Отсутствует 'network' в конфигурации.")
+        if "proxy" not in self.config_data:
+            logging.error("Ошибка: Отсутствует 'proxy' в конфигурации.")
             exit(1)
 
         load_dotenv(dotenv_path="../.env")
 
         resolved_proxy = await self.resolve_proxy(self.config_data["proxy"])
         self.config_data["proxy"] = resolved_proxy
+        await self.validate_proxy(self.config_data["proxy"])
 
-        resolved_key = await self.resolve_private_key(self.config_data["private_key"])
+        self.config_data.setdefault("max_concurrency", DEFAULT_MAX_CONCURRENCY)
+        self.config_data.setdefault("rpc_rate_limit", DEFAULT_RPC_RATE_LIMIT)
+        self.config_data.setdefault("http_pool", {})
+        self.config_data.setdefault("atomic_cycle", False)
+        self.config_data.setdefault("metrics_path", None)
+        self.config_data.setdefault("signing_workers", DEFAULT_SIGNING_WORKERS)
+        self.config_data.setdefault("tx_replacement", {})
+        self.config_data.setdefault("fees", {})
+        self.config_data.setdefault("network_concurrency", {})
+        self.config_data.setdefault("dry_run", False)
+        self.config_data.setdefault("prefilter_wallets", True)
+        await self.validate_positive_number("max_concurrency", self.config_data["max_concurrency"])
+        await self.validate_positive_number("rpc_rate_limit", self.config_data["rpc_rate_limit"])
+        await self.validate_http_pool(self.config_data["http_pool"])
+        await self.validate_flag("atomic_cycle", self.config_data["atomic_cycle"])
+        await self.validate_optional_path("metrics_path", self.config_data["metrics_path"])
+        await self.validate_non_negative_int("signing_workers", self.config_data["signing_workers"])
+        await self.validate_tx_replacement(self.config_data["tx_replacement"])
+        await self.validate_fees(self.config_data["fees"])
+        await self.validate_flag("dry_run", self.config_data["dry_run"])
+        await self.validate_flag("prefilter_wallets", self.config_data["prefilter_wallets"])
+
+        networks_data = self.load_constants(NETWORKS_DATA_PATH)
+        tokens = self.load_constants(TOKENS_PATH)
+
+        if "strategies" not in self.config_data:
+            await self.validate_required_keys()
+            self.config_data["strategies"] = [{key: self.config_data[key] for key in STRATEGY_KEYS
+                                               if key in self.config_data}]
+        strategies = self.config_data["strategies"]
+        if not isinstance(strategies, list) or not strategies:
+            logging.error("Ошибка: 'strategies' должен быть непустым списком.")
+            exit(1)
+        self.config_data["strategies"] = [await self.validate_strategy(strategy, i, networks_data, tokens)
+                                          for i, strategy in enumerate(strategies)]
 
-        await self.validate_private_key(resolved_key)
-        self.config_data["private_key"] = resolved_key
+        names = [strategy["name"] for strategy in self.config_data["strategies"]]
+        if len(set(names)) != len(names):
+            logging.error("Ошибка: имена стратегий ('name') должны быть уникальными.")
+            exit(1)
+        await self.validate_unique_pairs(self.config_data["strategies"], tokens)
 
-        await self.validate_token_a(self.config_data["token_a"])
-        await self.validate_token_b(self.config_data["token_b"])
-        await self.validate_network(self.config_data["network"])
-        await self.validate_amount(self.config_data["amount"])
-        await self.validate_proxy(self.config_data["proxy"])
+        await self.validate_network_concurrency(self.config_data["network_concurrency"], networks_data)
 
         return self.config_data
 
+    async def validate_strategy(self, strategy: dict, index: int, networks_data: dict, tokens: dict) -> dict:
+        """Валидация одной стратегии; возвращает её с раскрытыми ключами и значениями по умолчанию"""
+        if not isinstance(strategy, dict):
+            logging.error(f"Ошибка: стратегия #{index + 1} должна быть объектом.")
+            exit(1)
+        unknown = set(strategy) - set(STRATEGY_KEYS)
+        if unknown:
+            logging.error(f"Ошибка: неизвестные параметры стратегии #{index + 1}: {sorted(unknown)}.")
+            exit(1)
+        for key in ("network", "token_a", "token_b", "amount", "private_key"):
+            if key not in strategy:
+                logging.error(f"Ошибка: в стратегии #{index + 1} отсутствует '{key}'.")
+                exit(1)
+
+        if strategy["token_a"] == strategy["token_b"]:
+            logging.error("token_a и token_b должны отличаться.")
+            exit(1)
+
+        await self.validate_network(strategy["network"], networks_data)
+        await self.validate_token(strategy["token_a"], strategy["network"], tokens)
+        await self.validate_token(strategy["token_b"], strategy["network"], tokens)
+        await self.validate_deposit_token(strategy["token_a"], strategy["network"], networks_data, tokens)
+        await self.validate_amount(strategy["amount"])
+
+        private_keys = await self.resolve_private_keys(strategy["private_key"])
+        for private_key in private_keys.values():
+            await self.validate_private_key(private_key)
+
+        resolved = {
+            "name": strategy.get("name") or f"{strategy['network']}:{strategy['token_a']}/{strategy['token_b']}",
+            "network": strategy["network"],
+            "token_a": strategy["token_a"],
+            "token_b": strategy["token_b"],
+            "amount": float(strategy["amount"]),
+            "private_keys": private_keys,
+            "atomic_cycle": strategy.get("atomic_cycle", self.config_data["atomic_cycle"]),
+            "max_concurrency": strategy.get("max_concurrency", self.config_data["max_concurrency"]),
+        }
+        await self.validate_flag("atomic_cycle", resolved["atomic_cycle"])
+        await self.validate_positive_number("max_concurrency", resolved["max_concurrency"])
+        return resolved
+
+    @staticmethod
+    def load_constants(path: str) -> dict:
+        """Загружает JSON с константами сетей или токенов"""
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError) as e:
+            logging.error(f"Ошибка: не удалось загрузить {path}: {e}")
+            exit(1)
+
     async def validate_required_keys(self):
         required_keys = [
             "token_a",
@@ -154,34 +250,85 @@ class ConfigValidator:
             exit(1)
 
     @staticmethod
-    async def validate_network(network: str) -> None:
-        """Валидация названия сети"""
-        networks = [
-            "ZKSYNC"
-        ]
-        if network not in networks:
-            logging.error("Ошибка: Неподдерживаемая сеть! Введите одну из поддерживаемых сетей.")
+    async def validate_network(network: str, networks_data: dict) -> None:
+        """Валидация названия сети: известная сеть, для которой есть параметры в networks_data.json"""
+        try:
+            Network.from_name(network)
+        except ValueError as e:
+            logging.error(f"Ошибка: {e}")
+            exit(1)
+        if network not in networks_data:
+            logging.error(f"Ошибка: нет параметров сети {network} в {NETWORKS_DATA_PATH}. "
+                          f"Доступные сети: {', '.join(networks_data)}.")
+            exit(1)
+        missing = {"chain_id", "rpc_url", "explorer_url", "router_address", "factory_address"} - set(networks_data[network])
+        if missing:
+            logging.error(f"Ошибка: в параметрах сети {network} не хватает {sorted(missing)}.")
             exit(1)
 
     @staticmethod
-    async def validate_token_a(token_a: str) -> None:
-        """Валидация названия исходного токена"""
-        tokens_a = [
-            "ETH"
-        ]
-        if token_a not in tokens_a:
-            logging.error("Ошибка: Неподдерживаемый токен! Введите ETH.")
+    async def validate_token(token: str, network: str, tokens: dict) -> None:
+        """Валидация токена: символ из tokens.json для этой сети или адрес контракта"""
+        if not isinstance(token, str):
+            logging.error("Ошибка: токен должен быть символом или адресом.")
+            exit(1)
+        if token.startswith("0x"):
+            if not re.fullmatch(r"0x[0-9a-fA-F]{40}", token):
+                logging.error(f"Ошибка: некорректный адрес токена {token}.")
+                exit(1)
+            return
+        known = tokens.get(network, {})
+        if token not in known:
+            logging.error(f"Ошибка: неподдерживаемый токен {token} в сети {network}! "
+                          f"Доступные токены: {', '.join(known) or 'нет'}.")
             exit(1)
 
     @staticmethod
-    async def validate_token_b(token_b: str) -> None:
-        """Валидация названия конечного токена"""
-        tokens_b = [
-            "USDT"
-        ]
-        if token_b not in tokens_b:
-            logging.error("Ошибка: Неподдерживаемый токен! Введите USDC.")
+    async def validate_deposit_token(token: str, network: str, networks_data: dict, tokens: dict) -> None:
+        """
+        Валидация token_a: круг вносит в пул нативный токен сети (value транзакции, 18 знаков),
+        поэтому token_a должен быть обёрнутым нативным токеном — wrapped_native_address сети
+        """
+        wrapped = networks_data[network].get("wrapped_native_address")
+        if not wrapped:
+            logging.error(f"Ошибка: для сети {network} не указан wrapped_native_address в {NETWORKS_DATA_PATH}.")
+            exit(1)
+        address = token if token.startswith("0x") else tokens[network][token]
+        if address.lower() != wrapped.lower():
+            logging.error(f"Ошибка: token_a {token} — не обёрнутый нативный токен сети {network} ({wrapped}). "
+                          f"Круг вносит в пул нативный токен, депозит ERC-20 не поддерживается.")
+            exit(1)
+
+    @staticmethod
+    async def validate_unique_pairs(strategies: list[dict], tokens: dict) -> None:
+        """
+        Валидация пар: очередь кругов общая и выбирается по сети и паре, поэтому две стратегии с одной парой
+        забирали бы задания друг друга и могли выполнить один круг дважды
+        """
+        seen = {}
+        for strategy in strategies:
+            network = strategy["network"]
+            pair = (network, *(
+                (token if token.startswith("0x") else tokens[network][token]).lower()
+                for token in (strategy["token_a"], strategy["token_b"])))
+            if pair in seen:
+                logging.error(f"Ошибка: стратегии '{seen[pair]}' и '{strategy['name']}' используют одну пару "
+                              f"{strategy['token_a']}/{strategy['token_b']} в сети {network}; "
+                              f"объедините их кошельки в одну стратегию.")
+                exit(1)
+            seen[pair] = strategy["name"]
+
+    @staticmethod
+    async def validate_network_concurrency(network_concurrency: dict, networks_data: dict) -> None:
+        """Валидация лимитов одновременных кругов по сетям"""
+        if not isinstance(network_concurrency, dict):
+            logging.error("Ошибка: 'network_concurrency' должен быть объектом.")
             exit(1)
+        for network, value in network_concurrency.items():
+            if network not in networks_data:
+                logging.error(f"Ошибка: неизвестная сеть 'network_concurrency.{network}'.")
+                exit(1)
+            await ConfigValidator.validate_positive_number(f"network_concurrency.{network}", value)
 
     @staticmethod
     async def validate_proxy(proxy: str) -> None:
@@ -196,11 +343,15 @@ class ConfigValidator:
             logging.error("Ошибка: Неверный формат прокси! Должен быть 'login:pass@host:port'.")
             exit(1)
 
-        proxy_url = {
-            "http": f"http://{proxy}"
-        }
-        response = requests.get("https://httpbin.org/ip", proxies=proxy_url, timeout=5)
-        if response.status_code != 200:
+        # Асинхронная проверка, не блокирующая event loop
+        try:
+            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=5)) as session:
+                async with session.get("https://httpbin.org/ip", proxy=f"http://{proxy}") as response:
+                    status = response.status
+        except (aiohttp.ClientError, TimeoutError) as e:
+            logging.error(f"Ошибка: 'proxy' нерабочий: {e}")
+            exit(1)
+        if status != 200:
             logging.error("Ошибка: 'proxy' нерабочий или вернул неверный статус-код!")
             exit(1)
 
@@ -223,3 +374,81 @@ class ConfigValidator:
         if amount < MIN_AMOUNT:
             logging.error("Количество токенов для отправки слишком мало, введите значение больше 0.0001.")
             exit(1)
+
+    @staticmethod
+    async def validate_positive_number(name: str, value) -> None:
+        """Валидация положительного числового параметра"""
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+            logging.error(f"Ошибка: '{name}' должен быть положительным числом.")
+            exit(1)
+
+    @staticmethod
+    async def validate_http_pool(http_pool: dict) -> None:
+        """Валидация настроек пула HTTP-соединений"""
+        if not isinstance(http_pool, dict):
+            logging.error("Ошибка: 'http_pool' должен быть объектом.")
+            exit(1)
+        for name, value in http_pool.items():
+            if name not in DEFAULT_POOL_SETTINGS:
+                logging.error(f"Ошибка: неизвестный параметр 'http_pool.{name}'.")
+                exit(1)
+            await ConfigValidator.validate_positive_number(f"http_pool.{name}", value)
+
+    @staticmethod
+    async def validate_tx_replacement(tx_replacement: dict) -> None:
+        """Валидация настроек замены зависших транзакций"""
+        if not isinstance(tx_replacement, dict):
+            logging.error("Ошибка: 'tx_replacement' должен быть объектом.")
+            exit(1)
+        for name, value in tx_replacement.items():
+            if name not in DEFAULT_REPLACEMENT_SETTINGS:
+                logging.error(f"Ошибка: неизвестный параметр 'tx_replacement.{name}'.")
+                exit(1)
+            if name == "cancel":
+                await ConfigValidator.validate_flag("tx_replacement.cancel", value)
+            elif name == "max_bumps":
+                await ConfigValidator.validate_non_negative_int("tx_replacement.max_bumps", value)
+            else:
+                await ConfigValidator.validate_positive_number(f"tx_replacement.{name}", value)
+        if tx_replacement.get("fee_bump", MIN_FEE_BUMP) < MIN_FEE_BUMP:
+            logging.error(f"Ошибка: 'tx_replacement.fee_bump' должен быть не меньше {MIN_FEE_BUMP} "
+                          f"(ноды не принимают замену с меньшим повышением комиссии).")
+            exit(1)
+
+    @staticmethod
+    async def validate_fees(fees: dict) -> None:
+        """Валидация настроек оракула комиссий"""
+        if not isinstance(fees, dict):
+            logging.error("Ошибка: 'fees' должен быть объектом.")
+            exit(1)
+        for name, value in fees.items():
+            if name not in DEFAULT_FEE_SETTINGS:
+                logging.error(f"Ошибка: неизвестный параметр 'fees.{name}'.")
+                exit(1)
+            if name == "speed":
+                if value not in FEE_SPEEDS:
+                    logging.error(f"Ошибка: 'fees.speed' должен быть одним из: {', '.join(FEE_SPEEDS)}.")
+                    exit(1)
+            else:
+                await ConfigValidator.validate_positive_number(f"fees.{name}", value)
+
+    @staticmethod
+    async def validate_flag(name: str, value) -> None:
+        """Валидация логического параметра"""
+        if not isinstance(value, bool):
+            logging.error(f"Ошибка: '{name}' должен быть true или false.")
+            exit(1)
+
+    @staticmethod
+    async def validate_optional_path(name: str, value) -> None:
+        """Валидация необязательного пути к файлу"""
+        if value is not None and (not isinstance(value, str) or not value):
+            logging.error(f"Ошибка: '{name}' должен быть путём к файлу или null.")
+            exit(1)
+
+    @staticmethod
+    async def validate_non_negative_int(name: str, value) -> None:
+        """Валидация неотрицательного целого параметра"""
+        if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+            logging.error(f"Ошибка: '{name}' должен быть целым числом не меньше 0.")
+            exit(1)
@@ -1,70 +1,213 @@
+"""
+Точка входа: python main.py [run|scan|quote|bench] [параметры]; без подкоманды выполняется run.
+Тяжёлые модули (web3, aiohttp, eth_account) импортируются внутри команд, поэтому --help их не загружает
+(bench загружает: он гоняет настоящий клиент против заглушки RPC), а конфигурация после первой проверки
+берётся из cache/config_bundle.json.
+"""
+import argparse
 import asyncio
-import json
-from config.configvalidator import ConfigValidator
-from client.client import Client
-from pool_actions.add_liquidity import add_liquidity
-from pool_actions.burn_liquidity import burn_liquidity
+import sys
+from typing import Optional
+
 from utils.logger import logger
 
-with open("abi/router_abi.json", "r", encoding="utf-8") as f:
-    ROUTER_ABI = json.load(f)
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+DEFAULT_CONFIG_PATH = "config/settings.json"
+COMMANDS = ("run", "scan", "quote", "bench")
+
 
-with open("abi/factory_abi.json", "r", encoding="utf-8") as f:
-    FACTORY_ABI = json.load(f)
+async def load_settings(args: argparse.Namespace) -> tuple[dict, dict, dict]:
+    """Загружает конфигурацию (из бандла или с полной валидацией) и настраивает общие сервисы."""
+    from client.fee_oracle import FEE_POLICY
+    from client.signer import SIGNING_SERVICE
+    from client.transport import TRANSPORT_POOL
+    from client.tx_lifecycle import REPLACEMENT_POLICY
+    from config.bundle import load_config
 
-with open("abi/classic_pool_abi.json", "r", encoding="utf-8") as f:
-    POOL_ABI = json.load(f)
+    logger.info("⚙️ Загрузка и валидация параметров...\n")
+    settings, networks_data, tokens = await load_config(args.config, use_bundle=not args.revalidate)
+    TRANSPORT_POOL.configure(**settings["http_pool"])
+    SIGNING_SERVICE.configure(settings["signing_workers"])
+    REPLACEMENT_POLICY.configure(**settings["tx_replacement"])
+    FEE_POLICY.configure(**settings["fees"])
+    return settings, networks_data, tokens
 
-ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
 
+def selected_strategies(settings: dict, names: Optional[list[str]]) -> list[dict]:
+    strategies = [s for s in settings["strategies"] if not names or s["name"] in names]
+    if not strategies:
+        raise ValueError(f"Нет стратегий с именами {names}; доступны: {[s['name'] for s in settings['strategies']]}")
+    return strategies
+
+
+def strategy_w3(strategy: dict, networks_data: dict, settings: dict):
+    """Общий AsyncWeb3 сети стратегии с лимитом частоты из настроек."""
+    from client.client import get_shared_w3
+    from client.networks import Network
+
+    network = networks_data[strategy["network"]]
+    w3 = get_shared_w3(network["rpc_url"], settings["proxy"], Network.from_chain_id(network["chain_id"]))
+    w3.provider.set_rate_limit(settings["rpc_rate_limit"])
+    return w3
+
+
+async def run(args: argparse.Namespace) -> None:
+    """Круги add/burn по всем стратегиям."""
+    from client.contracts import load_abi
+    from client.simulation import log_simulation_summary
+    from client.telemetry import TELEMETRY
+    from runner.strategy_runner import Strategy, run_strategies, log_strategy_report
+
+    logger.info("🚀 Запуск скрипта SyncSwap POOL...\n")
+    settings, networks_data, tokens = await load_settings(args)
+    dry_run = settings["dry_run"] or args.dry_run
+    if dry_run:
+        logger.info("🧪 Пробный запуск: транзакции только симулируются и не отправляются\n")
+
+    results = await run_strategies(
+        strategies=[Strategy(**strategy) for strategy in selected_strategies(settings, args.strategy)],
+        networks_data=networks_data,
+        tokens=tokens,
+        abis={"factory": load_abi("factory"), "pool": load_abi("classic_pool"), "router": load_abi("router")},
+        zero_address=ZERO_ADDRESS,
+        proxy=settings["proxy"],
+        network_concurrency=settings["network_concurrency"],
+        default_network_concurrency=settings["max_concurrency"],
+        rpc_rate_limit=settings["rpc_rate_limit"],
+        dry_run=dry_run,
+        prefilter=settings["prefilter_wallets"],
+    )
+    log_strategy_report(results)
+    log_simulation_summary()
+    TELEMETRY.log_summary()
+    if settings["metrics_path"]:
+        TELEMETRY.write_prometheus(settings["metrics_path"])
+        logger.info(f"📈 Метрики RPC сохранены в {settings['metrics_path']}")
+
+
+async def scan(args: argparse.Namespace) -> None:
+    """Снимок балансов кошельков стратегий без запуска кругов."""
+    from eth_account import Account
+    from runner.batch_runner import prefilter_wallets
+    from runner.strategy_runner import resolve_token
+    from runner.wallet_scanner import snapshot_path
+
+    settings, networks_data, tokens = await load_settings(args)
+    for strategy in selected_strategies(settings, args.strategy):
+        logger.info(f"🧩 Стратегия {strategy['name']}")
+        wallets = {name: Account.from_key(key).address for name, key in strategy["private_keys"].items()}
+        _, short = await prefilter_wallets(
+            strategy_w3(strategy, networks_data, settings), networks_data[strategy["network"]], strategy["network"],
+            wallets, resolve_token(tokens, strategy["network"], strategy["token_a"]),
+            resolve_token(tokens, strategy["network"], strategy["token_b"]), strategy["amount"],
+            strategy["atomic_cycle"], snapshot_path(strategy["name"]))
+        for result in short:
+            logger.warning(f"⚠️ {result.name} ({result.address}): {result.error}")
+        logger.info(f"💾 Снимок сохранён в {snapshot_path(strategy['name'])}\n")
+
+
+async def quote(args: argparse.Namespace) -> None:
+    """Котировки комиссий сети и ожидаемый результат одного круга по текущему состоянию пула."""
+    from client.client import Client
+    from client.contracts import load_abi
+    from client.fee_oracle import FEE_SPEEDS, FeeOracle
+    from pool_actions.pool_math import apply_mint, quote_burn_single, quote_mint_single
+    from pool_actions.pool_registry import POOL_REGISTRY
+    from pool_actions.pool_snapshot import read_pool_snapshot
+    from runner.strategy_runner import resolve_token
+    from runner.wallet_scanner import cycle_cost
+
+    settings, networks_data, tokens = await load_settings(args)
+    for strategy in selected_strategies(settings, args.strategy):
+        network = networks_data[strategy["network"]]
+        w3 = strategy_w3(strategy, networks_data, settings)
+        token_a = resolve_token(tokens, strategy["network"], strategy["token_a"])
+        token_b = resolve_token(tokens, strategy["network"], strategy["token_b"])
+        logger.info(f"🧩 Стратегия {strategy['name']}")
+
+        oracle = FeeOracle.for_w3(w3)
+        for speed in FEE_SPEEDS:
+            fee = await oracle.quote(speed)
+            logger.info(f"⛽ {speed}: base fee {w3.from_wei(fee.base_fee, 'gwei'):.4f} gwei, "
+                        f"чаевые {w3.from_wei(fee.max_priority_fee_per_gas, 'gwei'):.4f} gwei, "
+                        f"max fee {w3.from_wei(fee.max_fee_per_gas, 'gwei'):.4f} gwei")
+        cost = await cycle_cost(w3, network["chain_id"], strategy["amount"], strategy["atomic_cycle"])
+        logger.info(f"💰 Нужно на круг (депозит и газ): {w3.from_wei(cost, 'ether'):.6f}")
+
+        # Клиент нужен только для чтения пула: транзакции не строятся
+        client = Client(token_a, token_b, network["chain_id"], network["rpc_url"],
+                        next(iter(strategy["private_keys"].values())), strategy["amount"], network["explorer_url"],
+                        settings["proxy"], w3=w3, multicall_address=network.get("multicall_address"))
+        factory = await client.get_contract(network["factory_address"], abi=load_abi("factory"))
+        pool_address = await POOL_REGISTRY.resolve(client, factory, token_a, token_b)
+        if pool_address == ZERO_ADDRESS:
+            logger.error("Пул для указанной пары токенов не существует\n")
+            continue
+        pool = await client.get_contract(pool_address, abi=load_abi("classic_pool"))
+        snapshot, _ = await read_pool_snapshot(client, pool, token_a, token_b)
+        amount = w3.to_wei(strategy["amount"], "ether")
+        liquidity = quote_mint_single(snapshot, amount, token_a)
+        amount0, amount1 = (amount, 0) if snapshot.is_token0(token_a) else (0, amount)
+        returned = quote_burn_single(apply_mint(snapshot, amount0, amount1), liquidity, token_a)
+        logger.info(f"🏊 Пул {pool_address} на блоке {snapshot.block_number}: резервы {snapshot.reserve0} / "
+                    f"{snapshot.reserve1}, LP {snapshot.total_supply}, комиссия {snapshot.swap_fee / 1000:.3f}%")
+        logger.info(f"📐 Круг {strategy['amount']}: LP {liquidity}, возврат {w3.from_wei(returned, 'ether'):.8f}, "
+                    f"потери на комиссиях пула {w3.from_wei(amount - returned, 'ether'):.8f}\n")
+
+
+def bench(argv: list[str]) -> None:
+    from bench.run_bench import parse_args, run_bench
+
+    args = parse_args(argv)
+    asyncio.run(run_bench(tuple(args.wallets), args.latency, args.block_time, args.port, args.atomic,
+                          args.json_path, args.signing_workers))
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="SyncSwap: круги add/burn ликвидности")
+    commands = parser.add_subparsers(dest="command")
+    for name, help_text in (("run", "выполнить круги всех стратегий"),
+                            ("scan", "снимок балансов кошельков в cache/wallets_<стратегия>.csv"),
+                            ("quote", "комиссии сети и ожидаемый результат круга")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("--config", default=DEFAULT_CONFIG_PATH, help="файл настроек")
+        command.add_argument("--strategy", nargs="+", help="только стратегии с этими именами")
+        command.add_argument("--revalidate", action="store_true",
+                             help="проверить настройки заново, не используя собранный бандл")
+        if name == "run":
+            command.add_argument("--dry-run", action="store_true", help="только симулировать транзакции")
+    # Параметры бенчмарка разбирает bench.run_bench
+    commands.add_parser("bench", help="бенчмарк против заглушки RPC (python main.py bench --help)", add_help=False)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in COMMANDS + ("-h", "--help"):
+        argv = ["run", *argv]
+    if argv[0] == "bench":
+        bench(argv[1:])
+        return
+
+    args = parse_args(argv)
+    command = {"run": run, "scan": scan, "quote": quote}[args.command]
+
+    async def execute() -> None:
+        from client.gas_profile import GAS_PROFILE
+        from client.signer import SIGNING_SERVICE
+        from client.transport import TRANSPORT_POOL
+
+        try:
+            await command(args)
+        except Exception as e:
+            logger.error(f"Произошла ошибка в основном пути: {e}")
+        finally:
+            await TRANSPORT_POOL.close()
+            SIGNING_SERVICE.close()
+            GAS_PROFILE.flush()
 
-async def main():
-    try:
-        logger.info("🚀 Запуск скрипта SyncSwap POOL...\n")
-        # Загрузка параметров
-        logger.info("⚙️ Загрузка и валидация параметров...\n")
-        validator = ConfigValidator("config/settings.json")
-        settings = await validator.validate_config()
-
-        with open("constants/networks_data.json", "r", encoding="utf-8") as file:
-            networks_data = json.load(file)
-
-        network = networks_data[settings["network"]]
-        factory_address = networks_data[settings["network"]]["factory_address"]
-        router_address = network["router_address"]
-
-        # Загрузка адресов токенов
-        with open("constants/tokens.json", "r") as file:
-            tokens = json.load(file)
-
-        network_name = settings["network"]
-        token_a_symbol = settings["token_a"]
-        token_b_symbol = settings["token_b"]
-
-        token_a_address = tokens[network_name][token_a_symbol]
-        token_b_address = tokens[network_name][token_b_symbol]
-
-        client = Client(
-            token_a_address=token_a_address,
-            token_b_address=token_b_address,
-            chain_id=network["chain_id"],
-            rpc_url=network["rpc_url"],
-            private_key=settings["private_key"],
-            amount=float(settings["amount"]),
-            explorer_url=network["explorer_url"],
-            proxy=settings["proxy"]
-        )
-        amount_in = await client.to_wei_main(client.amount)
-        logger.info("💸 Добавляем ликвидность в пул\n")
-        # Добавление ликвидности
-        return_dict = await add_liquidity(client, amount_in, factory_address, router_address, token_a_address,
-                                          token_b_address, FACTORY_ABI, POOL_ABI, ROUTER_ABI, ZERO_ADDRESS)
-        # Вывод ликвидности
-        logger.info("💸 Вынимаем ликвидность из пула\n")
-        await burn_liquidity(client, return_dict)
-    except Exception as e:
-        logger.error(f"Произошла ошибка в основном пути: {e}")
+    asyncio.run(execute())
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    main()
@@ -1,17 +1,44 @@
 from client.client import Client
+from pool_actions.pool_math import DEFAULT_SLIPPAGE, quote_mint_single, with_slippage
+from pool_actions.pool_registry import POOL_REGISTRY
+from pool_actions.pool_snapshot import read_pool_snapshot
+from runner.job_store import ADD_CONFIRMED, ADD_SENT, POOL_RESOLVED
 from utils.logger import logger
 from eth_abi import encode
+from typing import Callable, Optional
+
+
+def build_return_dict(pool_address: str, token_a_address: str, token_b_address: str, factory_address: str,
+                      router_address: str, zero_address: str, factory_abi: list, router_abi: list,
+                      pool_abi: list) -> dict:
+    """Параметры позиции для burn_liquidity — после add или при возобновлении круга из очереди."""
+    return {
+        "poolAddress": pool_address,
+        "tokenA": token_a_address,
+        "tokenB": token_b_address,
+        "factoryAddress": factory_address,
+        "routerAddress": router_address,
+        "zeroAddress": zero_address,
+        "factoryAbi": factory_abi,
+        "routerAbi": router_abi,
+        "poolAbi": pool_abi
+    }
 
 
 async def add_liquidity(client: Client, amount: int, factory_address: str, router_address: str,
                         token_a_address: str, token_b_address: str, factory_abi: list, pool_abi: list, router_abi: list,
-                        zero_address: str):
+                        zero_address: str, on_step: Optional[Callable[..., None]] = None):
+    # on_step(этап, **поля) сохраняет прогресс круга, чтобы после падения продолжить с того же места
+    on_step = on_step or (lambda stage, **fields: None)
     try:
         factory_contract = await client.get_contract(factory_address, abi=factory_abi)
 
-        # Проверка существования пула и получение адреса
-        pool_address = await factory_contract.functions.getPool(client.w3.to_checksum_address(token_a_address),
-                                                                client.w3.to_checksum_address(token_b_address)).call()
+        # Получение адреса пула: из сохранённого реестра, при первом обращении к паре — через getPool
+        pool_address = await POOL_REGISTRY.resolve(client, factory_contract, token_a_address, token_b_address)
+        if pool_address == zero_address:
+            logger.error("Пул для указанной пары токенов не существует")
+            return None
+        on_step(POOL_RESOLVED, pool_address=pool_address)
 
         # Проверка, что есть достаточно средств на оплату депозита + газ
         gas_fee = await client.get_tx_fee()
@@ -21,7 +48,7 @@ async def add_liquidity(client: Client, amount: int, factory_address: str, route
             logger.error(
                 f"Недостаточно средств на депозит и газ! Требуется: {await client.from_wei_main(total_cost):.6f}"
                 f" фактический баланс: {await client.from_wei_main(native_balance):.6f}")
-            exit(1)
+            return None
 
         # Сборка inputs
         inputs = [[zero_address, amount, True]]
@@ -30,14 +57,13 @@ async def add_liquidity(client: Client, amount: int, factory_address: str, route
 
         pool_contract = await client.get_contract(pool_address, abi=pool_abi)
         # Получение параметров пула
-        total_supply = await pool_contract.functions.totalSupply().call()
-        _, reserve_eth = await pool_contract.functions.getReserves().call()
+        snapshot, _ = await read_pool_snapshot(client, pool_contract, token_a_address, token_b_address)
 
-        # Расчет минимума токенов LP
-        min_pool_out = int(amount * total_supply / reserve_eth / 2 * 0.98)
+        # Расчет минимума токенов LP: односторонний mint с учётом комиссии пула
+        min_pool_out = with_slippage(quote_mint_single(snapshot, amount, token_a_address), DEFAULT_SLIPPAGE)
 
         router_contract = await client.get_contract(router_address, abi=router_abi)
-        transaction = await router_contract.functions.addLiquidity2(
+        transaction = await client.build_contract_tx(router_contract.functions.addLiquidity2(
             pool_address,
             inputs,
             encode_address,
@@ -45,25 +71,22 @@ async def add_liquidity(client: Client, amount: int, factory_address: str, route
             zero_address,
             b'0x',
             zero_address,
-        ).build_transaction(await client.prepare_tx(value=await client.from_wei_main(amount)))
+        ), value=await client.from_wei_main(amount))
 
         tx_hash = await client.sign_and_send_tx(transaction)
+        if tx_hash is None:
+            return None
+        on_step(ADD_SENT, add_tx=tx_hash)
         result = await client.wait_tx(tx_hash, client.explorer_url)
 
         if result is True:
-            return_dict = {
-                "poolAddress": pool_address,
-                "tokenA": token_a_address,
-                "factoryAddress": factory_address,
-                "routerAddress": router_address,
-                "zeroAddress": zero_address,
-                "factoryAbi": factory_abi,
-                "routerAbi": router_abi,
-                "poolAbi": pool_abi
-            }
-            return return_dict
+            on_step(ADD_CONFIRMED)
+            return build_return_dict(pool_address, token_a_address, token_b_address, factory_address,
+                                     router_address, zero_address, factory_abi, router_abi, pool_abi)
         else:
             logger.error("Транзакция не прошла, завершение работы...")
 
     except Exception as e:
         logger.error(f"Произошла критическая ошибка при добавлении ликвидности: {e}")
+        # Выданный под транзакцию nonce мог остаться неиспользованным
+        await client.nonce_manager.resync()
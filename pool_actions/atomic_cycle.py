@@ -0,0 +1,106 @@
+from client.client import Client
+from client.contracts import compile_abi
+from pool_actions.permit import sign_lp_permit, split_signature
+from pool_actions.pool_math import DEFAULT_SLIPPAGE, apply_mint, quote_burn_single, quote_mint, with_slippage
+from pool_actions.pool_registry import POOL_REGISTRY
+from pool_actions.pool_snapshot import read_pool_snapshot
+from runner.job_store import ATOMIC_SENT, POOL_RESOLVED
+from utils.logger import logger
+from eth_abi import encode
+from typing import Callable, Optional
+
+
+async def atomic_cycle(client: Client, amount: int, factory_address: str, router_address: str,
+                       token_a_address: str, token_b_address: str, factory_abi: list, pool_abi: list, router_abi: list,
+                       zero_address: str, on_step: Optional[Callable[..., None]] = None) -> Optional[bool]:
+    """
+    Полный круг одной транзакцией router.multicall: [selfPermit] + addLiquidity2 + burnLiquiditySingle.
+    Сжигается гарантированный минимум нового LP плюс LP, уже лежащий на кошельке, так что остаток
+    от проскальзывания не теряется, а сжигается в следующем круге.
+    Возвращает None, если атомарный режим недоступен (нет permit и нет allowance) — тогда нужен обычный круг.
+    """
+    on_step = on_step or (lambda stage, **fields: None)
+    try:
+        factory_contract = await client.get_contract(factory_address, abi=factory_abi)
+        pool_address = await POOL_REGISTRY.resolve(client, factory_contract, token_a_address, token_b_address)
+        if pool_address == zero_address:
+            logger.error("Пул для указанной пары токенов не существует")
+            return False
+        on_step(POOL_RESOLVED, pool_address=pool_address)
+
+        # Проверка, что есть достаточно средств на оплату депозита + газ
+        gas_fee = await client.get_tx_fee()
+        native_balance = await client.get_native_balance()
+        if native_balance < gas_fee + amount:
+            logger.error(
+                f"Недостаточно средств на депозит и газ! Требуется: {await client.from_wei_main(gas_fee + amount):.6f}"
+                f" фактический баланс: {await client.from_wei_main(native_balance):.6f}")
+            return False
+
+        pool_contract = await client.get_contract(pool_address, abi=pool_abi)
+        snapshot, (lp_balance_in_wei, allowance) = await read_pool_snapshot(
+            client, pool_contract, token_a_address, token_b_address,
+            extra_calls=[
+                pool_contract.functions.balanceOf(client.address),
+                pool_contract.functions.allowance(client.address, router_address),
+            ])
+
+        # Котировки обеих частей круга по одному снимку: burn считается по состоянию пула после mint
+        is_token0 = snapshot.is_token0(token_a_address)
+        amount0, amount1 = (amount, 0) if is_token0 else (0, amount)
+        min_pool_out = with_slippage(quote_mint(snapshot, amount0, amount1), DEFAULT_SLIPPAGE)
+        burn_amount = lp_balance_in_wei + min_pool_out
+        min_eth_out = with_slippage(quote_burn_single(apply_mint(snapshot, amount0, amount1), burn_amount,
+                                                      token_a_address), DEFAULT_SLIPPAGE)
+
+        # Кодировщики функций роутера скомпилированы один раз на ABI — без поиска по ABI в каждом круге
+        router = compile_abi(router_abi)
+        calls = []
+        if allowance < burn_amount:
+            permit = await sign_lp_permit(client, pool_contract, router_address, burn_amount)
+            if permit is None:
+                logger.warning("⚠️ Пул не поддерживает permit — атомарный круг недоступен, выполняем обычный")
+                return None
+            _, deadline, signature = permit
+            v, r, s = split_signature(signature)
+            calls.append(router["selfPermit"].encode(pool_address, burn_amount, deadline, v, r, s))
+
+        calls.append(router["addLiquidity2"].encode(
+            pool_address,
+            [[zero_address, amount, True]],
+            encode(["address"], [str(client.address)]),
+            min_pool_out,
+            zero_address,
+            b'0x',
+            zero_address,
+        ))
+        calls.append(router["burnLiquiditySingle"].encode(
+            pool_address,
+            burn_amount,
+            encode(["address", "address", "uint8"], [token_a_address, client.address, 1]),
+            min_eth_out,
+            zero_address,
+            b'0x',
+        ))
+
+        # Calldata собирается один раз, газ оценивается один раз в sign_and_send_tx
+        transaction = await client.prepare_tx(value=await client.from_wei_main(amount))
+        transaction.update({
+            "to": client.w3.to_checksum_address(router_address),
+            "data": router["multicall"].encode_hex(calls),
+        })
+
+        tx_hash = await client.sign_and_send_tx(transaction)
+        if tx_hash is None:
+            return False
+        # Хэш multicall хранится в add_tx: при возобновлении достаточно дождаться его receipt
+        on_step(ATOMIC_SENT, add_tx=tx_hash)
+        result = await client.wait_tx(tx_hash, client.explorer_url)
+        if result is True:
+            logger.info("Круг завершен (одной транзакцией)")
+        return result
+
+    except Exception as e:
+        logger.error(f"Произошла критическая ошибка в атомарном круге: {e}")
+        await client.nonce_manager.resync()
+        return False
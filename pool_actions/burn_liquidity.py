@@ -1,16 +1,25 @@
 from client.client import Client
+from pool_actions.pool_math import DEFAULT_SLIPPAGE, quote_burn_single, with_slippage
+from pool_actions.permit import sign_lp_permit
+from pool_actions.pool_snapshot import read_pool_snapshot
+from runner.job_store import APPROVE_SENT, BURN_SENT
 from utils.logger import logger
 from eth_abi import encode
+from typing import Callable, Optional
 
+# Лимит газа для burn, отправляемого до подтверждения approve (оценить газ в этот момент нельзя)
+PIPELINED_BURN_GAS_LIMIT = 1_500_000
 
-async def burn_liquidity(client: Client, return_dict: dict):
+
+async def burn_liquidity(client: Client, return_dict: dict, on_step: Optional[Callable[..., None]] = None) -> bool:
+    on_step = on_step or (lambda stage, **fields: None)
     try:
         # Проверка, что есть достаточно средств на оплату газа
         gas_fee = await client.get_tx_fee()
         native_balance = await client.get_native_balance()
         if native_balance < gas_fee:
             logger.error(f"Недостаточно средств на газ: {await client.from_wei_main(native_balance)}")
-            return
+            return False
 
         # Формирование бёрн даты
         burn_data = encode(
@@ -19,52 +28,91 @@ async def burn_liquidity(client: Client, return_dict: dict):
         )
 
         pool_contract = await client.get_contract(return_dict["poolAddress"], abi=return_dict["poolAbi"])
-        lp_balance_in_wei = await pool_contract.functions.balanceOf(client.address).call()
 
-        # Получение параметров пула
-        total_supply = await pool_contract.functions.totalSupply().call()
-        _, reserve_eth = await pool_contract.functions.getReserves().call()
+        # Получение параметров пула и LP-позиции одним запросом
+        snapshot, (lp_balance_in_wei, allowance) = await read_pool_snapshot(
+            client, pool_contract, return_dict["tokenB"], return_dict["tokenA"],
+            extra_calls=[
+                pool_contract.functions.balanceOf(client.address),
+                pool_contract.functions.allowance(client.address, return_dict["routerAddress"]),
+            ])
 
-        # Расчет минимума токенов LP
-        min_eth_out = int(lp_balance_in_wei * reserve_eth * 2 / total_supply * 0.98)
+        # Расчет минимума на выходе: доля резервов + обмен второй половины внутри пула (burnSingle)
+        min_eth_out = with_slippage(quote_burn_single(snapshot, lp_balance_in_wei, return_dict["tokenA"]),
+                                    DEFAULT_SLIPPAGE)
 
         router_contract = await client.get_contract(return_dict["routerAddress"], abi=return_dict["routerAbi"])
-        allowance = await pool_contract.functions.allowance(client.address, return_dict["routerAddress"]).call()
         transaction = None
 
+        approve_pending = False
+        permit = None
         if allowance < lp_balance_in_wei:
-            await client.approve_lp_token(pool_contract, return_dict["routerAddress"], lp_balance_in_wei)
+            # Предпочитаем подписанный off-chain permit: одна транзакция burn вместо approve + burn
+            permit = await sign_lp_permit(client, pool_contract, return_dict["routerAddress"], lp_balance_in_wei)
+            approve_pending = permit is None
+
+        if permit is not None:
             try:
-                transaction = await router_contract.functions.burnLiquiditySingle(
+                transaction = await client.build_contract_tx(router_contract.functions.burnLiquiditySingleWithPermit(
+                    return_dict["poolAddress"],
+                    lp_balance_in_wei,
+                    burn_data,
+                    min_eth_out,
+                    return_dict["zeroAddress"],
+                    b'0x',
+                    permit
+                ))
+            except Exception as e:
+                logger.error(f"Ошибка при построении транзакции: {e}")
+        elif approve_pending:
+            # Approve и burn отправляются подряд с последовательными nonce, не дожидаясь receipt approve.
+            # Пока approve не в блоке, estimate_gas для burn ревертнется, поэтому лимит газа задаём сами:
+            # из профиля газа, а без него — с большим запасом.
+            approve_tx = await client.approve_lp_token(pool_contract, return_dict["routerAddress"], lp_balance_in_wei,
+                                                       wait=False)
+            on_step(APPROVE_SENT, approve_tx=client.w3.to_hex(approve_tx))
+            try:
+                transaction = await client.build_contract_tx(router_contract.functions.burnLiquiditySingle(
                     return_dict["poolAddress"],
                     lp_balance_in_wei,
                     burn_data,
                     min_eth_out,
                     return_dict["zeroAddress"],
                     b'0x'
-                ).build_transaction(await client.prepare_tx(value=0))
+                ))
+                transaction["gas"] = client.profiled_gas(transaction) or PIPELINED_BURN_GAS_LIMIT
             except Exception as e:
                 logger.error(f"Ошибка при построении транзакции: {e}")
         else:
             try:
-                transaction = await router_contract.functions.burnLiquiditySingle(
+                transaction = await client.build_contract_tx(router_contract.functions.burnLiquiditySingle(
                     return_dict["poolAddress"],
                     lp_balance_in_wei,
                     burn_data,
                     min_eth_out,
                     return_dict["zeroAddress"],
                     b'0x'
-                ).build_transaction(await client.prepare_tx(value=0))
+                ))
             except Exception as e:
                 logger.error(f"Ошибка при построении транзакции: {e}")
 
-        tx_hash = await client.sign_and_send_tx(transaction)
+        if transaction is None:
+            # Сборка не удалась: nonce, выданный под транзакцию, остался неиспользованным
+            await client.nonce_manager.resync()
+            return False
+
+        tx_hash = await client.sign_and_send_tx(transaction, without_gas=approve_pending)
+        if tx_hash is None:
+            return False
+        on_step(BURN_SENT, burn_tx=tx_hash)
 
         end_point = await client.wait_tx(tx_hash, client.explorer_url)
 
         if end_point is True:
             logger.info(f"Круг завершен")
-            return
+            return True
+        return False
 
     except Exception as e:
         logger.error(f"Произошла критическая ошибка при изъятии ликвидности: {e}")
+        return False
@@ -0,0 +1,68 @@
+from eth_abi import encode
+from eth_account import Account
+from eth_utils import keccak
+from web3.contract import AsyncContract
+from web3.exceptions import BadFunctionCallOutput, ContractLogicError
+from client.cache import TTLCache
+from client.client import Client
+from utils.logger import logger
+from typing import Optional
+import time
+
+PERMIT_TYPEHASH = keccak(text="Permit(address owner,address spender,uint256 value,uint256 nonce,uint256 deadline)")
+# Сколько секунд действительна подпись permit
+PERMIT_DEADLINE_SECONDS = 20 * 60
+
+# DOMAIN_SEPARATOR пула неизменен; None в кэше означает, что пул не поддерживает permit
+_DOMAIN_SEPARATOR_CACHE = TTLCache()
+# Ошибки, по которым ясно, что у контракта нет функции: ошибки транспорта (429, таймаут) сюда не входят
+# и пробрасываются, чтобы временный сбой RPC не закэшировал отказ от permit
+NOT_SUPPORTED_ERRORS = (ContractLogicError, BadFunctionCallOutput)
+
+
+def permit_digest(domain_separator: bytes, owner: str, spender: str, value: int, nonce: int, deadline: int) -> bytes:
+    """EIP-712 хэш сообщения Permit (EIP-2612) для домена LP-токена."""
+    struct_hash = keccak(encode(
+        ["bytes32", "address", "address", "uint256", "uint256", "uint256"],
+        [PERMIT_TYPEHASH, owner, spender, value, nonce, deadline],
+    ))
+    return keccak(b"\x19\x01" + domain_separator + struct_hash)
+
+
+async def _domain_separator(client: Client, pool_contract: AsyncContract) -> Optional[bytes]:
+    async def fetch() -> Optional[bytes]:
+        try:
+            return await pool_contract.functions.DOMAIN_SEPARATOR().call()
+        except NOT_SUPPORTED_ERRORS as e:
+            logger.warning(f"⚠️ Пул {pool_contract.address} не поддерживает permit: {e}")
+            return None
+
+    return await _DOMAIN_SEPARATOR_CACHE.get((client.chain_id, pool_contract.address), fetch)
+
+
+async def sign_lp_permit(client: Client, pool_contract: AsyncContract, spender: str,
+                         amount: int) -> Optional[tuple[int, int, bytes]]:
+    """
+    Подписывает off-chain разрешение на списание LP-токенов роутером.
+    Возвращает (amount, deadline, signature) для ArrayPermitParams роутера или None, если permit недоступен.
+    Ошибки RPC пробрасываются: круг повторится, а не перейдёт на approve из-за временного сбоя.
+    """
+    domain_separator = await _domain_separator(client, pool_contract)
+    if domain_separator is None:
+        return None
+    try:
+        nonce = await pool_contract.functions.nonces(client.address).call()
+    except NOT_SUPPORTED_ERRORS as e:
+        logger.warning(f"⚠️ Не удалось получить nonce permit: {e}")
+        return None
+
+    deadline = int(time.time()) + PERMIT_DEADLINE_SECONDS
+    digest = permit_digest(domain_separator, client.address, client.w3.to_checksum_address(spender),
+                           amount, nonce, deadline)
+    signed = Account.unsafe_sign_hash(digest, client.private_key)
+    return amount, deadline, bytes(signed.signature)
+
+
+def split_signature(signature: bytes) -> tuple[int, bytes, bytes]:
+    """Разбивает 65-байтовую подпись r||s||v на (v, r, s) для selfPermit роутера."""
+    return signature[64], signature[:32], signature[32:64]
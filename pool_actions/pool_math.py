@@ -0,0 +1,143 @@
+"""
+Офлайн-математика классического пула SyncSwap (x * y = k).
+Повторяет ClassicPool.mint / burnSingle / getAmountOut в целых числах, так что котировки
+считаются локально по снимку резервов без обращения к RPC.
+"""
+from dataclasses import dataclass, replace
+from typing import Optional
+import math
+
+import numpy as np
+
+# Знаменатель комиссий SyncSwap: swapFee = 300 означает 0.3%
+MAX_FEE = 100_000
+MINIMUM_LIQUIDITY = 1000
+# Допустимое проскальзывание для minLiquidity / minAmount
+DEFAULT_SLIPPAGE = 0.02
+
+
+@dataclass(frozen=True)
+class PoolSnapshot:
+    """Снимок состояния классического пула, по которому считаются котировки."""
+    token0: str
+    token1: str
+    reserve0: int
+    reserve1: int
+    total_supply: int
+    swap_fee: int
+    block_number: Optional[int] = None
+
+    def reserves_for(self, token_in: str) -> tuple[int, int]:
+        """Возвращает (reserve_in, reserve_out) для входящего токена."""
+        if token_in.lower() == self.token0.lower():
+            return self.reserve0, self.reserve1
+        if token_in.lower() == self.token1.lower():
+            return self.reserve1, self.reserve0
+        raise ValueError(f"Токен {token_in} не входит в пул {self.token0}/{self.token1}")
+
+    def is_token0(self, token: str) -> bool:
+        self.reserves_for(token)
+        return token.lower() == self.token0.lower()
+
+
+def get_amount_out(amount_in: int, reserve_in: int, reserve_out: int, swap_fee: int) -> int:
+    """Выход обмена в классическом пуле с учётом комиссии (ClassicPool._getAmountOut)."""
+    if amount_in == 0:
+        return 0
+    amount_in_with_fee = amount_in * (MAX_FEE - swap_fee)
+    return amount_in_with_fee * reserve_out // (reserve_in * MAX_FEE + amount_in_with_fee)
+
+
+def _unbalanced_mint_fee(swap_fee: int, reserve0: int, reserve1: int, amount0: int, amount1: int) -> tuple[int, int]:
+    """Комиссия за «лишнюю» часть депозита: её пул фактически обменивает (ClassicPool._unbalancedMintFee)."""
+    if reserve0 == 0 or reserve1 == 0:
+        return 0, 0
+    amount1_optimal = amount0 * reserve1 // reserve0
+    if amount1 >= amount1_optimal:
+        return 0, swap_fee * (amount1 - amount1_optimal) // (2 * MAX_FEE)
+    amount0_optimal = amount1 * reserve0 // reserve1
+    return swap_fee * (amount0 - amount0_optimal) // (2 * MAX_FEE), 0
+
+
+def quote_mint(snapshot: PoolSnapshot, amount0: int, amount1: int) -> int:
+    """Количество LP-токенов за депозит amount0/amount1."""
+    reserve0, reserve1 = snapshot.reserve0, snapshot.reserve1
+    fee0, fee1 = _unbalanced_mint_fee(snapshot.swap_fee, reserve0, reserve1, amount0, amount1)
+    new_invariant = math.isqrt((reserve0 + amount0 - fee0) * (reserve1 + amount1 - fee1))
+
+    if snapshot.total_supply == 0:
+        return max(new_invariant - MINIMUM_LIQUIDITY, 0)
+    old_invariant = math.isqrt(reserve0 * reserve1)
+    return (new_invariant - old_invariant) * snapshot.total_supply // old_invariant
+
+
+def quote_mint_single(snapshot: PoolSnapshot, amount: int, token_in: str) -> int:
+    """Количество LP-токенов за односторонний депозит одного токена."""
+    if snapshot.is_token0(token_in):
+        return quote_mint(snapshot, amount, 0)
+    return quote_mint(snapshot, 0, amount)
+
+
+def quote_burn_single(snapshot: PoolSnapshot, liquidity: int, token_out: str) -> int:
+    """Выход одного токена при burnSingle: пропорциональная доля + обмен второй половины внутри пула."""
+    if snapshot.total_supply == 0:
+        return 0
+    amount0 = liquidity * snapshot.reserve0 // snapshot.total_supply
+    amount1 = liquidity * snapshot.reserve1 // snapshot.total_supply
+    reserve0 = snapshot.reserve0 - amount0
+    reserve1 = snapshot.reserve1 - amount1
+
+    if snapshot.is_token0(token_out):
+        return amount0 + get_amount_out(amount1, reserve1, reserve0, snapshot.swap_fee)
+    return amount1 + get_amount_out(amount0, reserve0, reserve1, snapshot.swap_fee)
+
+
+def apply_mint(snapshot: PoolSnapshot, amount0: int, amount1: int) -> PoolSnapshot:
+    """Снимок пула после депозита — чтобы котировать последовательные действия без RPC."""
+    liquidity = quote_mint(snapshot, amount0, amount1)
+    return replace(snapshot, reserve0=snapshot.reserve0 + amount0, reserve1=snapshot.reserve1 + amount1,
+                   total_supply=snapshot.total_supply + liquidity)
+
+
+def with_slippage(amount: int, slippage: float) -> int:
+    """Минимально допустимый выход при заданном проскальзывании (0.02 = 2%)."""
+    return int(amount * (1 - slippage))
+
+
+# --- Векторные варианты для подбора размеров позиций ---
+# Считаются во float64 (погрешность ~1e-15 относительно), чего достаточно для сравнения вариантов,
+# но не для minLiquidity/minAmount в транзакциях — там используются точные функции выше.
+
+def get_amount_out_many(amount_in, reserve_in, reserve_out, swap_fee) -> np.ndarray:
+    amount_in = np.asarray(amount_in, dtype=np.float64)
+    amount_in_with_fee = amount_in * (MAX_FEE - np.asarray(swap_fee, dtype=np.float64))
+    return amount_in_with_fee * reserve_out / (np.asarray(reserve_in, dtype=np.float64) * MAX_FEE + amount_in_with_fee)
+
+
+def quote_mint_single_many(amounts, reserve_in, reserve_out, total_supply, swap_fee) -> np.ndarray:
+    """
+    LP-токены за односторонний депозит для массива сумм и/или массива пулов (numpy broadcasting):
+    например, 1000 сумм по одному пулу или по одной сумме в 1000 пулов.
+    """
+    amounts = np.asarray(amounts, dtype=np.float64)
+    reserve_in = np.asarray(reserve_in, dtype=np.float64)
+    reserve_out = np.asarray(reserve_out, dtype=np.float64)
+    total_supply = np.asarray(total_supply, dtype=np.float64)
+    fee = np.asarray(swap_fee, dtype=np.float64) * amounts / (2 * MAX_FEE)
+    old_invariant = np.sqrt(reserve_in * reserve_out)
+    new_invariant = np.sqrt((reserve_in + amounts - fee) * reserve_out)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(old_invariant > 0, (new_invariant - old_invariant) * total_supply / old_invariant, 0.0)
+
+
+def quote_burn_single_many(liquidity, reserve_out, reserve_other, total_supply, swap_fee) -> np.ndarray:
+    """Выход одного токена при burnSingle для массивов LP-сумм и/или пулов."""
+    liquidity = np.asarray(liquidity, dtype=np.float64)
+    total_supply = np.asarray(total_supply, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        share = np.where(total_supply > 0, liquidity / total_supply, 0.0)
+    amount_out = share * reserve_out
+    amount_other = share * reserve_other
+    swapped = get_amount_out_many(amount_other, np.asarray(reserve_other, dtype=np.float64) - amount_other,
+                                  np.asarray(reserve_out, dtype=np.float64) - amount_out, swap_fee)
+    return amount_out + swapped
@@ -0,0 +1,120 @@
+from web3.contract import AsyncContract
+from client.client import Client
+from utils.logger import logger
+from typing import Iterable, Optional
+import asyncio
+import json
+import os
+
+DEFAULT_REGISTRY_PATH = "cache/pool_registry.json"
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+# Размер окна блоков для eth_getLogs при заполнении реестра из событий PoolCreated
+LOGS_CHUNK_SIZE = 50_000
+
+
+class PoolRegistry:
+    """
+    Реестр адресов пулов, сохраняемый на диск между запусками.
+    Ключ — (сеть, фабрика, отсортированная пара токенов, тип пула). Адрес пула для пары
+    никогда не меняется, поэтому factory.getPool вызывается только при первом обращении к паре.
+    """
+
+    def __init__(self, path: str = DEFAULT_REGISTRY_PATH):
+        self.path = path
+        self._pools: dict[str, str] = self._load()
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    def _load(self) -> dict[str, str]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+        except json.JSONDecodeError:
+            logger.warning(f"⚠️ Реестр пулов {self.path} повреждён, начинаем с пустого")
+            return {}
+
+    def save(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(self._pools, file, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def key(network: str, factory_address: str, token_a: str, token_b: str, pool_type: str = "classic") -> str:
+        token0, token1 = sorted((token_a.lower(), token_b.lower()))
+        return f"{network.upper()}:{factory_address.lower()}:{token0}:{token1}:{pool_type}"
+
+    def get(self, network: str, factory_address: str, token_a: str, token_b: str,
+            pool_type: str = "classic") -> Optional[str]:
+        return self._pools.get(self.key(network, factory_address, token_a, token_b, pool_type))
+
+    def put(self, network: str, factory_address: str, token_a: str, token_b: str, pool_address: str,
+            pool_type: str = "classic", save: bool = True) -> None:
+        self._pools[self.key(network, factory_address, token_a, token_b, pool_type)] = pool_address
+        if save:
+            self.save()
+
+    async def resolve(self, client: Client, factory_contract: AsyncContract, token_a: str, token_b: str,
+                      pool_type: str = "classic") -> str:
+        """Адрес пула из реестра; при промахе — factory.getPool с сохранением результата."""
+        network = client.network.name
+        key = self.key(network, factory_contract.address, token_a, token_b, pool_type)
+        if key in self._pools:
+            return self._pools[key]
+
+        # Одновременные промахи по одной паре (много кошельков) дают один вызов getPool
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            if key in self._pools:
+                return self._pools[key]
+            pool_address = await factory_contract.functions.getPool(
+                client.w3.to_checksum_address(token_a), client.w3.to_checksum_address(token_b)).call()
+            if pool_address != ZERO_ADDRESS:
+                self.put(network, factory_contract.address, token_a, token_b, pool_address, pool_type)
+            return pool_address
+
+    async def resolve_many(self, client: Client, factory_contract: AsyncContract,
+                           pairs: Iterable[tuple[str, str]], pool_type: str = "classic") -> dict[tuple[str, str], str]:
+        """Разрешает сразу много пар: все промахи реестра запрашиваются одним пакетным вызовом."""
+        network = client.network.name
+        pairs = list(pairs)
+        missing = [pair for pair in pairs if self.get(network, factory_contract.address, *pair, pool_type) is None]
+        if missing:
+            addresses = await client.batch_call([
+                factory_contract.functions.getPool(client.w3.to_checksum_address(token_a),
+                                                   client.w3.to_checksum_address(token_b))
+                for token_a, token_b in missing
+            ])
+            for (token_a, token_b), pool_address in zip(missing, addresses):
+                if pool_address != ZERO_ADDRESS:
+                    self.put(network, factory_contract.address, token_a, token_b, pool_address, pool_type, save=False)
+            self.save()
+        return {pair: self.get(network, factory_contract.address, *pair, pool_type) or ZERO_ADDRESS for pair in pairs}
+
+    async def seed_from_logs(self, client: Client, factory_contract: AsyncContract, from_block: int = 0,
+                             to_block: Optional[int] = None, pool_type: str = "classic",
+                             chunk_size: int = LOGS_CHUNK_SIZE) -> int:
+        """Массово заполняет реестр из событий фабрики PoolCreated. Возвращает число добавленных пулов."""
+        network = client.network.name
+        if to_block is None:
+            to_block = await client.w3.eth.block_number
+
+        added = 0
+        for start in range(from_block, to_block + 1, chunk_size):
+            end = min(start + chunk_size - 1, to_block)
+            events = await factory_contract.events.PoolCreated.get_logs(fromBlock=start, toBlock=end)
+            for event in events:
+                args = event["args"]
+                if self.get(network, factory_contract.address, args["token0"], args["token1"], pool_type) is None:
+                    self.put(network, factory_contract.address, args["token0"], args["token1"], args["pool"],
+                             pool_type, save=False)
+                    added += 1
+        self.save()
+        logger.info(f"📚 Реестр пулов: добавлено {added} пулов из событий PoolCreated")
+        return added
+
+
+POOL_REGISTRY = PoolRegistry()
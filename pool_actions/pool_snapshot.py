@@ -0,0 +1,235 @@
+from client.client import Client
+from client.telemetry import detach_span
+from pool_actions.pool_math import PoolSnapshot
+from web3 import AsyncWeb3
+from web3.contract import AsyncContract
+from eth_abi import decode
+from eth_utils import keccak
+from dataclasses import dataclass, field, replace
+from typing import Optional
+import asyncio
+import logging
+import time
+import weakref
+
+logger = logging.getLogger(__name__)
+
+SYNC_TOPIC = keccak(text="Sync(uint256,uint256)")
+TRANSFER_TOPIC = keccak(text="Transfer(address,address,uint256)")
+ZERO_TOPIC = b"\x00" * 32
+# Период опроса событий пулов, с
+POLL_INTERVAL = 2.0
+# Опрос останавливается, если снимки столько секунд никто не спрашивал
+IDLE_STOP_AFTER = 60.0
+# Снимки старше стольких периодов опроса считаются устаревшими: события дочитываются на месте
+STALE_INTERVALS = 5
+# Если опрос отстал больше чем на столько блоков, состояние пулов перечитывается заново, а не из логов
+MAX_LOG_RANGE = 2_000
+# Раз в столько опросов состояние пулов перечитывается целиком: запросы идут на разные RPC, и отстающий
+# эндпоинт может вернуть пустой eth_getLogs за блоки, которых ещё не видел, — пропущенное событие иначе не найти
+FULL_REREAD_EVERY = 30
+
+
+async def fetch_pool_snapshot(client: Client, pool_contract: AsyncContract, token_in: str, token_out: str,
+                              extra_calls: list = (), block_identifier="latest") -> tuple[PoolSnapshot, list]:
+    """
+    Читает снимок классического пула (токены, резервы, totalSupply, swapFee для направления token_in -> token_out)
+    одним пакетным запросом. extra_calls (например, balanceOf/allowance) добавляются в тот же пакет,
+    их результаты возвращаются вторым элементом.
+    """
+    functions = pool_contract.functions
+    token0, token1, total_supply, (reserve0, reserve1), swap_fee, *extra = await client.batch_call([
+        functions.token0(),
+        functions.token1(),
+        functions.totalSupply(),
+        functions.getReserves(),
+        functions.getSwapFee(client.address, client.w3.to_checksum_address(token_in),
+                             client.w3.to_checksum_address(token_out), b""),
+        *extra_calls,
+    ], block_identifier)
+    snapshot = PoolSnapshot(token0=token0, token1=token1, reserve0=reserve0, reserve1=reserve1,
+                            total_supply=total_supply, swap_fee=swap_fee,
+                            block_number=block_identifier if isinstance(block_identifier, int) else None)
+    return snapshot, extra
+
+
+@dataclass
+class PoolState:
+    """Состояние одного пула: снимок, прочитанный на блоке block и дополненный событиями, и swapFee по направлениям."""
+    snapshot: PoolSnapshot
+    block: int
+    swap_fees: dict[str, int] = field(default_factory=dict)
+
+
+class PoolStateCache:
+    """
+    Резервы и totalSupply классических пулов в памяти, общие для всех кошельков на одном AsyncWeb3.
+    Пул читается целиком один раз, дальше фоновый цикл опрашивает eth_getLogs по всем известным пулам:
+    Sync задаёт резервы, Transfer с нулевого адреса и на нулевой адрес — выпуск и сжигание LP
+    (так учитывается и протокольная комиссия, которая выпускается без события Mint).
+    Котировки круга считаются по локальному снимку с номером блока, без RPC-запросов.
+    Пул, прочитанный на блоке раньше last_block, дочитывает свои события; раз в FULL_REREAD_EVERY опросов
+    все пулы перечитываются целиком — на случай событий, которые отстающий RPC не вернул.
+    """
+
+    _registry: "weakref.WeakKeyDictionary[AsyncWeb3, PoolStateCache]" = weakref.WeakKeyDictionary()
+
+    def __init__(self, w3: AsyncWeb3):
+        self.w3 = w3
+        self.pools: dict[str, PoolState] = {}
+        self.last_block: Optional[int] = None
+        self.updated_at = 0.0
+        self._last_used = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @classmethod
+    def for_w3(cls, w3: AsyncWeb3) -> "PoolStateCache":
+        cache = cls._registry.get(w3)
+        if cache is None:
+            cache = cls(w3)
+            cls._registry[w3] = cache
+        return cache
+
+    async def snapshot(self, client: Client, pool_contract: AsyncContract, token_in: str,
+                       token_out: str) -> PoolSnapshot:
+        """Снимок пула для направления token_in -> token_out; RPC — только при первом обращении или отставании."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Задача и блокировка от закрытого event loop: состояние пулов оставляем, опрос запускаем заново
+            self._loop, self._task, self._lock = loop, None, asyncio.Lock()
+        self._last_used = time.monotonic()
+
+        key, direction = pool_contract.address.lower(), token_in.lower()
+        if self._needs_update(key, direction):
+            # Одновременные промахи всех кошельков объединяются в один запрос
+            async with self._lock:
+                if self._needs_update(key, direction):
+                    await self._update(client, pool_contract, token_in, token_out)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+        state = self.pools[key]
+        return replace(state.snapshot, swap_fee=state.swap_fees[direction],
+                       block_number=max(state.block, self.last_block or state.block))
+
+    def _needs_update(self, key: str, direction: str) -> bool:
+        state = self.pools.get(key)
+        return (state is None or direction not in state.swap_fees
+                or time.monotonic() - self.updated_at > POLL_INTERVAL * STALE_INTERVALS)
+
+    async def _update(self, client: Client, pool_contract: AsyncContract, token_in: str, token_out: str) -> None:
+        # Вызывается под self._lock
+        if time.monotonic() - self.updated_at > POLL_INTERVAL * STALE_INTERVALS and self.pools:
+            try:
+                await self._poll()
+            except Exception as e:
+                logger.warning(f"⚠️ События пулов не прочитаны, состояние будет перечитано: {e}")
+                self.pools.clear()
+
+        key, direction = pool_contract.address.lower(), token_in.lower()
+        state = self.pools.get(key)
+        if state is not None and direction in state.swap_fees:
+            return
+        block = await self.w3.eth.block_number
+        snapshot, _ = await fetch_pool_snapshot(client, pool_contract, token_in, token_out, block_identifier=block)
+        state = self.pools.get(key)
+        if state is None:
+            state = self.pools[key] = PoolState(snapshot=snapshot, block=block)
+            if self.last_block is not None and block < self.last_block:
+                # Номер блока ответил отстающий RPC: события до last_block общий опрос уже не прочитает
+                try:
+                    await self._replay(key, block + 1, self.last_block)
+                except Exception:
+                    del self.pools[key]
+                    raise
+        state.swap_fees[direction] = snapshot.swap_fee
+        if self.last_block is None:
+            self.last_block, self.updated_at = block, time.monotonic()
+
+    async def poll(self) -> None:
+        """Дочитывает события всех известных пулов с последнего обработанного блока."""
+        # Выпуск и сжигание LP прибавляются к totalSupply: один диапазон блоков нельзя применить дважды,
+        # поэтому фоновый опрос и дочитывание при промахе идут только под общей блокировкой
+        async with self._lock:
+            await self._poll()
+
+    async def _poll(self) -> None:
+        latest = await self.w3.eth.block_number
+        if self.last_block is None or not self.pools:
+            self.last_block, self.updated_at = latest, time.monotonic()
+            return
+        if latest - self.last_block > MAX_LOG_RANGE:
+            logger.info(f"ℹ️ Опрос событий пулов отстал на {latest - self.last_block} блоков, состояние будет перечитано")
+            self.pools.clear()
+            self.last_block, self.updated_at = latest, time.monotonic()
+            return
+        if latest > self.last_block:
+            from_block = self.last_block + 1
+            logs = await self.w3.eth.get_logs({
+                "fromBlock": from_block,
+                "toBlock": latest,
+                "address": [AsyncWeb3.to_checksum_address(address) for address in self.pools],
+                "topics": [[SYNC_TOPIC, TRANSFER_TOPIC]],
+            })
+            # Пока шёл запрос, состояние могли сбросить или продвинуть — тогда этот диапазон не применяем
+            if self.last_block != from_block - 1:
+                return
+            self.last_block = latest
+            for log in sorted(logs, key=lambda log: (log["blockNumber"], log["logIndex"])):
+                self._apply(log)
+        self.updated_at = time.monotonic()
+
+    async def _replay(self, key: str, from_block: int, to_block: int) -> None:
+        logs = await self.w3.eth.get_logs({
+            "fromBlock": from_block,
+            "toBlock": to_block,
+            "address": AsyncWeb3.to_checksum_address(key),
+            "topics": [[SYNC_TOPIC, TRANSFER_TOPIC]],
+        })
+        for log in sorted(logs, key=lambda log: (log["blockNumber"], log["logIndex"])):
+            self._apply(log)
+
+    def _apply(self, log) -> None:
+        state = self.pools.get(log["address"].lower())
+        # Пул прочитан целиком уже после этого блока — событие в снимке учтено
+        if state is None or log["blockNumber"] <= state.block:
+            return
+        topics = log["topics"]
+        if topics[0] == SYNC_TOPIC:
+            reserve0, reserve1 = decode(["uint256", "uint256"], bytes(log["data"]))
+            state.snapshot = replace(state.snapshot, reserve0=reserve0, reserve1=reserve1)
+        elif len(topics) == 3 and ZERO_TOPIC in (topics[1], topics[2]):
+            (amount,) = decode(["uint256"], bytes(log["data"]))
+            # Выпуск LP — перевод с нулевого адреса, сжигание — на нулевой
+            delta = amount if topics[1] == ZERO_TOPIC else -amount
+            state.snapshot = replace(state.snapshot, total_supply=state.snapshot.total_supply + delta)
+
+    async def _run(self) -> None:
+        # Цикл общий для всех кошельков сети — не относим его запросы к span того, кто его запустил
+        detach_span()
+        polls = 0
+        while time.monotonic() - self._last_used < IDLE_STOP_AFTER:
+            await asyncio.sleep(POLL_INTERVAL)
+            polls += 1
+            if polls % FULL_REREAD_EVERY == 0:
+                # Следующее обращение к каждому пулу прочитает его заново
+                async with self._lock:
+                    self.pools.clear()
+                continue
+            try:
+                await self.poll()
+            except Exception as e:
+                logger.warning(f"⚠️ Ошибка опроса событий пулов: {e}")
+
+
+async def read_pool_snapshot(client: Client, pool_contract: AsyncContract, token_in: str, token_out: str,
+                             extra_calls: list = ()) -> tuple[PoolSnapshot, list]:
+    """
+    Снимок пула из общего PoolStateCache и результаты extra_calls (например, balanceOf/allowance кошелька)
+    одним пакетным запросом. Без extra_calls RPC-запросов нет, пока опрос событий не отстаёт.
+    """
+    snapshot = await PoolStateCache.for_w3(client.w3).snapshot(client, pool_contract, token_in, token_out)
+    extra = await client.batch_call(list(extra_calls)) if extra_calls else []
+    return snapshot, extra
@@ -0,0 +1,257 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from eth_account import Account
+from web3 import AsyncWeb3
+
+from client.client import Client, get_shared_w3
+from client.networks import Network
+from client.telemetry import TELEMETRY
+from pool_actions.add_liquidity import add_liquidity, build_return_dict
+from pool_actions.atomic_cycle import atomic_cycle
+from pool_actions.burn_liquidity import burn_liquidity
+from pool_actions.pool_registry import POOL_REGISTRY
+from runner.job_store import (ADD_CONFIRMED, ADD_SENT, APPROVE_SENT, ATOMIC_SENT, BURN_SENT, DONE, FAILED,
+                              MAX_ATTEMPTS, PENDING, POOL_RESOLVED, Job, JobStore)
+from runner.wallet_scanner import cycle_cost, log_snapshot_summary, scan_wallets, split_affordable
+from utils.logger import logger
+
+
+@dataclass
+class WalletResult:
+    """Итог круга add/burn для одного кошелька."""
+    name: str
+    address: Optional[str] = None
+    success: bool = False
+    stage: str = "init"
+    error: Optional[str] = None
+    elapsed: float = 0.0
+
+
+async def run_wallet_cycle(client: Client, result: WalletResult, factory_address: str, router_address: str,
+                           abis: dict, zero_address: str, atomic: bool = False, job: Optional[Job] = None,
+                           job_store: Optional[JobStore] = None) -> WalletResult:
+    """
+    Выполняет полный круг add_liquidity -> burn_liquidity для одного кошелька.
+    С заданием из очереди каждый шаг сохраняется, а незавершённый круг продолжается с записанного этапа:
+    по уже отправленным транзакциям ждём receipt, а не отправляем их заново. Если отправленная транзакция
+    так и не подтвердилась, но ещё может, этап сохраняется до следующего запуска, а не отправляется повторно;
+    после MAX_ATTEMPTS незавершённых запусков задание закрывается как неудачное.
+    """
+    started = time.monotonic()
+
+    def on_step(stage: str, **fields) -> None:
+        if job_store is not None and job is not None:
+            job_store.update(job, stage, **fields)
+
+    def finish() -> WalletResult:
+        on_step(DONE)
+        result.stage = "done"
+        result.success = True
+        return result
+
+    try:
+        stage = job.stage if job is not None else PENDING
+        if stage != PENDING:
+            logger.info(f"♻️ [{result.name}] Продолжаем круг с этапа '{stage}'\n")
+        if job is not None and job_store is not None:
+            job_store.start_attempt(job)
+
+        # None — транзакция ещё может подтвердиться: повторная отправка внесла бы депозит второй раз
+        if stage == ATOMIC_SENT:
+            status = await client.wait_tx_status(job.add_tx, client.explorer_url)
+            if status is None:
+                result.error = "Транзакция круга ещё не подтвердилась"
+                return result
+            if status:
+                return finish()
+            stage = PENDING
+        if stage == ADD_SENT:
+            status = await client.wait_tx_status(job.add_tx, client.explorer_url)
+            if status is None:
+                result.error = "Транзакция add ещё не подтвердилась"
+                return result
+            stage = ADD_CONFIRMED if status else PENDING
+        if stage == APPROVE_SENT:
+            # burn_liquidity сам перечитает allowance и при необходимости повторит approve
+            await client.wait_tx(job.approve_tx, client.explorer_url)
+            stage = ADD_CONFIRMED
+        if stage == BURN_SENT:
+            status = await client.wait_tx_status(job.burn_tx, client.explorer_url)
+            if status is None:
+                result.error = "Транзакция burn ещё не подтвердилась"
+                return result
+            if status:
+                return finish()
+            stage = ADD_CONFIRMED
+
+        amount_in = await client.to_wei_main(client.amount)
+        return_dict = None
+        if stage == ADD_CONFIRMED:
+            return_dict = build_return_dict(job.pool_address, client.token_a_address, client.token_b_address,
+                                            factory_address, router_address, zero_address,
+                                            abis["factory"], abis["router"], abis["pool"])
+        elif atomic:
+            result.stage = "atomic"
+            logger.info(f"💸 [{result.name}] Круг одной транзакцией через multicall роутера\n")
+            done = await atomic_cycle(client, amount_in, factory_address, router_address,
+                                      client.token_a_address, client.token_b_address,
+                                      abis["factory"], abis["pool"], abis["router"], zero_address, on_step)
+            if done is True:
+                return finish()
+            if done is not None:
+                result.error = "Атомарный круг не выполнен"
+                return result
+
+        if return_dict is None:
+            result.stage = "add"
+            logger.info(f"💸 [{result.name}] Добавляем ликвидность в пул\n")
+            return_dict = await add_liquidity(client, amount_in, factory_address, router_address,
+                                              client.token_a_address, client.token_b_address,
+                                              abis["factory"], abis["pool"], abis["router"], zero_address, on_step)
+            if not return_dict:
+                result.error = "Не удалось добавить ликвидность"
+                return result
+
+        result.stage = "burn"
+        logger.info(f"💸 [{result.name}] Вынимаем ликвидность из пула\n")
+        if not await burn_liquidity(client, return_dict, on_step):
+            result.error = "Не удалось вывести ликвидность"
+            return result
+
+        return finish()
+    except Exception as e:
+        result.error = str(e)
+        return result
+    finally:
+        result.elapsed = time.monotonic() - started
+        if not result.success and job is not None and job_store is not None:
+            # Пока ничего не отправлено — круг закрывается как неудачный; после отправки add
+            # позиция могла открыться, поэтому этап сохраняется для возобновления в следующем запуске
+            stage = FAILED if job.stage in (PENDING, POOL_RESOLVED) else job.stage
+            if stage != FAILED and job.attempts >= MAX_ATTEMPTS:
+                logger.error(f"❌ [{result.name}] Круг не завершён за {job.attempts} попыток, последний этап "
+                             f"'{job.stage}' — задание закрыто, проверьте кошелёк {result.address} вручную")
+                stage = FAILED
+            job_store.update(job, stage, error=result.error)
+
+
+async def run_batch(private_keys: dict, network: dict, token_a_address: str, token_b_address: str, amount: float,
+                    abis: dict, zero_address: str, proxy: Optional[str] = None, max_concurrency: int = 10,
+                    rpc_rate_limit: float = 20, atomic: bool = False, job_store: Optional[JobStore] = None,
+                    network_limit: Optional[asyncio.Semaphore] = None, dry_run: bool = False,
+                    prefilter: bool = True, snapshot_path: Optional[str] = None) -> list[WalletResult]:
+    """
+    Ставит круги всех кошельков в очередь заданий и выполняет их max_concurrency обработчиками.
+    Все кошельки используют один AsyncWeb3 (общая HTTP-сессия из пула и общий кэш контрактов),
+    частота запросов ограничена rpc_rate_limit на каждый RPC-эндпоинт. Задания читаются из очереди постранично,
+    незавершённые круги прошлых запусков продолжаются с сохранённого этапа.
+    При atomic=True круг выполняется одной транзакцией router.multicall (если пул поддерживает permit).
+    network_limit — общий лимит одновременных кругов сети, если в ней параллельно идут другие пары.
+    При dry_run=True транзакции только симулируются через eth_call и не отправляются.
+    При prefilter=True балансы всех кошельков читаются заранее пакетно (снимок сохраняется в snapshot_path),
+    и новые круги ставятся в очередь только для кошельков, которым хватает на депозит и газ.
+    """
+    network_name = Network.from_chain_id(network["chain_id"]).name
+    w3 = get_shared_w3(network["rpc_url"], proxy, Network.from_chain_id(network["chain_id"]))
+    w3.provider.set_rate_limit(rpc_rate_limit)
+
+    own_store = job_store is None
+    job_store = job_store or JobStore()
+    keys_by_address = {Account.from_key(key).address: key for key in private_keys.values()}
+    wallets = {name: Account.from_key(key).address for name, key in private_keys.items()}
+    results: list[WalletResult] = []
+    if prefilter:
+        wallets, results = await prefilter_wallets(w3, network, network_name, wallets, token_a_address,
+                                                   token_b_address, amount, atomic, snapshot_path)
+    added = job_store.enqueue_many(wallets, network_name, token_a_address, token_b_address, float(amount))
+    logger.info(f"🗂️ В очередь добавлено кругов: {added}, всего в очереди: {job_store.counts()}\n")
+    jobs = job_store.iter_active(network_name, token_a_address, token_b_address)
+
+    async def process(job: Job) -> WalletResult:
+        result = WalletResult(name=job.wallet, address=job.address)
+        try:
+            client = Client(
+                token_a_address=token_a_address,
+                token_b_address=token_b_address,
+                chain_id=network["chain_id"],
+                rpc_url=network["rpc_url"],
+                private_key=keys_by_address[job.address],
+                amount=float(amount),
+                explorer_url=network["explorer_url"],
+                proxy=proxy,
+                w3=w3,
+                multicall_address=network.get("multicall_address"),
+                ws_url=network.get("ws_url"),
+                dry_run=dry_run
+            )
+        except Exception as e:
+            result.error = f"Ошибка инициализации клиента: {e}"
+            return result
+        with TELEMETRY.span("cycle", job.wallet) as span:
+            await run_wallet_cycle(client, result, network["factory_address"], network["router_address"],
+                                   abis, zero_address, atomic, job, job_store)
+            span.status = "ok" if result.success else result.stage
+        return result
+
+    async def worker() -> None:
+        # Генератор заданий общий: каждый обработчик берёт следующее, пока очередь не опустеет
+        for job in jobs:
+            if job.address not in keys_by_address:
+                logger.warning(f"⚠️ Задание {job.id} ({job.wallet}): ключ кошелька не задан, пропускаем")
+                continue
+            if network_limit is None:
+                results.append(await process(job))
+                continue
+            async with network_limit:
+                results.append(await process(job))
+
+    try:
+        await asyncio.gather(*(worker() for _ in range(int(max_concurrency))))
+    finally:
+        if own_store:
+            job_store.close()
+    return results
+
+
+async def prefilter_wallets(w3: AsyncWeb3, network: dict, network_name: str, wallets: dict[str, str], token_a_address: str,
+                            token_b_address: str, amount: float, atomic: bool = False,
+                            snapshot_path: Optional[str] = None) -> tuple[dict[str, str], list[WalletResult]]:
+    """
+    Снимок балансов всех кошельков пакетными запросами; возвращает кошельки, которым хватает на круг,
+    и отчёты по остальным. Незавершённые круги прошлых запусков не отсекаются — им нужен только газ.
+    Если снимок не удался, фильтр пропускается: каждый круг проверит баланс сам.
+    """
+    pool_address = POOL_REGISTRY.get(network_name, network["factory_address"], token_a_address, token_b_address)
+    try:
+        snapshot = await scan_wallets(w3, list(wallets.values()), (token_a_address, token_b_address),
+                                      pool_address=pool_address, spender=network["router_address"],
+                                      multicall_address=network.get("multicall_address"))
+        required = await cycle_cost(w3, network["chain_id"], amount, atomic)
+    except Exception as e:
+        logger.warning(f"⚠️ Снимок балансов не получен, кошельки не фильтруются: {e}")
+        return wallets, []
+
+    log_snapshot_summary(snapshot, required)
+    if snapshot_path:
+        snapshot.save(snapshot_path)
+    _, short = split_affordable(snapshot, required)
+    balances = dict(zip(snapshot.addresses, snapshot.native))
+    skipped = [WalletResult(name=name, address=address, stage="scan",
+                            error=f"Недостаточно средств на круг: баланс {w3.from_wei(balances[address], 'ether'):.6f},"
+                                  f" требуется {w3.from_wei(required, 'ether'):.6f}")
+               for name, address in wallets.items() if address in short]
+    return {name: address for name, address in wallets.items() if address not in short}, skipped
+
+
+def log_batch_report(results: list[WalletResult]) -> None:
+    """Выводит итоговый отчёт по всем кошелькам."""
+    succeeded = sum(1 for r in results if r.success)
+    logger.info(f"📊 Итог: успешно {succeeded} из {len(results)} кошельков\n")
+    for r in results:
+        if r.success:
+            logger.info(f"✅ {r.name} ({r.address}): круг завершён за {r.elapsed:.1f} с")
+        else:
+            logger.error(f"❌ {r.name} ({r.address}): этап '{r.stage}', ошибка: {r.error}")
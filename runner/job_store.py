@@ -0,0 +1,155 @@
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+DEFAULT_JOB_STORE_PATH = "cache/jobs.sqlite3"
+# Сколько заданий читается из базы за раз при обходе очереди
+PAGE_SIZE = 500
+
+# Этапы круга в порядке выполнения
+PENDING = "pending"
+POOL_RESOLVED = "pool_resolved"
+ADD_SENT = "add_sent"
+ADD_CONFIRMED = "add_confirmed"
+APPROVE_SENT = "approve_sent"
+BURN_SENT = "burn_sent"
+ATOMIC_SENT = "atomic_sent"
+DONE = "done"
+FAILED = "failed"
+
+FINISHED_STAGES = (DONE, FAILED)
+# После стольких запусков круга, не дошедших до конца, задание закрывается как неудачное
+MAX_ATTEMPTS = 5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    wallet TEXT NOT NULL,
+    address TEXT NOT NULL,
+    network TEXT NOT NULL,
+    token_a TEXT NOT NULL,
+    token_b TEXT NOT NULL,
+    amount REAL NOT NULL,
+    stage TEXT NOT NULL,
+    pool_address TEXT,
+    add_tx TEXT,
+    approve_tx TEXT,
+    burn_tx TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_active ON jobs (network, token_a, token_b, stage);
+CREATE INDEX IF NOT EXISTS jobs_address ON jobs (address, stage);
+"""
+
+_FIELDS = ("pool_address", "add_tx", "approve_tx", "burn_tx", "error")
+
+
+@dataclass
+class Job:
+    """Круг add/burn одного кошелька и последний записанный этап."""
+    id: int
+    wallet: str
+    address: str
+    network: str
+    token_a: str
+    token_b: str
+    amount: float
+    stage: str
+    pool_address: Optional[str] = None
+    add_tx: Optional[str] = None
+    approve_tx: Optional[str] = None
+    burn_tx: Optional[str] = None
+    error: Optional[str] = None
+    attempts: int = 0
+
+
+class JobStore:
+    """
+    Очередь кругов в SQLite. Каждый шаг круга (пул найден, add отправлен/подтверждён, approve,
+    burn отправлен/подтверждён) записывается сразу, поэтому после падения процесса runner
+    продолжает незавершённые круги с того же места, а не теряет LP-позиции.
+    """
+
+    def __init__(self, path: str = DEFAULT_JOB_STORE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    @staticmethod
+    def _to_job(row: sqlite3.Row) -> Job:
+        return Job(**{key: row[key] for key in row.keys() if key not in ("created_at", "updated_at")})
+
+    def enqueue_many(self, wallets: dict[str, str], network: str, token_a: str, token_b: str,
+                     amount: float) -> int:
+        """
+        Ставит в очередь по кругу на каждый кошелёк {имя: адрес}. Если у кошелька уже есть
+        незавершённый круг по этой паре, новый не создаётся — продолжится старый.
+        Возвращает число новых заданий.
+        """
+        now = time.time()
+        active = {row["address"] for row in self._conn.execute(
+            f"SELECT address FROM jobs WHERE network = ? AND token_a = ? AND token_b = ? "
+            f"AND stage NOT IN ({', '.join('?' * len(FINISHED_STAGES))})",
+            (network, token_a, token_b, *FINISHED_STAGES))}
+        rows = [(name, address, network, token_a, token_b, amount, PENDING, now, now)
+                for name, address in wallets.items() if address not in active]
+        with self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT INTO jobs (wallet, address, network, token_a, token_b, amount, stage, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def iter_active(self, network: str, token_a: str, token_b: str, page_size: int = PAGE_SIZE) -> Iterator[Job]:
+        """Незавершённые задания по паре, постранично по id — без загрузки всей очереди в память."""
+        last_id = 0
+        while True:
+            rows = self._conn.execute(
+                f"SELECT * FROM jobs WHERE id > ? AND network = ? AND token_a = ? AND token_b = ? "
+                f"AND stage NOT IN ({', '.join('?' * len(FINISHED_STAGES))}) ORDER BY id LIMIT ?",
+                (last_id, network, token_a, token_b, *FINISHED_STAGES, page_size)).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield self._to_job(row)
+            last_id = rows[-1]["id"]
+
+    def get(self, job_id: int) -> Optional[Job]:
+        row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_job(row) if row else None
+
+    def update(self, job: Job, stage: str, **fields) -> None:
+        """Записывает этап и сопутствующие поля (хэши транзакций, адрес пула, ошибку)."""
+        unknown = set(fields) - set(_FIELDS)
+        if unknown:
+            raise ValueError(f"Неизвестные поля задания: {', '.join(sorted(unknown))}")
+        job.stage = stage
+        for key, value in fields.items():
+            setattr(job, key, value)
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        self._conn.execute(
+            f"UPDATE jobs SET stage = ?, {assignments + ', ' if assignments else ''}updated_at = ? WHERE id = ?",
+            (stage, *fields.values(), time.time(), job.id))
+
+    def start_attempt(self, job: Job) -> None:
+        job.attempts += 1
+        self._conn.execute("UPDATE jobs SET attempts = ?, updated_at = ? WHERE id = ?",
+                           (job.attempts, time.time(), job.id))
+
+    def counts(self) -> dict[str, int]:
+        return {row["stage"]: row["n"] for row in
+                self._conn.execute("SELECT stage, COUNT(*) AS n FROM jobs GROUP BY stage")}
@@ -0,0 +1,102 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Optional
+
+from web3 import AsyncWeb3
+
+from client.networks import Network
+from runner.batch_runner import WalletResult, log_batch_report, run_batch
+from runner.job_store import DEFAULT_JOB_STORE_PATH, JobStore
+from runner.wallet_scanner import snapshot_path
+from utils.logger import logger
+
+
+@dataclass
+class Strategy:
+    """Круги add/burn одной пары токенов в одной сети для набора кошельков."""
+    name: str
+    network: str
+    token_a: str
+    token_b: str
+    amount: float
+    private_keys: dict
+    atomic_cycle: bool = False
+    max_concurrency: int = 10
+
+
+def resolve_token(tokens: dict, network: str, token: str) -> str:
+    """Адрес токена в checksum-формате: символ ищется в constants/tokens.json для сети, адрес 0x... берётся как есть."""
+    address = token if token.startswith("0x") else tokens[network][token]
+    return AsyncWeb3.to_checksum_address(address)
+
+
+async def run_strategies(strategies: list[Strategy], networks_data: dict, tokens: dict, abis: dict,
+                         zero_address: str, proxy: Optional[str] = None, network_concurrency: Optional[dict] = None,
+                         default_network_concurrency: int = 10, rpc_rate_limit: float = 20,
+                         job_store: Optional[JobStore] = None, dry_run: bool = False,
+                         prefilter: bool = True) -> dict[str, list[WalletResult]]:
+    """
+    Выполняет все стратегии одновременно. Стратегии одной сети делят общий лимит одновременных кругов
+    (network_concurrency[сеть], по умолчанию default_network_concurrency), AsyncWeb3 и ограничитель частоты RPC;
+    у каждой стратегии свои max_concurrency обработчиков и своя очередь заданий по паре токенов.
+    При dry_run=True круги выполняются только на симуляции, а очередь заданий держится в памяти,
+    чтобы «отправленные» транзакции пробного запуска не попали в настоящую очередь.
+    При prefilter=True кошельки без средств на круг отсекаются по снимку балансов (cache/wallets_<стратегия>.csv).
+    """
+    network_concurrency = network_concurrency or {}
+    limits = {name: asyncio.Semaphore(int(network_concurrency.get(name, default_network_concurrency)))
+              for name in {strategy.network for strategy in strategies}}
+
+    own_store = job_store is None
+    job_store = job_store or JobStore(":memory:" if dry_run else DEFAULT_JOB_STORE_PATH)
+
+    async def run(strategy: Strategy) -> list[WalletResult]:
+        network = dict(networks_data[strategy.network])
+        # chain_id из JSON должен совпадать с известной сетью: по нему Client выбирает PoA и прочее
+        if Network.from_name(strategy.network).chain_id != network["chain_id"]:
+            raise ValueError(f"chain_id сети {strategy.network} в networks_data.json не совпадает с Network")
+        logger.info(f"🧩 Стратегия {strategy.name}: {len(strategy.private_keys)} кошельков, "
+                    f"{strategy.token_a}/{strategy.token_b} в {strategy.network}\n")
+        return await run_batch(
+            private_keys=strategy.private_keys,
+            network=network,
+            token_a_address=resolve_token(tokens, strategy.network, strategy.token_a),
+            token_b_address=resolve_token(tokens, strategy.network, strategy.token_b),
+            amount=float(strategy.amount),
+            abis=abis,
+            zero_address=zero_address,
+            proxy=proxy,
+            max_concurrency=strategy.max_concurrency,
+            rpc_rate_limit=rpc_rate_limit,
+            atomic=strategy.atomic_cycle,
+            job_store=job_store,
+            network_limit=limits[strategy.network],
+            dry_run=dry_run,
+            prefilter=prefilter,
+            snapshot_path=snapshot_path(strategy.name),
+        )
+
+    try:
+        outcomes = await asyncio.gather(*(run(strategy) for strategy in strategies), return_exceptions=True)
+    finally:
+        if own_store:
+            job_store.close()
+
+    results = {}
+    for strategy, outcome in zip(strategies, outcomes):
+        if isinstance(outcome, BaseException):
+            logger.error(f"❌ Стратегия {strategy.name} не запущена: {outcome}")
+            outcome = []
+        results[strategy.name] = outcome
+    return results
+
+
+def log_strategy_report(results: dict[str, list[WalletResult]]) -> None:
+    """Выводит отчёт по каждой стратегии и общий итог."""
+    for name, strategy_results in results.items():
+        logger.info(f"🧩 Стратегия {name}")
+        log_batch_report(strategy_results)
+    if len(results) > 1:
+        total = sum(len(r) for r in results.values())
+        succeeded = sum(1 for r in results.values() for result in r if result.success)
+        logger.info(f"📊 Всего по стратегиям: успешно {succeeded} из {total} кругов\n")
@@ -0,0 +1,165 @@
+import asyncio
+import csv
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Optional
+
+from web3 import AsyncWeb3
+
+from client.client import DEFAULT_TX_GAS
+from client.contracts import compile_abi, load_abi
+from client.fee_oracle import FeeOracle
+from client.gas_profile import GAS_PROFILE
+from client.multicall import aggregate_raw, is_multicall_deployed
+from utils.logger import logger
+
+# Вызовов в одном aggregate3: ответ на 500 балансов — около 64 КБ
+SCAN_CHUNK_SIZE = 500
+SNAPSHOT_PATH_TEMPLATE = "cache/wallets_{name}.csv"
+# Транзакций в круге, за газ которых кошелёк должен заплатить: add, approve LP и burn (без permit approve
+# отправляется отдельно — считаем худший случай) или один multicall
+CYCLE_TXS = 3
+ATOMIC_CYCLE_TXS = 1
+
+
+def snapshot_path(name: str) -> str:
+    """Путь снимка для стратегии: имя по умолчанию вида ZKSYNC:ETH/USDC приводится к имени файла."""
+    return SNAPSHOT_PATH_TEMPLATE.format(name=re.sub(r"[^\w.-]+", "_", name))
+
+
+@dataclass
+class WalletSnapshot:
+    """
+    Балансы кошельков на одном блоке, по столбцам: i-й элемент каждого столбца относится к addresses[i].
+    tokens — балансы ERC-20 по адресу токена; lp и allowance (LP-токена для роутера) — если задан пул.
+    """
+    chain_id: int
+    block_number: int
+    addresses: list[str]
+    native: list[int]
+    tokens: dict[str, list[int]] = field(default_factory=dict)
+    lp: Optional[list[int]] = None
+    allowance: Optional[list[int]] = None
+
+    def columns(self) -> dict[str, list]:
+        columns = {"address": self.addresses, "native": self.native}
+        columns.update({f"token:{token}": balances for token, balances in self.tokens.items()})
+        if self.lp is not None:
+            columns["lp"] = self.lp
+        if self.allowance is not None:
+            columns["allowance"] = self.allowance
+        return columns
+
+    def save(self, path: str) -> None:
+        """CSV: строка-комментарий с сетью и блоком, заголовок столбцов, по строке на кошелёк."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        columns = self.columns()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8", newline="") as file:
+            file.write(f"# chain_id={self.chain_id} block={self.block_number}\n")
+            writer = csv.writer(file)
+            writer.writerow(columns)
+            writer.writerows(zip(*columns.values()))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "WalletSnapshot":
+        with open(path, "r", encoding="utf-8", newline="") as file:
+            meta = dict(item.split("=", 1) for item in file.readline().lstrip("# ").split())
+            rows = list(csv.reader(file))
+        header, values = rows[0], list(zip(*rows[1:])) or [()] * len(rows[0])
+        columns = dict(zip(header, values))
+        return cls(
+            chain_id=int(meta["chain_id"]),
+            block_number=int(meta["block"]),
+            addresses=list(columns["address"]),
+            native=[int(value) for value in columns["native"]],
+            tokens={name.split(":", 1)[1]: [int(value) for value in column]
+                    for name, column in columns.items() if name.startswith("token:")},
+            lp=[int(value) for value in columns["lp"]] if "lp" in columns else None,
+            allowance=[int(value) for value in columns["allowance"]] if "allowance" in columns else None,
+        )
+
+
+async def scan_wallets(w3: AsyncWeb3, addresses: list[str], tokens: tuple[str, ...] = (),
+                       pool_address: Optional[str] = None, spender: Optional[str] = None,
+                       multicall_address: Optional[str] = None, chunk_size: int = SCAN_CHUNK_SIZE) -> WalletSnapshot:
+    """
+    Нативные балансы, балансы токенов, LP и allowance LP для spender по всем адресам на одном блоке.
+    С Multicall3 — пачками по chunk_size вызовов в одном eth_call (нативный баланс через getEthBalance),
+    без него — отдельными запросами, которые ограничитель частоты провайдера выстраивает в очередь.
+    """
+    erc20 = compile_abi(load_abi("erc20"))
+    block = await w3.eth.block_number
+    addresses = [w3.to_checksum_address(address) for address in addresses]
+    tokens = tuple(w3.to_checksum_address(token) for token in tokens)
+
+    # Столбцы снимка после нативного баланса: (адрес контракта, calldata для кошелька)
+    targets = [(token, lambda address: erc20["balanceOf"].encode(address)) for token in tokens]
+    if pool_address:
+        pool_address = w3.to_checksum_address(pool_address)
+        targets.append((pool_address, lambda address: erc20["balanceOf"].encode(address)))
+        if spender:
+            spender = w3.to_checksum_address(spender)
+            targets.append((pool_address, lambda address: erc20["allowance"].encode(address, spender)))
+
+    if await is_multicall_deployed(w3, multicall_address):
+        multicall_address = w3.to_checksum_address(multicall_address)
+        get_eth_balance = compile_abi(load_abi("multicall3"))["getEthBalance"]
+        calls = [(multicall_address, lambda address: get_eth_balance.encode(address)), *targets]
+        requests = [(target, True, encode(address)) for address in addresses for target, encode in calls]
+        chunks = await asyncio.gather(*(aggregate_raw(w3, multicall_address, requests[start:start + chunk_size], block)
+                                        for start in range(0, len(requests), chunk_size)))
+        # Неуспешный вызов (не ERC-20 по адресу и т.п.) считается нулевым балансом
+        values = [int.from_bytes(data[:32], "big") if success and data else 0
+                  for chunk in chunks for success, data in chunk]
+    else:
+        async def call(target: str, data: bytes) -> int:
+            result = await w3.eth.call({"to": target, "data": AsyncWeb3.to_hex(data)}, block)
+            return int.from_bytes(result[:32], "big") if result else 0
+
+        async def row(address: str) -> list[int]:
+            return list(await asyncio.gather(w3.eth.get_balance(address, block),
+                                             *(call(target, encode(address)) for target, encode in targets)))
+
+        values = [value for values in await asyncio.gather(*(row(address) for address in addresses))
+                  for value in values]
+
+    # Значения идут по кошелькам: нативный баланс, затем targets; разворачиваем в столбцы
+    width = len(targets) + 1
+    columns = [values[i::width] for i in range(width)]
+    native, rest = columns[0], columns[1:]
+    snapshot = WalletSnapshot(chain_id=await w3.eth.chain_id, block_number=block, addresses=addresses,
+                              native=native, tokens=dict(zip(tokens, rest[:len(tokens)])))
+    if pool_address:
+        snapshot.lp = rest[len(tokens)]
+        if spender:
+            snapshot.allowance = rest[len(tokens) + 1]
+    return snapshot
+
+
+async def cycle_cost(w3: AsyncWeb3, chain_id: int, amount: float, atomic: bool = False) -> int:
+    """Оценка нативных средств на круг: депозит плюс газ его транзакций по текущей котировке оракула."""
+    quote = await FeeOracle.for_w3(w3).quote()
+    gas = GAS_PROFILE.typical(chain_id) or DEFAULT_TX_GAS
+    txs = ATOMIC_CYCLE_TXS if atomic else CYCLE_TXS
+    return AsyncWeb3.to_wei(amount, "ether") + (quote.base_fee + quote.max_priority_fee_per_gas) * gas * txs
+
+
+def split_affordable(snapshot: WalletSnapshot, required: int) -> tuple[set[str], set[str]]:
+    """(кошельки, которым хватает на круг, кошельки, которым не хватает) по нативному балансу снимка."""
+    affordable = {address for address, balance in zip(snapshot.addresses, snapshot.native) if balance >= required}
+    return affordable, set(snapshot.addresses) - affordable
+
+
+def log_snapshot_summary(snapshot: WalletSnapshot, required: Optional[int] = None) -> None:
+    total = sum(snapshot.native)
+    message = (f"🔎 Снимок {len(snapshot.addresses)} кошельков на блоке {snapshot.block_number}: "
+               f"всего {AsyncWeb3.from_wei(total, 'ether'):.6f} нативного токена")
+    if required is not None:
+        affordable, _ = split_affordable(snapshot, required)
+        message += f", хватает на круг ({AsyncWeb3.from_wei(required, 'ether'):.6f}): {len(affordable)}"
+    logger.info(message + "\n")
@@ -0,0 +1,57 @@
+import asyncio
+import json
+import os
+import shutil
+
+from config import bundle
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PRIVATE_KEY = "0x" + "11" * 32
+
+
+def make_project(tmp_path):
+    """Копия constants/ и abi/ в tmp_path/app, settings.json со ссылками ENV: и секреты в tmp_path/.env."""
+    app = tmp_path / "app"
+    shutil.copytree(os.path.join(ROOT, "constants"), app / "constants")
+    shutil.copytree(os.path.join(ROOT, "abi"), app / "abi")
+    (app / "config").mkdir()
+    (app / "config" / "settings.json").write_text(json.dumps({
+        "proxy": "ENV:main", "private_key": "ENV:wallet", "token_a": "ETH", "token_b": "USDT",
+        "network": "ZKSYNC", "amount": 0.001,
+    }), encoding="utf-8")
+    (tmp_path / ".env").write_text(f"PROXIES='{{\"main\": \"\"}}'\n"
+                                   f"PRIVATE_KEYS='{{\"wallet\": \"{PRIVATE_KEY}\"}}'\n", encoding="utf-8")
+    return app
+
+
+def clear_env(monkeypatch):
+    for name in ("PROXIES", "PRIVATE_KEYS"):
+        monkeypatch.setenv(name, "")
+        monkeypatch.delenv(name)
+
+
+def test_load_from_bundle_reads_parent_env(tmp_path, monkeypatch):
+    monkeypatch.chdir(make_project(tmp_path))
+    clear_env(monkeypatch)
+    settings, _, _ = asyncio.run(bundle.load_config("config/settings.json"))
+    assert settings["strategies"][0]["private_keys"] == {"wallet": PRIVATE_KEY}
+    assert bundle.read_bundle("config/settings.json") is not None
+    assert PRIVATE_KEY not in (tmp_path / "app" / bundle.BUNDLE_PATH).read_text(encoding="utf-8")
+
+    # Следующий запуск — новый процесс: переменных из ../.env в окружении ещё нет
+    clear_env(monkeypatch)
+    settings, _, _ = asyncio.run(bundle.load_config("config/settings.json"))
+    assert settings["strategies"][0]["private_keys"] == {"wallet": PRIVATE_KEY}
+    assert settings["proxy"] == ""
+
+
+def test_literal_private_key_is_not_bundled(tmp_path, monkeypatch):
+    app = make_project(tmp_path)
+    settings_path = app / "config" / "settings.json"
+    settings_path.write_text(json.dumps(dict(json.loads(settings_path.read_text(encoding="utf-8")),
+                                             private_key=PRIVATE_KEY)), encoding="utf-8")
+    monkeypatch.chdir(app)
+    clear_env(monkeypatch)
+    settings, _, _ = asyncio.run(bundle.load_config("config/settings.json"))
+    assert settings["strategies"][0]["private_keys"] == {"default": PRIVATE_KEY}
+    assert not (app / bundle.BUNDLE_PATH).exists()
@@ -0,0 +1,22 @@
+import asyncio
+
+import pytest
+
+from config.configvalidator import NETWORKS_DATA_PATH, TOKENS_PATH, ConfigValidator
+
+NETWORKS_DATA = ConfigValidator.load_constants(NETWORKS_DATA_PATH)
+TOKENS = ConfigValidator.load_constants(TOKENS_PATH)
+
+
+def test_token_a_must_be_wrapped_native():
+    asyncio.run(ConfigValidator.validate_deposit_token("ETH", "ZKSYNC", NETWORKS_DATA, TOKENS))
+    with pytest.raises(SystemExit):
+        asyncio.run(ConfigValidator.validate_deposit_token("USDT", "ZKSYNC", NETWORKS_DATA, TOKENS))
+
+
+def test_strategies_must_not_share_a_pair():
+    first = {"name": "a", "network": "ZKSYNC", "token_a": "ETH", "token_b": "USDT"}
+    second = dict(first, name="b", token_b=TOKENS["ZKSYNC"]["USDT"].lower())
+    asyncio.run(ConfigValidator.validate_unique_pairs([first], TOKENS))
+    with pytest.raises(SystemExit):
+        asyncio.run(ConfigValidator.validate_unique_pairs([first, second], TOKENS))
@@ -0,0 +1,75 @@
+import asyncio
+from types import SimpleNamespace
+
+from eth_abi import encode
+
+from pool_actions import pool_snapshot
+from pool_actions.pool_math import PoolSnapshot
+from pool_actions.pool_snapshot import TRANSFER_TOPIC, ZERO_TOPIC, PoolState, PoolStateCache
+
+POOL = "0x" + "11" * 20
+WALLET_TOPIC = b"\x00" * 12 + b"\x22" * 20
+MINTED = 5_000
+
+
+class FakeEth:
+    """eth_blockNumber и eth_getLogs: в блоке 101 пул выпускает LP; ответ на getLogs приходит с задержкой."""
+
+    def __init__(self, latest: int = 102):
+        self.latest = latest
+        self.get_logs_calls = 0
+
+    @property
+    async def block_number(self) -> int:
+        return self.latest
+
+    async def get_logs(self, params: dict) -> list:
+        self.get_logs_calls += 1
+        await asyncio.sleep(0.01)
+        return [{
+            "address": POOL,
+            "blockNumber": 101,
+            "logIndex": 0,
+            "topics": [TRANSFER_TOPIC, ZERO_TOPIC, WALLET_TOPIC],
+            "data": encode(["uint256"], [MINTED]),
+        }] if params["fromBlock"] <= 101 <= params["toBlock"] else []
+
+
+class FakeW3:
+    def __init__(self, latest: int = 102):
+        self.eth = FakeEth(latest)
+
+
+def make_snapshot() -> PoolSnapshot:
+    return PoolSnapshot(token0="0x" + "aa" * 20, token1="0x" + "bb" * 20, reserve0=10 ** 18,
+                        reserve1=10 ** 18, total_supply=10 ** 18, swap_fee=300, block_number=100)
+
+
+def test_concurrent_polls_apply_mint_once():
+    async def scenario() -> PoolStateCache:
+        cache = PoolStateCache(FakeW3())
+        cache.pools[POOL] = PoolState(snapshot=make_snapshot(), block=100)
+        cache.last_block = 100
+        await asyncio.gather(cache.poll(), cache.poll())
+        return cache
+
+    cache = asyncio.run(scenario())
+    assert cache.pools[POOL].snapshot.total_supply == 10 ** 18 + MINTED
+    assert cache.last_block == 102
+
+
+def test_pool_read_behind_last_block_replays_logs(monkeypatch):
+    async def fetch(client, pool_contract, token_in, token_out, extra_calls=(), block_identifier="latest"):
+        return make_snapshot(), []
+
+    monkeypatch.setattr(pool_snapshot, "fetch_pool_snapshot", fetch)
+
+    async def scenario() -> PoolStateCache:
+        # Номер блока 100 ответил отстающий RPC, а общий опрос уже дошёл до 102
+        cache = PoolStateCache(FakeW3(latest=100))
+        cache.last_block, cache.updated_at = 102, float("inf")
+        await cache._update(None, SimpleNamespace(address=POOL), "0x" + "aa" * 20, "0x" + "bb" * 20)
+        return cache
+
+    cache = asyncio.run(scenario())
+    assert cache.pools[POOL].snapshot.total_supply == 10 ** 18 + MINTED
@@ -0,0 +1,24 @@
+import asyncio
+import threading
+
+from client.signer import SigningService
+
+PRIVATE_KEY = "0x" + "11" * 32
+TRANSACTION = {"to": "0x" + "22" * 20, "value": 1, "gas": 21_000, "gasPrice": 1, "nonce": 0, "chainId": 324}
+
+
+def test_unpicklable_transaction_does_not_hang():
+    service = SigningService(workers=1)
+
+    async def scenario():
+        # Пачку с блокировкой не передать в процесс-подписчик: результат должен прийти, а не зависнуть
+        good = service.sign(TRANSACTION, PRIVATE_KEY)
+        bad = service.sign(dict(TRANSACTION, lock=threading.Lock()), PRIVATE_KEY)
+        return await asyncio.wait_for(asyncio.gather(good, bad, return_exceptions=True), timeout=30)
+
+    try:
+        good, bad = asyncio.run(scenario())
+    finally:
+        service.close()
+    assert good.hash
+    assert isinstance(bad, Exception)
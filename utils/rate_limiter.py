@@ -0,0 +1,154 @@
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from typing import Any, Optional
+
+from web3.types import RPCResponse
+
+# Полосы приоритета: меньше — раньше. Отправка транзакций и ожидание receipt не должны стоять
+# в очереди за массовыми чтениями балансов
+PRIORITY_SEND = 0
+PRIORITY_RECEIPT = 1
+PRIORITY_DEFAULT = 2
+PRIORITY_BACKGROUND = 3
+METHOD_PRIORITIES = {
+    "eth_sendRawTransaction": PRIORITY_SEND,
+    "eth_getTransactionReceipt": PRIORITY_RECEIPT,
+    "eth_blockNumber": PRIORITY_RECEIPT,
+    "eth_getBlockByNumber": PRIORITY_RECEIPT,
+    "eth_getBalance": PRIORITY_BACKGROUND,
+    "eth_feeHistory": PRIORITY_BACKGROUND,
+}
+# Запас токенов: сколько секунд лимита можно потратить разом после простоя
+BURST_SECONDS = 1.0
+
+# Коды JSON-RPC ошибок, которыми ноды сообщают о превышении лимитов
+THROTTLE_RPC_CODES = (-32005, -32090, 429)
+THROTTLE_MARKERS = ("rate limit", "too many requests", "limit exceeded")
+THROTTLE_HTTP_STATUSES = (429, 503)
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+
+
+def method_priority(method: str) -> int:
+    return METHOD_PRIORITIES.get(method, PRIORITY_DEFAULT)
+
+
+def is_throttled_response(response: RPCResponse) -> bool:
+    error = response.get("error") if isinstance(response, dict) else None
+    if not error:
+        return False
+    code = error.get("code") if isinstance(error, dict) else None
+    message = str(error.get("message", "") if isinstance(error, dict) else error).lower()
+    return code in THROTTLE_RPC_CODES or any(marker in message for marker in THROTTLE_MARKERS)
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Экспоненциальная задержка с джиттером (половина фиксированная, половина случайная), не меньше Retry-After."""
+    delay = min(BACKOFF_BASE * 2 ** attempt, BACKOFF_MAX)
+    delay = delay / 2 + random.uniform(0, delay / 2)
+    return max(delay, retry_after or 0.0)
+
+
+class RateLimiter:
+    """
+    Token bucket для одного RPC-эндпоинта: rate запросов в секунду с запасом на rate * BURST_SECONDS.
+    Когда токенов нет, запросы ждут в очереди по приоритету (при равном — в порядке прихода).
+    backoff() приостанавливает выдачу всем запросам к эндпоинту после ответа о превышении лимита.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError(f"Лимит запросов должен быть больше нуля, получено: {rate}")
+        self.rate = rate
+        self.burst = burst or max(1.0, rate * BURST_SECONDS)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._order = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def set_rate(self, rate: float) -> None:
+        self._refill()
+        self.rate = rate
+        self.burst = max(1.0, rate * BURST_SECONDS)
+        self._tokens = min(self._tokens, self.burst)
+
+    async def acquire(self, priority: int = PRIORITY_DEFAULT) -> float:
+        """Ждёт токен; возвращает время ожидания в секундах."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Очередь и таймер от закрытого event loop больше не разбудить
+            self._loop, self._waiters, self._timer = loop, [], None
+        if not self._waiters and self._take():
+            return 0.0
+
+        started = time.monotonic()
+        future = loop.create_future()
+        heapq.heappush(self._waiters, (priority, next(self._order), future))
+        self._schedule()
+        await future
+        return time.monotonic() - started
+
+    def backoff(self, delay: float) -> None:
+        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        self._tokens = 0.0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _take(self) -> bool:
+        self._refill()
+        if time.monotonic() < self._paused_until or self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    def _schedule(self) -> None:
+        if self._timer is not None:
+            return
+        self._refill()
+        wait = max(self._paused_until - time.monotonic(), (1 - self._tokens) / self.rate, 0.0)
+        self._timer = self._loop.call_later(wait, self._dispatch)
+
+    def _dispatch(self) -> None:
+        self._timer = None
+        while self._waiters:
+            # Отменённые ожидания (таймаут вызывающего) токен не расходуют
+            if self._waiters[0][2].done():
+                heapq.heappop(self._waiters)
+                continue
+            if not self._take():
+                break
+            heapq.heappop(self._waiters)[2].set_result(None)
+        if self._waiters:
+            self._schedule()
+
+
+# Лимитеры по адресу RPC, общие для всех AsyncWeb3 процесса: бюджет эндпоинта один на всех
+_ENDPOINT_LIMITERS: dict[str, RateLimiter] = {}
+
+
+def endpoint_limiter(endpoint: str, rate: float) -> RateLimiter:
+    limiter = _ENDPOINT_LIMITERS.get(endpoint)
+    if limiter is None:
+        limiter = RateLimiter(rate)
+        _ENDPOINT_LIMITERS[endpoint] = limiter
+    elif limiter.rate != rate:
+        limiter.set_rate(rate)
+    return limiter
+
+
+def retry_after_seconds(headers: Any) -> Optional[float]:
+    """Retry-After из заголовков ответа 429/503, если он задан в секундах."""
+    value = headers.get("Retry-After") if headers else None
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
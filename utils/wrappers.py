@@ -1,5 +1,7 @@
 from eth_typing import ChecksumAddress
+from typing import Optional
 from web3 import AsyncWeb3
+from client.contracts import get_contract
 
 WRAPPED_NATIVE_ADDRESSES = {
     "Optimism": "0x4200000000000000000000000000000000000006",  # WETH
@@ -30,11 +32,15 @@ WETH_ABI = [
 ]
 
 
-async def wrap_native_token(w3: AsyncWeb3, network: str, amount_wei: int, wallet_address: ChecksumAddress):
-    """Оборачивает нативный токен в WETH/WBNB/..."""
+async def wrap_native_token(w3: AsyncWeb3, network: str, amount_wei: int, wallet_address: ChecksumAddress,
+                            nonce: Optional[int] = None, fees: Optional[dict] = None):
+    """
+    Оборачивает нативный токен в WETH/WBNB/... (nonce можно передать из локального менеджера,
+    параметры комиссии — из оракула; без них берётся gas_price)
+    """
     token_address = WRAPPED_NATIVE_ADDRESSES[network.upper()]
     token_address = AsyncWeb3.to_checksum_address(token_address)
-    contract = w3.eth.contract(address=token_address, abi=WETH_ABI)
+    contract = get_contract(w3, token_address, WETH_ABI)
     gas_estimate = await contract.functions.deposit().estimate_gas({
         "from": wallet_address,
         "value": amount_wei,
@@ -42,22 +48,23 @@ async def wrap_native_token(w3: AsyncWeb3, network: str, amount_wei: int, wallet
     tx = await contract.functions.deposit().build_transaction({
         "from": wallet_address,
         "value": amount_wei,
-        "nonce": await w3.eth.get_transaction_count(wallet_address),
+        "nonce": nonce if nonce is not None else await w3.eth.get_transaction_count(wallet_address),
         "gas": int(gas_estimate * 1.2),
-        "gasPrice": await w3.eth.gas_price
+        **(fees or {"gasPrice": await w3.eth.gas_price}),
     })
     return tx
 
 
-async def unwrap_native_token(w3: AsyncWeb3, network: str, amount_wei: int, wallet_address: ChecksumAddress):
-    """Разворачивает WETH/WBNB/... обратно в нативный токен"""
+async def unwrap_native_token(w3: AsyncWeb3, network: str, amount_wei: int, wallet_address: ChecksumAddress,
+                              nonce: Optional[int] = None, fees: Optional[dict] = None):
+    """Разворачивает WETH/WBNB/... обратно в нативный токен (nonce и комиссии — как в wrap_native_token)"""
     token_address = WRAPPED_NATIVE_ADDRESSES[network.upper()]
     token_address = AsyncWeb3.to_checksum_address(token_address)
-    contract = w3.eth.contract(address=token_address, abi=WETH_ABI)
+    contract = get_contract(w3, token_address, WETH_ABI)
     tx = await contract.functions.withdraw(amount_wei).build_transaction({
         "from": wallet_address,
-        "nonce": await w3.eth.get_transaction_count(wallet_address),
+        "nonce": nonce if nonce is not None else await w3.eth.get_transaction_count(wallet_address),
         "gas": 100_000,
-        "gasPrice": await w3.eth.gas_price
+        **(fees or {"gasPrice": await w3.eth.gas_price}),
     })
     return tx